@@ -56,6 +56,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.routing.PrimaryAfterWriteMiddleware",
 ]
 
 ROOT_URLCONF = "accident_detection.urls"
@@ -192,4 +193,110 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=90),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-}
\ No newline at end of file
+}
+
+# Streaming sensor windows (api/streaming.py)
+SENSOR_WINDOW_SIZE = int(os.environ.get("SENSOR_WINDOW_SIZE", 50))  # samples per device
+SENSOR_SAMPLE_RATE = float(os.environ.get("SENSOR_SAMPLE_RATE", 50))  # Hz, used when samples carry no timestamp
+SENSOR_DEVICE_IDLE_SECONDS = int(os.environ.get("SENSOR_DEVICE_IDLE_SECONDS", 300))
+SENSOR_MAX_DEVICES = int(os.environ.get("SENSOR_MAX_DEVICES", 10000))
+
+# Micro-batching of concurrent predict_accident calls (api/inference.py).
+# 0 disables it; only worth enabling with threaded or async workers.
+INFERENCE_BATCH_WINDOW_MS = float(os.environ.get("INFERENCE_BATCH_WINDOW_MS", 0))
+INFERENCE_BATCH_MAX_SIZE = int(os.environ.get("INFERENCE_BATCH_MAX_SIZE", 64))
+
+# Model registry (api/registry.py): seconds between checks for a newly
+# activated version. MODEL_REGISTRY_DIR overrides where versions live.
+MODEL_RELOAD_CHECK_SECONDS = float(os.environ.get("MODEL_RELOAD_CHECK_SECONDS", 2))
+# Where serving processes write heartbeats (default: the registry's workers/)
+MODEL_HEARTBEAT_DIR = os.environ.get("MODEL_HEARTBEAT_DIR") or None
+MODEL_HEARTBEAT_SECONDS = float(os.environ.get("MODEL_HEARTBEAT_SECONDS", 30))
+# Skip the forest for readings inside the version's learned "normal" box
+MODEL_CASCADE_GATE = os.environ.get("MODEL_CASCADE_GATE", "True") == "True"
+
+# Where predictions run: "inline" in the request thread, or "process" in a
+# pool of INFERENCE_PROCESSES worker processes (falls back to inline on error)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "inline")
+INFERENCE_PROCESSES = int(os.environ.get("INFERENCE_PROCESSES", 2))
+INFERENCE_TIMEOUT_SECONDS = float(os.environ.get("INFERENCE_TIMEOUT_SECONDS", 5))
+# After this many pool failures in a row, score inline for the cooldown
+INFERENCE_POOL_MAX_FAILURES = int(os.environ.get("INFERENCE_POOL_MAX_FAILURES", 3))
+INFERENCE_POOL_COOLDOWN_SECONDS = float(os.environ.get("INFERENCE_POOL_COOLDOWN_SECONDS", 30))
+
+# Seconds the alert statistics endpoint may serve a cached result
+ALERT_STATISTICS_CACHE_SECONDS = float(os.environ.get("ALERT_STATISTICS_CACHE_SECONDS", 5))
+
+# Keyset-paginated list endpoints (api/pagination.py): ?page_size= default and cap
+LIST_PAGE_SIZE = int(os.environ.get("LIST_PAGE_SIZE", 50))
+LIST_MAX_PAGE_SIZE = int(os.environ.get("LIST_MAX_PAGE_SIZE", 500))
+
+# Incident clustering (api/incidents.py): reports this close in space and
+# time to an open incident join it instead of opening a new one
+INCIDENT_RADIUS_METERS = float(os.environ.get("INCIDENT_RADIUS_METERS", 300))
+INCIDENT_WINDOW_MINUTES = float(os.environ.get("INCIDENT_WINDOW_MINUTES", 15))
+
+# Retention (manage.py run_retention): days each table is kept before its
+# rows are archived to ARCHIVE_DIR as gzip NDJSON and deleted; 0 keeps forever
+RETENTION_DAYS = {
+    "ble-alerts": int(os.environ.get("RETENTION_DAYS_BLE_ALERTS", 30)),
+    "cloud-alerts": int(os.environ.get("RETENTION_DAYS_CLOUD_ALERTS", 90)),
+    "reports": int(os.environ.get("RETENTION_DAYS_REPORTS", 365)),
+}
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", BASE_DIR / "archive")
+
+# Raw sensor sample store (api/telemetry.py): append-only float32 columns per
+# day and shard under TELEMETRY_DIR, flushed and fsynced in batches by a
+# background thread; RETENTION_DAYS_TELEMETRY (0 = forever) prunes whole days
+TELEMETRY_ENABLED = os.environ.get("TELEMETRY_ENABLED", "True") == "True"
+TELEMETRY_DIR = os.environ.get("TELEMETRY_DIR", BASE_DIR / "telemetry")
+TELEMETRY_SHARDS = int(os.environ.get("TELEMETRY_SHARDS", 16))
+TELEMETRY_FLUSH_SAMPLES = int(os.environ.get("TELEMETRY_FLUSH_SAMPLES", 20000))
+TELEMETRY_FLUSH_SECONDS = float(os.environ.get("TELEMETRY_FLUSH_SECONDS", 2))
+TELEMETRY_MAX_BUFFERED_SAMPLES = int(os.environ.get("TELEMETRY_MAX_BUFFERED_SAMPLES", 1_000_000))
+RETENTION_DAYS["telemetry"] = int(os.environ.get("RETENTION_DAYS_TELEMETRY", 30))
+
+# Read replicas (api/routing.py): comma-separated database URLs. Views marked
+# @use_replica read from one that answers and is at most
+# REPLICA_MAX_LAG_SECONDS behind, re-checked every REPLICA_CHECK_SECONDS;
+# writes and all other reads use the primary.
+for i, url in enumerate((u for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u.strip()), 1):
+    DATABASES[f"replica{i}"] = dj_database_url.parse(url.strip(), conn_max_age=600)
+    DATABASES[f"replica{i}"]["TEST"] = {"MIRROR": "default"}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["api.routing.ReplicaRouter"]
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_CHECK_SECONDS = float(os.environ.get("REPLICA_CHECK_SECONDS", 5))
+
+# Production SQLite mode: WAL and tuned pragmas on every new connection,
+# BEGIN IMMEDIATE for transactions (no lock-upgrade deadlocks), and writes
+# group-committed by one writer thread per process (api/commit_queue.py).
+# synchronous=FULL makes every acknowledged write survive a power cut; with
+# group commit one fsync covers a whole group. NORMAL is faster but may
+# lose the last commits on power loss (never on a process crash). Opt-in:
+# the deployments (render.yaml, Procfile) turn both switches on, and run
+# threaded workers (gthread): with one request per process a "group" would
+# only ever hold one write.
+SQLITE_PRODUCTION_MODE = os.environ.get("SQLITE_PRODUCTION_MODE", "False") == "True"
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "FULL")
+SQLITE_CACHE_MB = int(os.environ.get("SQLITE_CACHE_MB", 64))
+SQLITE_MMAP_MB = int(os.environ.get("SQLITE_MMAP_MB", 256))
+SQLITE_BUSY_TIMEOUT_SECONDS = float(os.environ.get("SQLITE_BUSY_TIMEOUT_SECONDS", 20))
+SQLITE_COMMIT_QUEUE = SQLITE_PRODUCTION_MODE and os.environ.get("SQLITE_COMMIT_QUEUE", "False") == "True"
+SQLITE_COMMIT_MAX_BATCH = int(os.environ.get("SQLITE_COMMIT_MAX_BATCH", 256))
+SQLITE_COMMIT_TIMEOUT_SECONDS = float(os.environ.get("SQLITE_COMMIT_TIMEOUT_SECONDS", 30))
+
+for database in DATABASES.values():
+    if not SQLITE_PRODUCTION_MODE or database["ENGINE"] != "django.db.backends.sqlite3":
+        continue
+    database.setdefault("OPTIONS", {}).update({
+        "init_command": (
+            "PRAGMA journal_mode=WAL;"
+            f"PRAGMA synchronous={SQLITE_SYNCHRONOUS};"
+            f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024};"
+            f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024};"
+            "PRAGMA temp_store=MEMORY;"
+        ),
+        "transaction_mode": "IMMEDIATE",
+        "timeout": SQLITE_BUSY_TIMEOUT_SECONDS,
+    })
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "accident_detection.settings")
 
 application = get_wsgi_application()
+
+# Load the accident model in the gunicorn master (--preload) so forked
+# workers share it copy-on-write instead of each unpickling their own.
+# Each worker writes its own heartbeat on its first request.
+if os.environ.get("PRELOAD_MODEL", "True") == "True":
+    from api.ml_model import preload
+
+    preload()
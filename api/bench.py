@@ -0,0 +1,52 @@
+"""Small timing helpers shared by the benchmark management commands."""
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .ml_model import FEATURES
+
+SENSOR_CSV = settings.BASE_DIR / "sensor_data.csv"
+
+
+def sensor_matrix(rows, seed=0):
+    """Fixed benchmark input: `rows` readings resampled from sensor_data.csv"""
+    data = pd.read_csv(SENSOR_CSV)[FEATURES].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    return data[rng.integers(0, len(data), rows)]
+
+
+def timings(fn, repeat, warmup=3):
+    """Wall time of `repeat` calls to fn, in seconds"""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - started
+    return samples
+
+
+def percentiles_ms(samples, points=(50, 95, 99)):
+    return {f"p{p}": float(np.percentile(samples, p) * 1000) for p in points}
+
+
+def compare(results, baseline, threshold):
+    """
+    Metrics in `results` that are worse than `baseline` by more than
+    `threshold` (a fraction); each metric records whether lower or higher
+    is better.
+    """
+    regressions = []
+    for name, metric in results["metrics"].items():
+        before = baseline.get("metrics", {}).get(name)
+        if not before or not before["value"]:
+            continue
+        change = (metric["value"] - before["value"]) / before["value"]
+        if metric["better"] == "higher":
+            change = -change
+        if change > threshold:
+            regressions.append((name, before["value"], metric["value"], change))
+    return regressions
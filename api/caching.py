@@ -0,0 +1,41 @@
+"""
+Short-TTL caching for expensive read endpoints.
+
+cached() keeps the value in Django's cache with a soft expiry. When it goes
+stale, the first caller to win cache.add() on a lock key recomputes it
+while everyone else keeps getting the stale value, so a burst of requests
+after expiry costs one computation instead of one per request. With a
+shared cache backend (Redis, Memcached) that holds across workers and
+hosts; with the default local-memory cache it holds per process.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def cached(key, compute, ttl, grace=None, wait=2.0):
+    """Return compute()'s value, recomputing at most once per `ttl` seconds"""
+    grace = ttl * 5 if grace is None else grace
+    entry = cache.get(key)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["value"]
+
+    lock = f"{key}:lock"
+    if cache.add(lock, 1, timeout=wait):
+        try:
+            value = compute()
+            cache.set(key, {"value": value, "fresh_until": time.time() + ttl}, timeout=ttl + grace)
+            return value
+        finally:
+            cache.delete(lock)
+
+    if entry is not None:
+        return entry["value"]  # someone else is refreshing it
+    # Cold cache: wait briefly for the winner rather than piling onto the DB
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["value"]
+    return compute()
@@ -0,0 +1,117 @@
+"""
+Cheap first stage in front of the forest.
+
+A Gate is an axis-aligned box over the six sensor channels. Rows inside it
+are answered "normal" without walking the forest; everything else (or any
+row with a NaN) goes to the forest as before.
+
+The box starts from the spread of normal driving in the training data and
+is shrunk until an interval walk of every tree proves the forest itself
+would predict the normal class for *any* point in the box. The gate can
+therefore never change a prediction, so accident recall is unchanged by
+construction; gate_report() checks it on data as well.
+
+No Django imports here so train_model.py can use it as a plain script.
+"""
+import numpy as np
+
+
+class Gate:
+    def __init__(self, lower, upper, label=0):
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+        self.label = label
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["lower"], data["upper"], data["label"])
+
+    def to_dict(self):
+        return {"lower": self.lower.tolist(), "upper": self.upper.tolist(), "label": self.label}
+
+    def contains(self, X):
+        """Boolean mask of rows that are clearly normal"""
+        X = np.asarray(X, dtype=np.float32)
+        return ((X >= self.lower) & (X <= self.upper)).all(axis=1)
+
+
+def cascade_predict(forest, gate, X, positive=1):
+    """
+    Class per row with the gate in front of the forest; returns (preds,
+    positive-class probability per row, rows_gated). Both come from the
+    same forest pass; rows the gate answers have no probability (NaN).
+    """
+    X = np.asarray(X)
+    inside = np.zeros(len(X), dtype=bool) if gate is None else gate.contains(X)
+    gated = int(inside.sum())
+    preds = np.empty(len(X), dtype=forest.classes.dtype)
+    if gated:
+        preds[inside] = gate.label
+    probabilities = np.full(len(X), np.nan, dtype=np.float32)
+    if gated < len(X):
+        proba = forest.predict_proba(X[~inside])
+        preds[~inside] = forest.classes[np.argmax(proba, axis=1)]
+        column = np.flatnonzero(forest.classes == positive)
+        probabilities[~inside] = proba[:, column[0]] if len(column) else 0.0
+    return preds, probabilities, gated
+
+
+def min_class_probability(forest, lower, upper, class_index):
+    """
+    Lower bound on the forest's probability for class_index over the box:
+    each tree contributes its least favourable leaf among those the box
+    can reach.
+    """
+    total = 0.0
+    for root in forest.roots:
+        worst = np.inf
+        stack = [int(root)]
+        while stack:
+            node = stack.pop()
+            left, right = int(forest.left[node]), int(forest.right[node])
+            if left == node:  # leaves point at themselves
+                worst = min(worst, forest.value[node, class_index])
+                continue
+            feature, threshold = forest.feature[node], forest.threshold[node]
+            if lower[feature] <= threshold:
+                stack.append(left)
+            if upper[feature] > threshold:
+                stack.append(right)
+        total += worst
+    return total / forest.n_trees
+
+
+def learn_gate(forest, X, y, label=0, quantile=0.995, shrink=0.95, max_steps=300):
+    """Largest box (from a shrinking schedule) the forest provably labels `label`"""
+    X = np.asarray(X, dtype=np.float64)
+    normal = X[np.asarray(y) == label]
+    if not len(normal):
+        return None
+    class_index = int(np.flatnonzero(forest.classes == label)[0])
+    lower = np.quantile(normal, 1 - quantile, axis=0)
+    upper = np.quantile(normal, quantile, axis=0)
+    center = (lower + upper) / 2
+    half = (upper - lower) / 2
+    for _ in range(max_steps):
+        # A small margin over 0.5 keeps float summation order from mattering
+        if min_class_probability(forest, center - half, center + half, class_index) > 0.5 + 1e-9:
+            return Gate(center - half, center + half, label)
+        half = half * shrink
+    return None
+
+
+def gate_report(forest, gate, X, y, positive=1):
+    """Share of rows the gate answers alone, and positive-class recall with and without it"""
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    forest_pred = forest.predict(X)
+    inside = gate.contains(X)
+    cascade_pred = forest_pred.copy()
+    cascade_pred[inside] = gate.label
+    positives = y == positive
+    return {
+        "short_circuited": float(inside.mean()),
+        "recall_forest": float((forest_pred[positives] == positive).mean()) if positives.any() else None,
+        "recall_cascade": float((cascade_pred[positives] == positive).mean()) if positives.any() else None,
+        "agreement": float((forest_pred == cascade_pred).mean()),
+    }
@@ -0,0 +1,144 @@
+"""
+Per-process group commit for SQLite writes.
+
+SQLite allows one writer at a time, so with several gunicorn workers and
+threads every INSERT queues on the database lock, and each commit pays
+its own fsync. Here a request thread hands its write to this process's
+single writer thread instead and blocks until it is done. The writer takes
+every write that queued up while it was busy, runs them in ONE
+transaction (each in its own savepoint, so one failing write doesn't fail
+the others) and commits once; then every waiting request gets its own
+result or exception. A request is only answered after the commit that
+contains its row, so the acknowledgement means what it did before, while
+the lock is taken once per group instead of once per row.
+
+Writes run inline instead when the queue is off (non-SQLite databases or
+SQLITE_COMMIT_QUEUE left off), when the caller is already inside a
+transaction (its write must be part of that transaction), and on the
+writer thread itself.
+"""
+import fcntl
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+
+
+def enabled():
+    return connection.vendor == "sqlite" and getattr(settings, "SQLITE_COMMIT_QUEUE", False)
+
+
+class GroupCommitter:
+    def __init__(self, max_batch=256, timeout=30.0):
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.jobs = queue.SimpleQueue()
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.groups = 0
+        self.writes = 0
+
+    def _ensure_thread(self):
+        # Started lazily, and again in each worker after a gunicorn --preload fork
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+                if self.pid != os.getpid():
+                    self.jobs = queue.SimpleQueue()
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self._run, name="commit-queue", daemon=True)
+                self.thread.start()
+
+    def submit(self, fn):
+        """Run fn() in a group-committed transaction and return its result"""
+        if threading.current_thread() is self.thread or not enabled() or connection.in_atomic_block:
+            with transaction.atomic():
+                return fn()
+        self._ensure_thread()
+        future = Future()
+        self.jobs.put((fn, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Still queued: withdraw it so the caller's error is the truth.
+            # Already running: it will commit, so wait for its outcome.
+            if future.cancel():
+                raise
+            return future.result()
+
+    def _run(self):
+        while True:
+            jobs = [self.jobs.get()]
+            while len(jobs) < self.max_batch:
+                try:
+                    jobs.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(jobs)
+
+    @contextmanager
+    def _turn(self):
+        """
+        Hold the cross-process writer lock file for one group. Waiting
+        writers block in the kernel and get the lock the moment it is
+        released; left to SQLite's busy handler they poll with growing
+        sleeps, and a busy writer can starve the others for seconds.
+        """
+        name = str(connection.settings_dict["NAME"])
+        if name == ":memory:" or name.startswith("file:"):
+            yield
+            return
+        with open(f"{name}-writer.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _commit(self, jobs):
+        jobs = [(fn, future) for fn, future in jobs if future.set_running_or_notify_cancel()]
+        outcomes = []
+        try:
+            with self._turn(), transaction.atomic():
+                for fn, future in jobs:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, fn(), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # The commit itself failed: nothing in the group was written
+            connection.close()
+            for _, future in jobs:
+                future.set_exception(e)
+            return
+        finally:
+            connection.close_if_unusable_or_obsolete()
+        self.groups += 1
+        self.writes += len(outcomes)
+        for future, value, error in outcomes:
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+
+
+committer = GroupCommitter(
+    max_batch=getattr(settings, "SQLITE_COMMIT_MAX_BATCH", 256),
+    timeout=getattr(settings, "SQLITE_COMMIT_TIMEOUT_SECONDS", 30.0),
+)
+
+
+def submit(fn):
+    return committer.submit(fn)
+
+
+def create(model, **fields):
+    """model.objects.create(**fields) through the commit queue"""
+    return committer.submit(lambda: model.objects.create(**fields))
@@ -0,0 +1,145 @@
+"""
+Flat-array evaluator for the accident RandomForest.
+
+compile_forest() packs every tree of a fitted RandomForestClassifier into
+shared arrays (feature, threshold, children, leaf probabilities) with
+global node ids. CompiledForest then walks all trees for all rows at once
+with a handful of NumPy ops per tree level, skipping sklearn's per-call
+validation and joblib dispatch. Predictions match sklearn exactly: inputs
+are cast to float32 like sklearn does, splits use the same `<=` test and
+leaf probabilities are summed in tree order.
+
+No Django imports here so train_model.py can use it as a plain script.
+"""
+import hashlib
+
+import joblib
+import numpy as np
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compile_forest(model):
+    """Pack a fitted RandomForestClassifier into flat NumPy arrays"""
+    features, thresholds, lefts, rights, missing_left, values, roots = [], [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        node_ids = np.arange(n) + offset
+        is_leaf = tree.children_left == -1
+
+        # Leaves point at themselves and always "go left", so the evaluator
+        # can run a fixed number of steps without checking for leaves.
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+        rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+        if hasattr(tree, "missing_go_to_left"):
+            missing_left.append(np.where(is_leaf, True, tree.missing_go_to_left.astype(bool)))
+        else:
+            missing_left.append(is_leaf)
+
+        value = tree.value[:, 0, :]
+        values.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+
+    return {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "missing_left": np.concatenate(missing_left).astype(bool),
+        "value": np.concatenate(values).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "classes": np.asarray(model.classes_),
+        "max_depth": max_depth,
+        "n_features": int(model.n_features_in_),
+    }
+
+
+class CompiledForest:
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        # children[2 * node + go_right] picks the next node with one gather
+        self.children = np.stack([self.left, self.right], axis=1).ravel()
+        self.missing_left = arrays["missing_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes = arrays["classes"]
+        self.max_depth = int(arrays["max_depth"])
+        self.n_features = int(arrays["n_features"])
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(compile_forest(model))
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Open a saved forest; with mmap_mode the arrays stay file-backed"""
+        return cls(joblib.load(path, mmap_mode=mmap_mode))
+
+    def save(self, path):
+        # Uncompressed on purpose: compressed dumps cannot be memory-mapped
+        joblib.dump(self.arrays, path)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def leaves(self, X):
+        """Leaf node id reached in every tree, shape (n_rows, n_trees)"""
+        X = np.ascontiguousarray(X, dtype=np.float32).reshape(-1, self.n_features)
+        flat = X.ravel()
+        row_start = (np.arange(len(X), dtype=np.intp) * self.n_features)[:, None]
+        has_nan = np.isnan(flat).any()
+        node = np.tile(self.roots.astype(np.intp), (len(X), 1))
+        for _ in range(self.max_depth):
+            x = flat.take(row_start + self.feature.take(node))
+            go_right = x > self.threshold.take(node)
+            if has_nan:
+                go_right |= np.isnan(x) & ~self.missing_left.take(node)
+            node = self.children.take(2 * node + go_right)
+        return node
+
+    # Rows per evaluation block; keeps the (rows x trees) temporaries small
+    block_rows = 4096
+
+    def predict_proba(self, X):
+        X = np.asarray(X).reshape(-1, self.n_features)
+        if len(X) > self.block_rows:
+            return np.concatenate([
+                self.predict_proba(X[start:start + self.block_rows])
+                for start in range(0, len(X), self.block_rows)
+            ])
+        # Summing over the leading (tree) axis accumulates tree by tree,
+        # the same order sklearn uses, so ties break identically.
+        return self.value.take(self.leaves(X).T, axis=0).sum(axis=0) / self.n_trees
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compile_model_file(model_path, forest_path):
+    """Compile a pickled forest and save it next to it, tagged with the pickle's checksum"""
+    forest = CompiledForest.from_model(joblib.load(model_path))
+    forest.arrays["source_sha256"] = file_sha256(model_path)
+    forest.save(forest_path)
+    return forest
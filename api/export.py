@@ -0,0 +1,101 @@
+"""
+Streaming exports of reports and alerts.
+
+Rows are read with .values().iterator(chunk_size), which uses a
+server-side cursor on Postgres and fetchmany() on SQLite, and are encoded
+and yielded a chunk at a time. The first bytes go out as soon as the first
+chunk is read, and worker memory stays at one chunk whatever the table
+size. Filters are applied in SQL.
+"""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AccidentReport, BLEAlert, CloudAlert
+
+CHUNK_ROWS = 2000
+FIRST_CHUNK_ROWS = 100
+
+EXPORTS = {
+    "reports": AccidentReport,
+    "ble-alerts": BLEAlert,
+    "cloud-alerts": CloudAlert,
+}
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _moment(value, name):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f"{name} must be an ISO 8601 datetime")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def export_queryset(model, params):
+    """Rows of `model` matching the query params, oldest first, as dicts"""
+    rows = model.objects.all()
+    if params.get("start"):
+        rows = rows.filter(timestamp__gte=_moment(params["start"], "start"))
+    if params.get("end"):
+        rows = rows.filter(timestamp__lt=_moment(params["end"], "end"))
+    field_names = {field.name for field in model._meta.concrete_fields}
+    for name in ("severity", "status", "reported_via"):
+        if params.get(name) and name in field_names:
+            rows = rows.filter(**{name: params[name]})
+    # (timestamp, id) matches the keyset index, so the scan is in index order
+    return rows.order_by("timestamp", "pk").values(*columns(model))
+
+
+def _batches(rows):
+    """Lists of row dicts; the first is small so the response starts at once"""
+    batch = []
+    size = FIRST_CHUNK_ROWS
+    for row in rows.iterator(chunk_size=CHUNK_ROWS):
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+            size = CHUNK_ROWS
+    if batch:
+        yield batch
+
+
+def ndjson_chunks(rows):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for batch in _batches(rows):
+        yield "".join(encoder.encode(row) + "\n" for row in batch)
+
+
+def csv_chunks(rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for batch in _batches(rows):
+        writer.writerows(
+            [json.dumps(value, cls=DjangoJSONEncoder) if isinstance(value, (dict, list)) else value
+             for value in row.values()]
+            for row in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # header of an empty export
+        yield buffer.getvalue()
+
+
+def stream(model, params, fmt):
+    rows = export_queryset(model, params)
+    if fmt == "csv":
+        return csv_chunks(rows, columns(model))
+    return ndjson_chunks(rows)
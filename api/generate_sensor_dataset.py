@@ -1,39 +1,30 @@
-import pandas as pd
-import numpy as np
+import argparse
+import os
+import sys
 
-# Number of samples
-normal_samples = 150
-accident_samples = 50
+# Run as a plain script: make the api package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.synthetic import Spec, write  # noqa: E402
 
-# Simulate normal driving data
-normal_data = {
-    "acc_x": np.random.uniform(-2, 2, normal_samples),
-    "acc_y": np.random.uniform(-2, 2, normal_samples),
-    "acc_z": np.random.uniform(-2, 2, normal_samples),
-    "gyro_x": np.random.uniform(-10, 10, normal_samples),
-    "gyro_y": np.random.uniform(-10, 10, normal_samples),
-    "gyro_z": np.random.uniform(-10, 10, normal_samples),
-    "label": [0] * normal_samples
-}
+# Per-device streams of normal driving with injected crash bursts (see
+# api/synthetic.py). The defaults write the small 200-row training set;
+# scale up with e.g. --devices 10000 --samples 10000 --format columnar.
+parser = argparse.ArgumentParser(description="Generate synthetic sensor telemetry")
+parser.add_argument("--out", default="sensor_data.csv", help="CSV file, or directory for --format columnar")
+parser.add_argument("--format", choices=["csv", "columnar"], default="csv")
+parser.add_argument("--devices", type=int, default=4)
+parser.add_argument("--samples", type=int, default=50, help="Samples per device")
+parser.add_argument("--sample-rate", type=float, default=50.0, help="Hz")
+parser.add_argument("--crash-share", type=float, default=0.25, help="Expected share of rows inside crash bursts")
+parser.add_argument("--devices-per-chunk", type=int, default=1000)
+parser.add_argument("--processes", type=int, default=None, help="Default: all cores")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--quiet", action="store_true")
+args = parser.parse_args()
 
-# Simulate accident data (high sudden spikes)
-accident_data = {
-    "acc_x": np.random.uniform(-25, 25, accident_samples),
-    "acc_y": np.random.uniform(-25, 25, accident_samples),
-    "acc_z": np.random.uniform(-25, 25, accident_samples),
-    "gyro_x": np.random.uniform(-200, 200, accident_samples),
-    "gyro_y": np.random.uniform(-200, 200, accident_samples),
-    "gyro_z": np.random.uniform(-200, 200, accident_samples),
-    "label": [1] * accident_samples
-}
+spec = Spec(args.devices, args.samples, devices_per_chunk=args.devices_per_chunk, seed=args.seed,
+            sample_rate=args.sample_rate, crash_share=args.crash_share)
+rate = write(spec, args.out, fmt=args.format, processes=args.processes,
+             log=(lambda line: None) if args.quiet else print)
 
-# Combine both
-df = pd.concat([pd.DataFrame(normal_data), pd.DataFrame(accident_data)], ignore_index=True)
-
-# Shuffle the data
-df = df.sample(frac=1).reset_index(drop=True)
-
-# Save CSV
-df.to_csv("sensor_data.csv", index=False)
-print("✅ Dataset created successfully: sensor_data.csv")
-print(df.head())
+print(f"✅ Dataset created successfully: {args.out} ({spec.rows:,} rows, {rate:,.0f} rows/s)")
@@ -0,0 +1,153 @@
+"""
+Grid-cell spatial index that works on any SQL backend (no PostGIS).
+
+The globe is cut into CELL_DEGREES x CELL_DEGREES cells numbered row-major
+from the south-west corner, so the cells of one latitude band are
+consecutive integers. A radius search turns into a handful of integer
+ranges (one per band the circle touches) on an indexed geo_cell column,
+and the exact great-circle distance is then computed for just those
+candidates: vectorized with NumPy when the distances are needed
+(nearby), or as a SQL filter when only membership is (within).
+
+Stored cell numbers depend on CELL_DEGREES; changing it means recomputing
+every geo_cell (see migration 0007).
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+from django.db.models import Q
+from django.db.models.functions import Cos, Radians, Sin
+
+CELL_DEGREES = 0.01  # ~1.1 km north-south
+ROWS = round(180 / CELL_DEGREES)
+COLS = round(360 / CELL_DEGREES)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Above this many ranges the query is one range plus a latitude band filter
+MAX_RANGES = 64
+
+
+def cells(latitudes, longitudes):
+    """Vectorized cell numbers for arrays of coordinates"""
+    lat = np.asarray(latitudes, dtype=np.float64)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    row = np.clip(np.floor((lat + 90) / CELL_DEGREES), 0, ROWS - 1).astype(np.int64)
+    col = np.floor((lon + 180) / CELL_DEGREES).astype(np.int64) % COLS
+    return row * COLS + col
+
+
+def located(latitude, longitude):
+    """
+    False for missing or invalid coordinates and for (0, 0), which is what
+    clients send when they have no fix
+    """
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return False
+    return cell_for(latitude, longitude) is not None and (latitude, longitude) != (0.0, 0.0)
+
+
+def cell_for(latitude, longitude):
+    """Cell of one point, or None if it has no valid coordinates"""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and math.isfinite(longitude)):
+        return None
+    return int(cells(latitude, longitude))
+
+
+def _row(latitude):
+    return min(max(int(math.floor((latitude + 90) / CELL_DEGREES)), 0), ROWS - 1)
+
+
+def _col(longitude):
+    return int(math.floor((longitude + 180) / CELL_DEGREES)) % COLS
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """Inclusive (low, high) cell ranges covering every point within radius_km"""
+    dlat = radius_km / KM_PER_DEGREE
+    south, north = max(-90.0, latitude - dlat), min(90.0, latitude + dlat)
+    widest = math.cos(math.radians(max(abs(south), abs(north))))
+    dlon = dlat / widest if widest > 1e-9 else 360.0
+    if north >= 90 or south <= -90 or dlon >= 180:
+        col_ranges = [(0, COLS - 1)]  # the circle spans every longitude
+    else:
+        west, east = _col(longitude - dlon), _col(longitude + dlon)
+        col_ranges = [(west, east)] if west <= east else [(0, east), (west, COLS - 1)]
+
+    ranges = []
+    for row in range(_row(south), _row(north) + 1):
+        for low, high in col_ranges:
+            low, high = row * COLS + low, row * COLS + high
+            if ranges and ranges[-1][1] + 1 >= low:
+                ranges[-1] = (ranges[-1][0], high)
+            else:
+                ranges.append((low, high))
+    return ranges
+
+
+def cell_filter(latitude, longitude, radius_km):
+    """Q selecting the candidate rows for a radius search (a superset)"""
+    ranges = cell_ranges(latitude, longitude, radius_km)
+    if len(ranges) > MAX_RANGES:
+        ranges = [(ranges[0][0], ranges[-1][1])]
+    query = Q()
+    for low, high in ranges:
+        query |= Q(geo_cell__range=(low, high))
+    dlat = radius_km / KM_PER_DEGREE
+    return query & Q(latitude__range=(latitude - dlat, latitude + dlat))
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distance from one point to arrays of points"""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def within(queryset, latitude, longitude, radius_km):
+    """
+    `queryset` narrowed to rows within radius_km (exact, not the cell
+    superset), as one SQL filter: the haversine term is compared with the
+    radius' own, which needs only sin/cos (Django provides them on SQLite).
+    """
+    lat1 = math.radians(latitude)
+    lat2, lon2 = Radians("latitude"), Radians("longitude")
+    half_dlat, half_dlon = Sin((lat2 - lat1) / 2), Sin((lon2 - math.radians(longitude)) / 2)
+    term = half_dlat * half_dlat + math.cos(lat1) * Cos(lat2) * half_dlon * half_dlon
+    limit = math.sin(min(radius_km / (2 * EARTH_RADIUS_KM), math.pi / 2)) ** 2
+    return queryset.filter(cell_filter(latitude, longitude, radius_km)).alias(haversine=term).filter(
+        haversine__lte=limit
+    )
+
+
+NearbyResult = namedtuple("NearbyResult", ["rows", "distances_km", "candidates", "matches"])
+
+
+def nearby(queryset, latitude, longitude, radius_km, limit=100):
+    """
+    Rows of `queryset` within radius_km, nearest first (at most `limit`).
+    Two queries: ids and coordinates of the indexed candidates, then the
+    full rows of the nearest matches.
+    """
+    candidates = list(
+        queryset.filter(cell_filter(latitude, longitude, radius_km)).values_list("pk", "latitude", "longitude")
+    )
+    if not candidates:
+        return NearbyResult([], [], 0, 0)
+    pks, lats, lons = zip(*candidates)
+    distances = haversine_km(latitude, longitude, lats, lons)
+    inside = np.flatnonzero(distances <= radius_km)
+    nearest = [i for i in inside[np.argsort(distances[inside], kind="stable")][:limit]]
+    by_pk = queryset.in_bulk([pks[i] for i in nearest])
+    nearest = [i for i in nearest if pks[i] in by_pk]  # deleted in between
+    return NearbyResult(
+        [by_pk[pks[i]] for i in nearest], [float(distances[i]) for i in nearest], len(candidates), len(inside)
+    )
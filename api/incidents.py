@@ -0,0 +1,201 @@
+"""
+Groups accident reports of the same crash into one Incident.
+
+A new report joins the nearest incident that is still open (its last
+report is less than INCIDENT_WINDOW_MINUTES old) and lies within
+INCIDENT_RADIUS_METERS; otherwise it opens a new incident, unless its
+severity is "low": a low reading only corroborates a crash someone else
+reported. Reports without a position (missing, or the (0, 0) clients send
+without a fix) are left out of incidents altogether. Downstream
+fan-out only needs to happen for reports that opened one
+(report.opened_incident).
+
+Lookups go to a process-local grid hash first: geo cell -> open incidents
+this worker has seen, so a burst of reports about one crash costs a dict
+lookup and one UPDATE each. On a miss the Incident table is queried
+through its (geo_cell, last_report_at) index for the few cell ranges the
+radius covers, which also finds incidents opened by other workers. Two
+workers opening an incident for the same crash at the same instant can
+still produce two incidents; each later report joins the nearer one.
+
+Single saves are clustered by the pre_save receiver at the bottom;
+bulk_create() callers must call assign() themselves before inserting.
+"""
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.signals import pre_save
+from django.utils import timezone
+
+from . import geo
+from .models import AccidentReport, Incident
+
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2}
+# Above this many cells per lookup the grid hash is skipped for the table
+MAX_HASH_CELLS = 64
+
+_lock = threading.Lock()
+_open = defaultdict(dict)  # geo cell -> {incident id: [lat, lon, last_report_at, severity]}
+
+
+def radius_km():
+    return getattr(settings, "INCIDENT_RADIUS_METERS", 300) / 1000
+
+
+def window():
+    return timezone.timedelta(minutes=getattr(settings, "INCIDENT_WINDOW_MINUTES", 15))
+
+
+def _remember(incident_id, cell, latitude, longitude, last_report_at, severity):
+    with _lock:
+        _open[cell][incident_id] = [latitude, longitude, last_report_at, severity]
+
+
+def _forget(incident_id, cell):
+    with _lock:
+        _open.get(cell, {}).pop(incident_id, None)
+
+
+def forget_all():
+    with _lock:
+        _open.clear()
+
+
+def prune(now=None):
+    """Drop incidents whose window has passed from the grid hash"""
+    cutoff = (now or timezone.now()) - window()
+    with _lock:
+        for cell in list(_open):
+            entries = _open[cell]
+            for incident_id in [i for i, entry in entries.items() if entry[2] < cutoff]:
+                del entries[incident_id]
+            if not entries:
+                del _open[cell]
+
+
+def _hash_cells(latitude, longitude, radius):
+    ranges = geo.cell_ranges(latitude, longitude, radius)
+    if sum(high - low + 1 for low, high in ranges) > MAX_HASH_CELLS:
+        return None
+    return [cell for low, high in ranges for cell in range(low, high + 1)]
+
+
+def _nearest(latitude, longitude, radius, found):
+    """(incident id, cell) of the nearest of `found` within radius, or None"""
+    if not found:
+        return None
+    distances = geo.haversine_km(latitude, longitude, [f[2] for f in found], [f[3] for f in found])
+    best = int(distances.argmin())
+    return found[best][:2] if distances[best] <= radius else None
+
+
+def find_open(latitude, longitude, now=None):
+    """(incident id, cell) of the open incident a report here would join, or None"""
+    now = now or timezone.now()
+    cutoff = now - window()
+    radius = radius_km()
+
+    cells = _hash_cells(latitude, longitude, radius)
+    if cells is not None:
+        with _lock:
+            found = [
+                (incident_id, cell, entry[0], entry[1])
+                for cell in cells if cell in _open
+                for incident_id, entry in _open[cell].items() if entry[2] >= cutoff
+            ]
+        match = _nearest(latitude, longitude, radius, found)
+        if match:
+            return match
+
+    rows = list(
+        Incident.objects.filter(geo.cell_filter(latitude, longitude, radius), last_report_at__gte=cutoff)
+        .values_list("pk", "geo_cell", "latitude", "longitude", "last_report_at", "severity")
+    )
+    for incident_id, cell, lat, lon, last_report_at, severity in rows:
+        _remember(incident_id, cell, lat, lon, last_report_at, severity)
+    return _nearest(latitude, longitude, radius, [row[:4] for row in rows])
+
+
+def _join(incident_id, count, severity, now):
+    """Add `count` reports to an open incident; False if it closed meanwhile"""
+    outranked = [name for name, rank in SEVERITY_RANK.items() if rank < SEVERITY_RANK.get(severity, 0)]
+    return bool(
+        Incident.objects.filter(pk=incident_id, last_report_at__gte=now - window()).update(
+            report_count=F("report_count") + count,
+            last_report_at=Greatest(F("last_report_at"), Value(now)),
+            severity=Case(When(severity__in=outranked, then=Value(severity)), default=F("severity")),
+        )
+    )
+
+
+def _worst(reports):
+    return max((report.severity for report in reports), key=lambda name: SEVERITY_RANK.get(name, 0))
+
+
+def _open_incident(reports, latitude, longitude, cell, now):
+    severity = _worst(reports)
+    incident = Incident.objects.create(
+        latitude=latitude, longitude=longitude, geo_cell=cell, severity=severity,
+        opened_at=now, last_report_at=now, report_count=len(reports)
+    )
+    _remember(incident.pk, cell, latitude, longitude, now, severity)
+    return incident
+
+
+def assign(reports, now=None):
+    """
+    Set incident_id and opened_incident on unsaved reports, opening
+    incidents as needed. Reports of one call cluster with each other too,
+    and each joined incident gets a single UPDATE.
+    """
+    now = now or timezone.now()
+    joined = defaultdict(list)  # (incident id, cell) -> reports
+    for report in reports:
+        report.opened_incident = False
+        if not geo.located(report.latitude, report.longitude):
+            continue
+        cell = geo.cell_for(report.latitude, report.longitude)
+        latitude, longitude = float(report.latitude), float(report.longitude)
+        match = find_open(latitude, longitude, now)
+        if match is None:
+            if report.severity == "low":
+                continue
+            match = (_open_incident([report], latitude, longitude, cell, now).pk, cell)
+            report.opened_incident = True
+        else:
+            joined[match].append(report)
+        report.incident_id = match[0]
+
+    for (incident_id, cell), members in joined.items():
+        severity = _worst(members)
+        if _join(incident_id, len(members), severity, now):
+            with _lock:
+                entry = _open.get(cell, {}).get(incident_id)
+                if entry:
+                    entry[2] = max(entry[2], now)
+                    entry[3] = max(entry[3], severity, key=lambda name: SEVERITY_RANK.get(name, 0))
+            continue
+        # Closed or deleted since it was looked up: the first member reopens
+        _forget(incident_id, cell)
+        first = members[0]
+        incident = _open_incident(members, float(first.latitude), float(first.longitude),
+                                  geo.cell_for(first.latitude, first.longitude), now)
+        for report in members:
+            report.incident_id = incident.pk
+        first.opened_incident = True
+
+    if len(_open) > 10_000:
+        prune(now)
+    return reports
+
+
+def cluster_saved(sender, instance, raw=False, **kwargs):
+    if raw or not instance._state.adding or instance.incident_id is not None:
+        return
+    assign([instance])
+
+
+pre_save.connect(cluster_saved, sender=AccidentReport)
@@ -0,0 +1,239 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from . import registry
+from .cascade import Gate, cascade_predict
+
+
+class BatchScheduler:
+    """
+    Coalesces concurrent single-row predictions into one batched call.
+
+    The first request to arrive opens a window of `window_ms`; anything that
+    arrives before it closes (up to `max_batch` rows) rides along in the same
+    predict call, then each caller's Future is resolved with its own row's
+    result. The window is measured from the first request's arrival, so a
+    lone request is never held longer than window_ms.
+    """
+
+    # Upper bounds of the batch-size histogram buckets
+    BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+    def __init__(self, predict_batch, window_ms=2.0, max_batch=64):
+        self.predict_batch = predict_batch
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._histogram = [0] * (len(self.BUCKETS) + 1)
+
+    @property
+    def enabled(self):
+        return self.window > 0 and self.max_batch > 1
+
+    def submit(self, row):
+        """Queue one feature row; returns a Future for its prediction"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((time.monotonic(), np.asarray(row), future))
+        return future
+
+    def _ensure_worker(self):
+        # Started lazily, and again after a fork (gunicorn --preload) since
+        # threads do not survive into the child process.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            deadline = batch[0][0] + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Past the deadline, still take whatever is already queued:
+                    # under a backlog that is what keeps the batches full
+                    batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        futures = [future for _, _, future in batch]
+        try:
+            results = self.predict_batch(np.stack([row for _, row, _ in batch]))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future, result in zip(futures, results):
+                future.set_result(result)
+        self._record(len(batch))
+
+    def _record(self, size):
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._largest = max(self._largest, size)
+            bucket = next((i for i, bound in enumerate(self.BUCKETS) if size <= bound), len(self.BUCKETS))
+            self._histogram[bucket] += 1
+
+    def stats(self):
+        with self._lock:
+            labels = [f"<={bound}" for bound in self.BUCKETS] + [f">{self.BUCKETS[-1]}"]
+            return {
+                "enabled": self.enabled,
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size": self._largest,
+                "batch_size_histogram": dict(zip(labels, self._histogram)),
+            }
+
+
+# -------------------------------
+# Process-pool backend
+# -------------------------------
+# State of one pool process: (generation, version, forest, gate). Pool
+# processes only import this Django-free module, load the active registry
+# version once, and follow activations with the same stat() check the
+# request workers use.
+_pool_model = None
+
+
+def _pool_load():
+    global _pool_model
+    generation = registry.generation()
+    version = registry.active_version()
+    if version is None:
+        raise registry.RegistryError(f"No active model version in {registry.REGISTRY_DIR}")
+    forest = registry.load_forest(version)
+    gate = registry.read_meta(version).get("gate")
+    _pool_model = (generation, version, forest, Gate.from_dict(gate) if gate else None)
+
+
+def _pool_predict(features, use_gate):
+    if _pool_model is None or registry.generation() != _pool_model[0]:
+        _pool_load()
+    _, version, forest, gate = _pool_model
+    preds, probabilities, gated = cascade_predict(forest, gate if use_gate else None, features)
+    return preds, probabilities, version, gated
+
+
+class PoolUnavailable(RuntimeError):
+    """The pool failed repeatedly and is skipped until its cooldown ends"""
+
+
+class ProcessPoolBackend:
+    """
+    Runs scoring in a pool of worker processes so NumPy work in one request
+    never holds the GIL of the process serving the others.
+
+    Rows travel as a float32 ndarray (pickled as one raw buffer, 24 bytes a
+    row) and come back as an int array and a float32 array of probabilities,
+    so there is no per-row marshalling.
+    The pool is created lazily per process and rebuilt if it breaks; callers
+    are expected to fall back to in-process scoring on any error.
+
+    After `max_failures` failures in a row (errors or timeouts) the pool is
+    torn down and predict() raises PoolUnavailable straight away for
+    `cooldown` seconds, so a hung pool costs a few requests one timeout each
+    instead of costing every request one. The next call after the cooldown
+    starts a fresh pool.
+    """
+
+    def __init__(self, processes=2, timeout=5.0, use_gate=True, max_failures=3, cooldown=30.0):
+        self.processes = processes
+        self.timeout = timeout
+        self.use_gate = use_gate
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+
+    def _executor(self):
+        if self._pool is not None and self._pid == os.getpid():
+            return self._pool
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # forkserver: children come from a clean single-threaded
+                # server instead of a copy of this (threaded) worker
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=context, initializer=_pool_load
+                )
+                self._pid = os.getpid()
+        return self._pool
+
+    def predict(self, features):
+        """(preds, accident probabilities, version, rows_gated) for a float32 feature matrix"""
+        if time.monotonic() < self._open_until:
+            raise PoolUnavailable(f"Inference pool skipped for {self._open_until - time.monotonic():.0f}s more")
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        try:
+            result = self._executor().submit(_pool_predict, features, self.use_gate).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self.reset()
+            self._failed()
+            raise
+        except Exception:
+            self._failed()
+            raise
+        self._failures = 0
+        return result
+
+    def _failed(self):
+        with self._lock:
+            self._failures += 1
+            tripped = self._failures >= self.max_failures
+            if tripped:
+                self._failures = 0
+                self._open_until = time.monotonic() + self.cooldown
+        if tripped:
+            # Hung processes would still hold their slots: start over later
+            self.reset()
+
+    def reset(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._pid == os.getpid():
+            # shutdown() alone leaves a hung worker running (and holding its
+            # memory) for good: kill the old pool's processes outright
+            processes = list((getattr(pool, "_processes", None) or {}).values())
+            pool.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.kill()
+                process.join(timeout=1)
+
+    def warm(self):
+        """Start every pool process now instead of on the first request"""
+        pool = self._executor()
+        probe = np.zeros((1, 6), dtype=np.float32)
+        for future in [pool.submit(_pool_predict, probe, self.use_gate) for _ in range(self.processes)]:
+            future.result(timeout=60)
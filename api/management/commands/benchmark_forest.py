@@ -0,0 +1,39 @@
+import warnings
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.bench import percentiles_ms, sensor_matrix, timings
+from api.ml_model import get_forest, get_model
+
+
+class Command(BaseCommand):
+    help = "Compare sklearn predict with the compiled forest for batch sizes 1 to 10k"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1,10,100,1000,10000")
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        model = get_model()
+        forest = get_forest()
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        X = sensor_matrix(max(sizes))
+
+        if not np.array_equal(model.predict(X), forest.predict(X)):
+            self.stderr.write(self.style.ERROR("Compiled forest disagrees with sklearn"))
+            return
+
+        self.stdout.write(f"{'batch':>7} {'sklearn p50':>12} {'compiled p50':>13} {'speedup':>8} {'compiled p99':>13}")
+        with warnings.catch_warnings():
+            # sklearn complains that a bare ndarray has no feature names
+            warnings.simplefilter("ignore", UserWarning)
+            for size in sizes:
+                batch = X[:size]
+                repeat = max(5, options["repeat"] * 100 // max(size, 100))
+                reference = percentiles_ms(timings(lambda: model.predict(batch), repeat))
+                compiled = percentiles_ms(timings(lambda: forest.predict(batch), repeat))
+                self.stdout.write(
+                    f"{size:>7} {reference['p50']:>10.3f}ms {compiled['p50']:>11.3f}ms "
+                    f"{reference['p50'] / compiled['p50']:>7.1f}x {compiled['p99']:>11.3f}ms"
+                )
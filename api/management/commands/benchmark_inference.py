@@ -0,0 +1,119 @@
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ml_model, registry
+from api.bench import compare, percentiles_ms, sensor_matrix, timings
+from api.ml_model import FEATURES
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Offline benchmark of the scoring path (load time, latency percentiles, batch "
+        "throughput, allocations, dict-to-array cost); optionally compared with a baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=2000, help="Calls per latency measurement")
+        parser.add_argument("--sizes", default="1,10,100,1000", help="Batch sizes for throughput")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for resampling sensor_data.csv")
+        parser.add_argument("--output", help="Write results as JSON to this file")
+        parser.add_argument("--baseline", help="JSON written by an earlier --output run")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Fail if a metric is worse than the baseline by more than this fraction")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        X = sensor_matrix(max(max(sizes), options["repeat"]), seed=options["seed"])
+        readings = [dict(zip(FEATURES, map(float, row))) for row in X]
+        version = ml_model.served_model().version
+        metrics = {}
+
+        def record(name, value, unit, better="lower"):
+            metrics[name] = {"value": float(value), "unit": unit, "better": better}
+
+        # Model load: compiled forest (what workers serve) and the sklearn pickle
+        record("load_forest_ms", np.median(timings(lambda: registry.load_forest(version), 5, warmup=1)) * 1000, "ms")
+        record("load_sklearn_ms", np.median(timings(lambda: registry.load_model(version), 5, warmup=1)) * 1000, "ms")
+
+        # Single-reading latency through the public API, one fixed reading per call
+        samples = np.empty(options["repeat"])
+        for reading in readings[:20]:
+            ml_model.predict_accident(reading)
+        for i in range(options["repeat"]):
+            started = time.perf_counter()
+            ml_model.predict_accident(readings[i])
+            samples[i] = time.perf_counter() - started
+        for point, value in percentiles_ms(samples).items():
+            record(f"predict_accident_{point}_ms", value, "ms")
+
+        # Batch throughput via predict_accidents
+        for size in sizes:
+            batch = readings[:size]
+            seconds = np.median(timings(lambda: ml_model.predict_accidents(batch), max(20, 20000 // size)))
+            record(f"batch_{size}_rows_per_s", size / seconds, "rows/s", better="higher")
+
+        # Python heap allocated while scoring one reading (numpy buffers included)
+        tracemalloc.start()
+        peaks = []
+        for reading in readings[:200]:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            ml_model.predict_accident(reading)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+        record("predict_accident_alloc_peak_bytes", np.median(peaks), "bytes")
+
+        # Building the float32 feature row(s) from request dicts
+        reading = readings[0]
+        seconds = np.median(timings(lambda: np.array([reading[name] for name in FEATURES], dtype=np.float32), 5000))
+        record("dict_to_array_1_us", seconds * 1e6, "us")
+        batch = readings[:1000]
+        seconds = np.median(timings(
+            lambda: np.array([[row[name] for name in FEATURES] for row in batch], dtype=np.float32), 50
+        ))
+        record("dict_to_array_1000_us", seconds * 1e6, "us")
+
+        results = {
+            "commit": git_commit(),
+            "model_version": version,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "metrics": metrics,
+        }
+        for name, metric in metrics.items():
+            self.stdout.write(f"{name:<36} {metric['value']:>14,.3f} {metric['unit']}")
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            regressions = compare(results, baseline, options["threshold"])
+            for name, before, after, change in regressions:
+                self.stderr.write(self.style.ERROR(f"{name}: {before:,.3f} -> {after:,.3f} ({change:+.0%} worse)"))
+            if regressions:
+                raise CommandError(
+                    f"{len(regressions)} metric(s) regressed more than {options['threshold']:.0%} "
+                    f"against {baseline.get('commit') or options['baseline']}"
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f"No regressions beyond {options['threshold']:.0%} against {baseline.get('commit') or options['baseline']}"
+            ))
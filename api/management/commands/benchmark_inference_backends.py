@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.bench import percentiles_ms, sensor_matrix
+from api.cascade import cascade_predict
+from api.inference import ProcessPoolBackend
+from api.ml_model import served_model
+
+
+class Command(BaseCommand):
+    help = "p50/p95/p99 scoring latency under concurrent load, in-process vs process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16, help="Concurrent request threads")
+        parser.add_argument("--requests", type=int, default=4000, help="Total single-row predictions per mode")
+        parser.add_argument("--batch", type=int, default=1, help="Rows per prediction")
+        parser.add_argument("--processes", type=int, default=2)
+
+    def handle(self, *args, **options):
+        served = served_model()
+        rows = sensor_matrix(options["requests"] * options["batch"]).astype(np.float32)
+        batches = rows.reshape(options["requests"], options["batch"], -1)
+
+        backend = ProcessPoolBackend(processes=options["processes"])
+        backend.warm()
+        modes = {
+            "inline": lambda X: cascade_predict(served.forest, served.gate, X),
+            "process": backend.predict,
+        }
+        self.stdout.write(
+            f"{options['threads']} threads, {options['requests']} predictions of {options['batch']} row(s)\n"
+            f"{'mode':<8} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8}   neighbour p99"
+        )
+        try:
+            for name, predict in modes.items():
+                result = self.run(predict, batches, options["threads"])
+                self.stdout.write(
+                    f"{name:<8} {result['p50']:>6.2f}ms {result['p95']:>6.2f}ms {result['p99']:>6.2f}ms "
+                    f"{result['throughput']:>8.0f}   {result['neighbour_p99']:.2f}ms"
+                )
+        finally:
+            backend.reset()
+
+    def run(self, predict, batches, threads):
+        latencies = np.empty(len(batches))
+        neighbour = []
+        done = threading.Event()
+
+        def call(i):
+            started = time.perf_counter()
+            predict(batches[i])
+            latencies[i] = time.perf_counter() - started
+
+        def other_request():
+            # Pure-Python work standing in for an unrelated request on the
+            # same worker; its latency shows how long the GIL is held.
+            payload = {"status": True, "alerts": [{"id": i, "severity": "low"} for i in range(50)]}
+            while not done.is_set():
+                started = time.perf_counter()
+                json.dumps(payload)
+                neighbour.append(time.perf_counter() - started)
+                time.sleep(0.001)
+
+        watcher = threading.Thread(target=other_request)
+        watcher.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(call, range(len(batches))))
+        elapsed = time.perf_counter() - started
+        done.set()
+        watcher.join()
+
+        result = percentiles_ms(latencies)
+        result["throughput"] = len(batches) / elapsed
+        result["neighbour_p99"] = percentiles_ms(np.array(neighbour))["p99"]
+        return result
@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from api import geo
+from api.models import AccidentReport
+
+# (lat, lon) of the synthetic hot spots; the rest of the points are uniform
+CITIES = [(17.385, 78.4867), (19.076, 72.8777), (28.6139, 77.209), (12.9716, 77.5946), (51.5072, -0.1276)]
+
+
+class Command(BaseCommand):
+    help = "Radius search over N synthetic reports on a throwaway test database: grid-cell index vs full scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=2_000_000)
+        parser.add_argument("--queries", type=int, default=50)
+        parser.add_argument("--radii", default="1,5,20", help="Search radii in km")
+
+    def handle(self, *args, **options):
+        # Never touch the real database: run everything on a fresh test DB
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.fill(options["points"])
+            self.measure(options["queries"], [float(r) for r in options["radii"].split(",")])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def fill(self, points):
+        rng = np.random.default_rng(0)
+        now = timezone.now()
+        started = time.perf_counter()
+        for offset in range(0, points, 50_000):
+            size = min(50_000, points - offset)
+            # 80% clustered around cities, 20% spread over the globe
+            city = rng.integers(0, len(CITIES), size)
+            lats = np.array(CITIES)[city, 0] + rng.normal(0, 0.15, size)
+            lons = np.array(CITIES)[city, 1] + rng.normal(0, 0.15, size)
+            spread = rng.random(size) < 0.2
+            lats[spread] = rng.uniform(-60, 70, spread.sum())
+            lons[spread] = rng.uniform(-180, 180, spread.sum())
+            cells = geo.cells(lats, lons)
+            stamp = now - timezone.timedelta(minutes=offset // 1000)
+            AccidentReport.objects.bulk_create(
+                AccidentReport(latitude=float(lat), longitude=float(lon), geo_cell=int(cell),
+                               severity="high", timestamp=stamp)
+                for lat, lon, cell in zip(lats, lons, cells)
+            )
+        self.stdout.write(f"Inserted {points:,} reports in {time.perf_counter() - started:.1f}s")
+
+    def measure(self, queries, radii):
+        rng = np.random.default_rng(1)
+        centres = [CITIES[i % len(CITIES)] for i in range(queries)]
+        centres = [(lat + rng.normal(0, 0.05), lon + rng.normal(0, 0.05)) for lat, lon in centres]
+        rows = AccidentReport.objects.all()
+
+        # Baseline: what a query without an index has to do, one full pass
+        started = time.perf_counter()
+        coords = np.array(list(rows.values_list("latitude", "longitude")))
+        scan_ms = (time.perf_counter() - started) * 1000
+        lat, lon = centres[0]
+        started = time.perf_counter()
+        geo.haversine_km(lat, lon, coords[:, 0], coords[:, 1])
+        scan_ms += (time.perf_counter() - started) * 1000
+        self.stdout.write(f"full scan + haversine over {len(coords):,} rows: {scan_ms:,.0f} ms per query")
+
+        self.stdout.write(f"{'radius':>8} {'p50':>9} {'p95':>9} {'candidates':>11} {'matches':>9}   (grid-cell index, nearest 100 rows)")
+        for radius in radii:
+            samples, candidates, matches = [], [], []
+            for lat, lon in centres:
+                started = time.perf_counter()
+                found = geo.nearby(rows, lat, lon, radius)
+                samples.append(time.perf_counter() - started)
+                candidates.append(found.candidates)
+                # Exactness check against the full scan
+                expected = int((geo.haversine_km(lat, lon, coords[:, 0], coords[:, 1]) <= radius).sum())
+                if found.matches != expected:
+                    self.stderr.write(self.style.ERROR(f"mismatch at ({lat}, {lon}, {radius}): {found.matches} != {expected}"))
+                matches.append(found.matches)
+            self.stdout.write(
+                f"{radius:>6.1f}km {np.percentile(samples, 50) * 1000:>7.1f}ms {np.percentile(samples, 95) * 1000:>7.1f}ms "
+                f"{np.mean(candidates):>11,.0f} {np.mean(matches):>9,.0f}"
+            )
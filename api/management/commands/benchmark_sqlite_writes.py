@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from api import commit_queue
+from api.models import AccidentReport
+
+# journal/pragma settings per mode; "production" is what settings.py applies
+MODES = {
+    "default": ({}, False),
+    "wal": (None, False),
+    "production": (None, True),
+}
+
+
+def production_options():
+    """The OPTIONS settings.py sets in production mode"""
+    return {
+        "init_command": (
+            "PRAGMA journal_mode=WAL;"
+            f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS};"
+            f"PRAGMA cache_size=-{settings.SQLITE_CACHE_MB * 1024};"
+            f"PRAGMA mmap_size={settings.SQLITE_MMAP_MB * 1024 * 1024};"
+            "PRAGMA temp_store=MEMORY;"
+        ),
+        "transaction_mode": "IMMEDIATE",
+        "timeout": settings.SQLITE_BUSY_TIMEOUT_SECONDS,
+    }
+
+
+def configure(mode):
+    options, queue = MODES[mode]
+    connection.close()
+    connection.settings_dict["OPTIONS"] = production_options() if options is None else options
+    settings.SQLITE_COMMIT_QUEUE = queue
+
+
+def worker(mode, threads, seconds, seed):
+    """One 'gunicorn worker': `threads` request threads inserting reports for `seconds`"""
+    configure(mode)
+    rng = np.random.default_rng(seed)
+    deadline = time.perf_counter() + seconds
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def requests(points):
+        done, failed = [], 0
+        try:
+            for lat, lon in points:
+                if time.perf_counter() > deadline:
+                    break
+                started = time.perf_counter()
+                try:
+                    commit_queue.create(AccidentReport, latitude=float(lat), longitude=float(lon), severity="high",
+                                        reported_via="manual")
+                    done.append(time.perf_counter() - started)
+                except OperationalError:
+                    failed += 1
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(done)
+            errors.append(failed)
+
+    points = [zip(rng.uniform(-60, 70, 100_000), rng.uniform(-180, 180, 100_000)) for _ in range(threads)]
+    pool = [threading.Thread(target=requests, args=(p,)) for p in points]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies, sum(errors)
+
+
+class Command(BaseCommand):
+    help = "Concurrent report inserts from several processes into a scratch SQLite file, per SQLite mode"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--threads", type=int, default=8, help="Request threads per process")
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--modes", default="default,wal,production", help=f"Comma-separated: {', '.join(MODES)}")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This benchmark is about SQLite; point DATABASE_URL at a sqlite:// URL")
+        modes = [mode.strip() for mode in options["modes"].split(",")]
+        if set(modes) - set(MODES):
+            raise CommandError(f"--modes must be a subset of: {', '.join(MODES)}")
+
+        old_name, old_options = connection.settings_dict["NAME"], connection.settings_dict.get("OPTIONS", {})
+        processes, threads, seconds = options["processes"], options["threads"], options["seconds"]
+        self.stdout.write(f"{processes} processes x {threads} threads, {seconds:g}s per mode")
+        self.stdout.write(f"{'mode':<12} {'writes/s':>9} {'errors':>8} {'error %':>8} {'p50':>8} {'p99':>8}")
+        try:
+            for mode in modes:
+                # A fresh scratch database per mode, never the real one
+                with tempfile.TemporaryDirectory() as directory:
+                    connection.close()
+                    connection.settings_dict["NAME"] = os.path.join(directory, "bench.sqlite3")
+                    configure(mode)
+                    call_command("migrate", verbosity=0)
+                    connection.close()
+                    with multiprocessing.get_context("fork").Pool(processes) as pool:
+                        results = pool.starmap(worker, [(mode, threads, seconds, seed) for seed in range(processes)])
+                    self.report(mode, results, seconds)
+        finally:
+            connection.close()
+            connection.settings_dict["NAME"], connection.settings_dict["OPTIONS"] = old_name, old_options
+
+    def report(self, mode, results, seconds):
+        latencies = np.array([latency for done, _ in results for latency in done])
+        errors = sum(failed for _, failed in results)
+        attempts = len(latencies) + errors
+        p50, p99 = (np.percentile(latencies, [50, 99]) * 1000) if len(latencies) else (0, 0)
+        self.stdout.write(
+            f"{mode:<12} {len(latencies) / seconds:>9,.0f} {errors:>8,} {100 * errors / max(attempts, 1):>7.1f}% "
+            f"{p50:>6.1f}ms {p99:>6.1f}ms"
+        )
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from api import rollups
+from api.caching import cached
+from api.models import BLEAlert, CloudAlert
+from api.statistics import compute_alert_statistics
+
+
+def legacy_statistics():
+    """The per-count queries AlertStatisticsView used to run (17 of them)"""
+    now = timezone.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    counts = []
+    for model in (BLEAlert, CloudAlert):
+        counts.append(model.objects.count())
+        for start in (today, now - timezone.timedelta(hours=24), now - timezone.timedelta(days=7)):
+            counts.append(model.objects.filter(timestamp__gte=start).count())
+    counts += [BLEAlert.objects.filter(severity=severity).count() for severity in ("high", "medium", "low")]
+    counts.append(CloudAlert.objects.filter(is_emergency=True).count())
+    counts += [CloudAlert.objects.filter(status=state).count() for state in ("sent", "delivered", "failed")]
+    return counts
+
+
+class Command(BaseCommand):
+    help = "Time the alert statistics queries on a throwaway test database filled with N alerts per table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Alerts per table")
+        parser.add_argument("--days", type=int, default=60, help="Spread timestamps over this many days")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--clients", type=int, default=32, help="Concurrent refreshes in the burst test")
+
+    def handle(self, *args, **options):
+        # Never touch the real database: run everything on a fresh test DB
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.fill(options["rows"], options["days"])
+            self.measure(options["repeat"], options["clients"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def fill(self, rows, days):
+        rng = np.random.default_rng(0)
+        now = timezone.now()
+        started = time.perf_counter()
+        for offset in range(0, rows, 20_000):
+            size = min(20_000, rows - offset)
+            ages = rng.uniform(0, days * 86400, size)
+            severities = rng.choice(["high", "medium", "low"], size)
+            states = rng.choice(["sent", "delivered", "failed", "read"], size)
+            emergency = rng.random(size) < 0.3
+            stamps = [now - timezone.timedelta(seconds=float(age)) for age in ages]
+            BLEAlert.objects.bulk_create(
+                BLEAlert(severity=s, timestamp=t) for s, t in zip(severities, stamps)
+            )
+            CloudAlert.objects.bulk_create(
+                CloudAlert(device_token="bench", status=s, is_emergency=bool(e), timestamp=t)
+                for s, e, t in zip(states, emergency, stamps)
+            )
+        self.stdout.write(f"Inserted {rows:,} alerts per table in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        buckets = rollups.rebuild()
+        self.stdout.write(f"Rolled up into {buckets:,} buckets in {time.perf_counter() - started:.1f}s")
+
+    def timed(self, fn, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+        return np.median(samples) * 1000
+
+    def measure(self, repeat, clients):
+        legacy_statistics()  # warm the page cache for both
+        self.stdout.write(f"{'17 COUNT queries':<28} {self.timed(legacy_statistics, repeat):>9.1f} ms")
+        self.stdout.write(f"{'rollups + edge queries':<28} {self.timed(compute_alert_statistics, repeat):>9.1f} ms")
+
+        # A burst of dashboard refreshes against a cold cache
+        computed = []
+
+        def compute():
+            computed.append(1)
+            return compute_alert_statistics()
+
+        def refresh():
+            try:
+                cached("alert-statistics-bench", compute, ttl=5)
+            finally:
+                connection.close()
+
+        cache.delete("alert-statistics-bench")
+        threads = [threading.Thread(target=refresh) for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"{clients} concurrent refreshes: {len(computed)} computation(s), {elapsed:.1f} ms total")
+        self.stdout.write(
+            f"{'cached read':<28} {self.timed(lambda: cached('alert-statistics-bench', compute, 5), 1000):>9.3f} ms"
+        )
+        cache.delete("alert-statistics-bench")
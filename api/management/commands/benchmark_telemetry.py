@@ -0,0 +1,54 @@
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import telemetry
+
+
+class Command(BaseCommand):
+    help = "Write throughput and per-device query latency of the telemetry store, in a scratch directory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--devices", type=int, default=1000)
+        parser.add_argument("--seconds", type=int, default=600, help="Simulated seconds of 50 Hz samples per device")
+        parser.add_argument("--flush-seconds", type=float, default=2, help="Simulated seconds per flush")
+        parser.add_argument("--queries", type=int, default=200)
+
+    def handle(self, *args, **options):
+        devices, seconds, rate = options["devices"], options["seconds"], 50
+        per_flush = int(options["flush_seconds"] * rate)
+        start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        rng = np.random.default_rng(0)
+        names = [f"device-{i}" for i in range(devices)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            writer = telemetry.TelemetryWriter(flush_samples=10**12, flush_seconds=3600)
+            written, elapsed, flushes = 0, 0.0, 0
+            for offset in range(0, seconds * rate, per_flush):
+                received = start + timezone.timedelta(seconds=(offset + per_flush) / rate)
+                times = telemetry.sample_times(per_flush, received=received, sample_rate=rate)
+                with writer.lock:
+                    # Bypass append() so no flusher thread starts
+                    writer.pending = [(name, times, rng.normal(size=(per_flush, 6)).astype(np.float32)) for name in names]
+                started = time.perf_counter()
+                written += writer.flush(root=root)
+                elapsed += time.perf_counter() - started
+                flushes += 1
+            size = sum(path.stat().st_size for path in root.rglob("*") if path.is_file())
+
+            latencies = []
+            end = start + timezone.timedelta(seconds=seconds)
+            for name in rng.choice(names, options["queries"]):
+                started = time.perf_counter()
+                _, rows = telemetry.samples(str(name), start, end, root=root)
+                latencies.append(time.perf_counter() - started)
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+
+        self.stdout.write(f"{devices:,} devices x {seconds:,}s at {rate} Hz = {written:,} samples in {flushes:,} flushes")
+        self.stdout.write(f"write: {written / elapsed:,.0f} samples/s including fsync, {size / written:.1f} bytes/sample on disk")
+        self.stdout.write(f"query one device's {len(rows):,} samples: p50 {p50:.1f}ms, p99 {p99:.1f}ms")
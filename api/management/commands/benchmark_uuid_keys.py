@@ -0,0 +1,103 @@
+import os
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from api import ids
+
+
+def key_table(version):
+    """A throwaway model shaped like the alert tables: UUID pk plus a (timestamp, id) index"""
+    name = f"bench_keys_{version}"
+    meta = type("Meta", (), {
+        "app_label": "api",
+        "db_table": name,
+        "indexes": [models.Index(fields=["timestamp", "id"], name=f"{name}_ts")],
+    })
+    return type(f"BenchKeys{version.upper()}", (models.Model,), {
+        "__module__": __name__,
+        "Meta": meta,
+        "id": models.UUIDField(primary_key=True),
+        "timestamp": models.DateTimeField(),
+        "value": models.FloatField(),
+    })
+
+
+def index_sizes(table):
+    """{index or table name: bytes} on SQLite (dbstat) and Postgres"""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name = %s) GROUP BY name", [table]
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT c.relname, pg_relation_size(c.oid) FROM pg_class c "
+                "LEFT JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.oid = %s::regclass OR i.indrelid = %s::regclass", [table, table]
+            )
+        else:
+            return {}
+        return dict(cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = "Insert throughput and index size with random (v4) vs time-ordered (v7) UUID keys, on a throwaway test DB"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000_000)
+        parser.add_argument("--batch", type=int, default=10_000, help="Rows per INSERT transaction")
+
+    def handle(self, *args, **options):
+        # Never touch the real database: run everything on a fresh test DB
+        old_name = connection.settings_dict["NAME"]
+        if connection.vendor == "sqlite":
+            # On disk: an in-memory test DB would hide the page cache misses
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tempfile.gettempdir(), "benchmark_uuid_keys.sqlite3")
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"{connection.vendor}, {options['rows']:,} rows, {options['batch']:,} per transaction")
+            self.stdout.write(f"{'key':<4} {'rows/s':>10} {'last 10%':>10} {'pk index':>10} {'ts index':>10} {'table':>10}")
+            for version, make_key in (("v4", uuid.uuid4), ("v7", ids.uuid7)):
+                self.measure(version, make_key, options["rows"], options["batch"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def measure(self, version, make_key, rows, batch):
+        model = key_table(version)
+        with connection.schema_editor() as editor:
+            editor.create_model(model)
+        rng = np.random.default_rng(0)
+        start = timezone.now()
+        samples = []
+        for offset in range(0, rows, batch):
+            size = min(batch, rows - offset)
+            values = rng.random(size)
+            objs = [
+                model(id=make_key(), timestamp=start + timezone.timedelta(microseconds=offset + i), value=float(v))
+                for i, v in enumerate(values)
+            ]
+            started = time.perf_counter()
+            with transaction.atomic():
+                model.objects.bulk_create(objs, batch_size=2000)
+            samples.append((size, time.perf_counter() - started))
+
+        total = sum(n for n, _ in samples) / sum(t for _, t in samples)
+        tail = samples[-max(1, len(samples) // 10):]
+        tail_rate = sum(n for n, _ in tail) / sum(t for _, t in tail)
+        sizes = index_sizes(model._meta.db_table)
+        pk = sum(size for name, size in sizes.items() if "autoindex" in name or name.endswith("_pkey"))
+        ts = sizes.get(f"{model._meta.db_table}_ts", 0)
+        table = sizes.get(model._meta.db_table, 0)
+        mib = 1024 * 1024
+        self.stdout.write(
+            f"{version:<4} {total:>10,.0f} {tail_rate:>10,.0f} {pk / mib:>8.1f}Mi {ts / mib:>8.1f}Mi {table / mib:>8.1f}Mi"
+        )
+        with connection.schema_editor() as editor:
+            editor.delete_model(model)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api import routing
+
+
+class Command(BaseCommand):
+    help = "Probe each configured read replica and show whether reads would be routed to it"
+
+    def handle(self, *args, **options):
+        aliases = routing.replica_aliases()
+        if not aliases:
+            self.stdout.write("No replicas configured (set DATABASE_REPLICA_URLS); all reads use the primary")
+            return
+        self.stdout.write(f"max lag {routing.max_lag():g}s")
+        for alias in aliases:
+            reachable, lag = routing.probe(alias)
+            name = connections[alias].settings_dict["NAME"]
+            if not reachable:
+                verdict = self.style.ERROR("unreachable, reads use the primary")
+            elif lag > routing.max_lag():
+                verdict = self.style.WARNING(f"{lag:.1f}s behind, reads use the primary")
+            else:
+                verdict = self.style.SUCCESS(f"{lag:.1f}s behind, in use")
+            self.stdout.write(f"{alias} ({name}): {verdict}")
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import joblib
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from api import registry
+from api.cascade import gate_report, learn_gate
+from api.ml_model import FEATURES, heartbeat_dir
+
+
+class Command(BaseCommand):
+    help = "List, import and activate accident model versions, and show what each worker serves"
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest="action", required=True)
+        actions.add_parser("list", help="Show every registered version")
+        activate = actions.add_parser("activate", help="Atomically switch workers to a version")
+        activate.add_argument("version")
+        status = actions.add_parser("status", help="Show which version each worker is serving")
+        status.add_argument("--prune", action="store_true", help="Delete heartbeats of dead workers")
+        imported = actions.add_parser("import", help="Register an existing pickled model")
+        imported.add_argument("path")
+        imported.add_argument("--data", help="CSV with a label column to record accuracy on")
+        imported.add_argument("--activate", action="store_true")
+        gate = actions.add_parser("learn-gate", help="Learn the cascade gate for a version and report its effect")
+        gate.add_argument("version")
+        gate.add_argument("--data", required=True, help="Training CSV with a label column")
+
+    def handle(self, *args, **options):
+        try:
+            getattr(self, "handle_" + options["action"].replace("-", "_"))(**options)
+        except registry.RegistryError as e:
+            raise CommandError(str(e))
+
+    def handle_list(self, **options):
+        active = registry.active_version()
+        for meta in registry.list_versions():
+            marker = "*" if meta["version"] == active else " "
+            metrics = ", ".join(f"{k}={v:.4f}" for k, v in meta["metrics"].items())
+            self.stdout.write(
+                f"{marker} {meta['version']:<6} {meta['created_at']}  {meta['n_estimators']} trees  "
+                f"sha256={meta['sha256']['model.pkl'][:12]}  {metrics}"
+            )
+
+    def handle_activate(self, version, **options):
+        registry.activate_version(version)
+        self.stdout.write(self.style.SUCCESS(f"Activated {version}; workers switch on their next check"))
+
+    def handle_status(self, prune=False, **options):
+        self.stdout.write(f"Active version: {registry.active_version()}")
+        workers = heartbeat_dir()
+        for worker in registry.worker_status(workers=workers):
+            if prune and worker["alive"] is False:
+                registry.remove_heartbeat(worker, workers=workers)
+                continue
+            alive = {True: "alive", False: "dead", None: "remote"}[worker["alive"]]
+            updated = datetime.fromtimestamp(worker["updated_at"]).isoformat(timespec="seconds")
+            self.stdout.write(f"  {worker['host']}:{worker['pid']:<8} {worker['version']:<6} {alive:<7} since {updated}")
+
+    def handle_import(self, path, data=None, activate=False, **options):
+        model = joblib.load(path)
+        metrics = {}
+        if data:
+            frame = pd.read_csv(data)
+            metrics["accuracy"] = float(model.score(frame[FEATURES], frame["label"]))
+        meta = registry.register(model, FEATURES, metrics=metrics, activate=activate, extra={"source": str(path)})
+        self.stdout.write(self.style.SUCCESS(f"Registered {meta['version']}" + (" (active)" if activate else "")))
+
+    def handle_learn_gate(self, version, data, **options):
+        forest = registry.load_forest(version)
+        frame = pd.read_csv(data)
+        X, y = frame[FEATURES].to_numpy(), frame["label"].to_numpy()
+        gate = learn_gate(forest, X, y)
+        if gate is None:
+            raise CommandError("No box the forest provably labels normal; version left without a gate")
+        report = gate_report(forest, gate, X, y)
+        metrics = registry.read_meta(version)["metrics"]
+        metrics.update({"gate_" + key: value for key, value in report.items()})
+        registry.update_meta(version, gate=gate.to_dict(), metrics=metrics)
+        self.stdout.write(self.style.SUCCESS(
+            f"{version}: gate short-circuits {report['short_circuited']:.1%} of rows, "
+            f"accident recall {report['recall_forest']:.4f} -> {report['recall_cascade']:.4f}"
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.rollups import floor_hour, rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly rollup buckets from the raw alert and accident tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Only rebuild hours from this ISO 8601 datetime on (default: all)")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError("--since must be an ISO 8601 datetime")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            # Rebuild whole buckets only
+            since = floor_hour(since)
+
+        started = time.perf_counter()
+        buckets = rebuild(since)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {buckets:,} buckets" + (f" from {since.isoformat()}" if since else "")
+            + f" in {time.perf_counter() - started:.1f}s"
+        ))
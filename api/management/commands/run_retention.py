@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import retention
+from api.export import EXPORTS
+
+
+class Command(BaseCommand):
+    help = "Expire finished BLE broadcasts, archive + delete rows and prune telemetry past their retention horizon"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", default="expire,archive,telemetry", help="Comma-separated: expire, archive, telemetry")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+        parser.add_argument("--no-archive", action="store_true", help="Delete expired rows without writing archive files")
+        parser.add_argument("--loop", type=float, default=0, help="Run every N seconds instead of once")
+
+    def handle(self, *args, **options):
+        jobs = {job.strip() for job in options["jobs"].split(",") if job.strip()}
+        if not jobs or jobs - {"expire", "archive", "telemetry"}:
+            raise CommandError("--jobs must be a comma-separated subset of: expire, archive, telemetry")
+        while True:
+            self.run_once(jobs, options)
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
+
+    def timed(self, label, job, **kwargs):
+        started = time.perf_counter()
+        rows = job(**kwargs)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:<24} {rows:>10,} rows in {elapsed:6.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    def run_once(self, jobs, options):
+        batch = {"batch_size": options["batch_size"], "pause": options["pause"]}
+        if "expire" in jobs:
+            self.timed("expire ble-alerts", retention.expire_ble_alerts, **batch)
+        if "archive" in jobs:
+            for kind in EXPORTS:
+                if retention.retention_days(kind):
+                    self.timed(f"archive {kind}", retention.archive_and_delete, kind=kind,
+                               archive=not options["no_archive"], **batch)
+        if "telemetry" in jobs:
+            self.timed("prune telemetry", retention.prune_telemetry)
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import registry
+from api.training import TrainingError, train
+
+
+class Command(BaseCommand):
+    help = "Train the accident model from a (large) sensor CSV and register it as a new version"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--data", default="sensor_data.csv", help="CSV or columnar directory with sensor columns and a label column")
+        parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+        parser.add_argument("--trees", type=int, default=100, help="Forest size (in-memory mode)")
+        parser.add_argument("--incremental", action="store_true",
+                            help="Out-of-core: grow --trees-per-chunk trees on each chunk")
+        parser.add_argument("--trees-per-chunk", type=int, default=10)
+        parser.add_argument("--max-rows", type=int, default=None)
+        parser.add_argument("--test-every", type=int, default=5, help="Hold out every Nth row")
+        parser.add_argument("--jobs", type=int, default=-1, help="Cores to train on (-1: all)")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--activate", action="store_true", help="Serve the new version immediately")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Training on {options['data']}" + (" (incremental)" if options["incremental"] else ""))
+        try:
+            model, metrics, gate = train(
+                options["data"],
+                chunk_rows=options["chunk_rows"],
+                n_estimators=options["trees"],
+                incremental=options["incremental"],
+                trees_per_chunk=options["trees_per_chunk"],
+                test_every=options["test_every"],
+                max_rows=options["max_rows"],
+                seed=options["seed"],
+                n_jobs=options["jobs"],
+                log=self.stdout.write,
+            )
+        except TrainingError as e:
+            raise CommandError(str(e))
+        meta = registry.register(
+            model, registry.FEATURES, metrics=metrics, activate=options["activate"],
+            extra={"gate": gate.to_dict() if gate else None, "source": str(options["data"])},
+        )
+        self.stdout.write(
+            f"rows={metrics['rows']:,} trees={metrics['n_estimators']} "
+            f"accuracy={metrics['test_accuracy']:.4f} recall={metrics['test_recall']:.4f}\n"
+            f"wall={metrics['wall_seconds']:.1f}s peak_rss={metrics['peak_rss_mb']:.0f} MiB"
+        )
+        if gate is not None:
+            self.stdout.write(f"gate short-circuits {metrics['gate_short_circuited']:.1%} of held-out rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Registered {meta['version']}" + (" (active)" if options["activate"] else
+                                               f"; activate with: manage.py model_registry activate {meta['version']}")
+        ))
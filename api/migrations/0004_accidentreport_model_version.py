@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_alter_blealert_options_alter_cloudalert_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accidentreport",
+            name="model_version",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+    ]
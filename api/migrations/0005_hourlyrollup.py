@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    from api.rollups import rebuild
+
+    rebuild(
+        sources=[apps.get_model("api", name) for name in ("BLEAlert", "CloudAlert", "AccidentReport")],
+        rollup_model=apps.get_model("api", "HourlyRollup"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_accidentreport_model_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="blealert",
+            name="timestamp",
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name="cloudalert",
+            name="timestamp",
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name="HourlyRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("hour", models.DateTimeField()),
+                ("channel", models.CharField(max_length=20)),
+                ("severity", models.CharField(blank=True, default="", max_length=20)),
+                ("status", models.CharField(blank=True, default="", max_length=50)),
+                ("is_emergency", models.BooleanField(default=False)),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["channel", "hour"], name="api_hourlyr_channel_24a1b0_idx")],
+                "constraints": [models.UniqueConstraint(fields=("hour", "channel", "severity", "status", "is_emergency"), name="unique_rollup_bucket")],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
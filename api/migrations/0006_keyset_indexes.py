@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_hourlyrollup"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="blealert",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name="cloudalert",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="accidentreport",
+            index=models.Index(fields=["timestamp", "id"], name="api_acciden_timesta_0268c7_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="blealert",
+            index=models.Index(fields=["timestamp", "id"], name="api_blealer_timesta_2d02ff_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="cloudalert",
+            index=models.Index(fields=["timestamp", "id"], name="api_cloudal_timesta_9deebf_idx"),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:22
+
+import numpy as np
+from django.db import migrations, models
+
+BATCH = 5000
+
+
+def backfill_geo_cells(apps, schema_editor):
+    from api.geo import cells
+
+    for name in ("AccidentReport", "BLEAlert"):
+        model = apps.get_model("api", name)
+        rows = model.objects.filter(latitude__isnull=False, longitude__isnull=False).order_by("pk")
+        last = None
+        while True:
+            batch = list((rows.filter(pk__gt=last) if last else rows).values_list("pk", "latitude", "longitude")[:BATCH])
+            if not batch:
+                break
+            pks, lats, lons = zip(*batch)
+            computed = cells(np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64))
+            model.objects.bulk_update(
+                [model(pk=pk, geo_cell=int(cell)) for pk, cell in zip(pks, computed)], ["geo_cell"]
+            )
+            last = pks[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accidentreport",
+            name="geo_cell",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="blealert",
+            name="geo_cell",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        # Fill existing rows before the indexes exist, so the updates don't maintain them
+        migrations.RunPython(backfill_geo_cells, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="accidentreport",
+            index=models.Index(fields=["geo_cell", "timestamp"], name="api_acciden_geo_cel_0c45ad_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="blealert",
+            index=models.Index(fields=["geo_cell", "timestamp"], name="api_blealer_geo_cel_6fc57e_idx"),
+        ),
+    ]
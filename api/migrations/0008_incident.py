@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:25
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_geo_cell"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Incident",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                ("geo_cell", models.IntegerField()),
+                ("severity", models.CharField(default="low", max_length=50)),
+                ("opened_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_report_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("report_count", models.IntegerField(default=1)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["geo_cell", "last_report_at"], name="api_inciden_geo_cel_814b9a_idx")],
+            },
+        ),
+        migrations.AddField(
+            model_name="accidentreport",
+            name="incident",
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="reports", to="api.incident"),
+        ),
+    ]
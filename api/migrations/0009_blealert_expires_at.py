@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:29
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+BATCH = 5000
+
+
+def backfill_expires_at(apps, schema_editor):
+    BLEAlert = apps.get_model("api", "BLEAlert")
+    rows = BLEAlert.objects.order_by("pk")
+    last = None
+    while True:
+        batch = list((rows.filter(pk__gt=last) if last else rows).values_list("pk", "timestamp", "broadcast_duration")[:BATCH])
+        if not batch:
+            break
+        BLEAlert.objects.bulk_update(
+            [BLEAlert(pk=pk, expires_at=timestamp + timedelta(seconds=duration or 0)) for pk, timestamp, duration in batch],
+            ["expires_at"],
+        )
+        last = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_incident"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blealert",
+            name="expires_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        # Fill existing rows before the index exists, so the updates don't maintain it
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="blealert",
+            index=models.Index(fields=["status", "expires_at"], name="api_blealer_status_8dc84e_idx"),
+        ),
+    ]
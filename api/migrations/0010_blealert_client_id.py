@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_blealert_expires_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blealert",
+            name="client_id",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
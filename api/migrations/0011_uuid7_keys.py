@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:33
+
+import api.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_blealert_client_id"),
+    ]
+
+    # The default is applied in Python, so there is nothing to change in the
+    # database; a plain AlterField of a primary key would rebuild every
+    # table on SQLite.
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name="accidentreport",
+                name="id",
+                field=models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False),
+            ),
+            migrations.AlterField(
+                model_name="blealert",
+                name="id",
+                field=models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False),
+            ),
+            migrations.AlterField(
+                model_name="cloudalert",
+                name="id",
+                field=models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False),
+            ),
+            migrations.AlterField(
+                model_name="incident",
+                name="id",
+                field=models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False),
+            ),
+        ]),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:01
+
+import re
+import struct
+from datetime import datetime, timedelta, timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH = 5000
+PREFIX = "Sensor data detected accident: "
+CHANNELS = ("acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y", "gyro_z")
+# api/readings.py's record: time (us since the epoch), channels, probability
+RECORD = struct.Struct("<q7f")
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_description(description):
+    """Channel values from "Sensor data detected accident: acc_x=1.0, ...", or None"""
+    values = dict(re.findall(r"(\w+)=([^,\s]+)", description[len(PREFIX):]))
+    try:
+        return [float(values[name]) for name in CHANNELS]
+    except (KeyError, ValueError):
+        return None
+
+
+def backfill_sensor_readings(apps, schema_editor):
+    AccidentReport = apps.get_model("api", "AccidentReport")
+    SensorReading = apps.get_model("api", "SensorReading")
+    rows = AccidentReport.objects.filter(description__startswith=PREFIX).order_by("pk")
+    last = None
+    while True:
+        batch = list((rows.filter(pk__gt=last) if last else rows).values_list("pk", "timestamp", "description")[:BATCH])
+        if not batch:
+            break
+        readings = []
+        for pk, timestamp, description in batch:
+            channels = parse_description(description)
+            if channels is None:
+                continue
+            micros = (timestamp - EPOCH) // timedelta(microseconds=1)
+            # The probability was never recorded for these
+            values = RECORD.pack(micros, *channels, float("nan"))
+            readings.append(SensorReading(report_id=pk, timestamp=timestamp, values=values))
+        SensorReading.objects.bulk_create(readings, ignore_conflicts=True)
+        last = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_uuid7_keys"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SensorReading",
+            fields=[
+                ("report", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="sensor_reading", serialize=False, to="api.accidentreport")),
+                ("timestamp", models.DateTimeField()),
+                ("values", models.BinaryField()),
+            ],
+            options={
+                "indexes": [models.Index(fields=["timestamp", "report"], name="api_sensorr_timesta_57ed77_idx")],
+            },
+        ),
+        migrations.RunPython(backfill_sensor_readings, migrations.RunPython.noop),
+    ]
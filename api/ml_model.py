@@ -1,17 +1,260 @@
-import joblib
 import numpy as np
 import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from . import registry
+from .cascade import Gate, cascade_predict
+from .inference import BatchScheduler, PoolUnavailable, ProcessPoolBackend
+from .registry import FEATURES
+
+# How often a worker stats the registry's ACTIVE file for a new version
+RELOAD_CHECK_SECONDS = getattr(settings, "MODEL_RELOAD_CHECK_SECONDS", 2.0)
+# How often a serving process refreshes its heartbeat file
+HEARTBEAT_SECONDS = getattr(settings, "MODEL_HEARTBEAT_SECONDS", 30.0)
+# Answer clearly-normal readings from the version's gate box (api/cascade.py)
+CASCADE_GATE = getattr(settings, "MODEL_CASCADE_GATE", True)
+
+ServedModel = namedtuple("ServedModel", ["version", "forest", "gate", "loaded_at"])
+
+_served = None
+_generation = None
+_next_check = 0.0
+_reloading = False
+_heartbeat_pid = None
+_next_heartbeat = 0.0
+_served_lock = threading.Lock()
+_sklearn_models = {}
+_cascade_counts = {"gated": 0, "scored": 0}
+_cascade_lock = threading.Lock()
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _timed_load(label, loader):
+    rss_before = _rss_bytes()
+    started = time.perf_counter()
+    loaded = loader()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    rss_after = _rss_bytes()
+    rss = f"{rss_after / 2**20:.1f} MiB" if rss_after else "n/a"
+    grown = f"{(rss_after - rss_before) / 2**20:+.1f} MiB" if rss_after and rss_before else "n/a"
+    print(f"🧠 [BACKEND] {label} loaded in {elapsed_ms:.1f} ms (pid {os.getpid()}, RSS {rss}, {grown})")
+    return loaded
+
+
+def heartbeat_dir():
+    """Where serving processes leave heartbeats (None: the registry's workers/)"""
+    return getattr(settings, "MODEL_HEARTBEAT_DIR", None)
+
+
+def _load_active():
+    generation = registry.generation()
+    version = registry.active_version()
+    if version is None:
+        raise registry.RegistryError(f"No active model version in {registry.REGISTRY_DIR}")
+    # The compiled arrays are memory-mapped read-only, so every worker on
+    # the host shares the same page-cache pages.
+    forest = _timed_load(f"Accident model {version}", lambda: registry.load_forest(version))
+    # Touch every tree once so the first real request doesn't fault pages in
+    forest.predict(np.zeros((1, forest.n_features), dtype=np.float32))
+    gate = registry.read_meta(version).get("gate")
+    gate = Gate.from_dict(gate) if gate and CASCADE_GATE else None
+    return ServedModel(version, forest, gate, time.time()), generation
+
+
+def _reload():
+    global _served, _generation, _reloading, _next_heartbeat
+    try:
+        served, generation = _load_active()
+        _served, _generation = served, generation
+        _next_heartbeat = 0.0  # report the new version on the next request
+    except Exception as e:
+        # Keep serving the old model; don't retry until ACTIVE changes again
+        print(f"❌ [BACKEND] Model reload failed, still serving {_served.version}: {e}")
+        _generation = registry.generation()
+    finally:
+        _reloading = False
+
+
+def _maybe_reload():
+    global _next_check, _reloading
+    now = time.monotonic()
+    if now < _next_check or _reloading:
+        return
+    _next_check = now + RELOAD_CHECK_SECONDS
+    if registry.generation() == _generation:
+        return
+    with _served_lock:
+        if _reloading:
+            return
+        _reloading = True
+    # Load off the request path; requests keep using the old forest until
+    # the new one is warm, then the reference is swapped in one assignment.
+    threading.Thread(target=_reload, name="model-reload", daemon=True).start()
+
+
+def _heartbeat(served):
+    """
+    Record what this process serves: on its first use after a fork (the
+    gunicorn master loads the model, see wsgi.py), after a reload, and
+    every HEARTBEAT_SECONDS, so updated_at shows the worker is alive.
+    """
+    global _heartbeat_pid, _next_heartbeat
+    now = time.monotonic()
+    if _heartbeat_pid == os.getpid() and now < _next_heartbeat:
+        return
+    _heartbeat_pid, _next_heartbeat = os.getpid(), now + HEARTBEAT_SECONDS
+    registry.write_heartbeat(served.version, workers=heartbeat_dir(), loaded_at=served.loaded_at)
+
+
+def preload():
+    """Load the active version without reporting it (the gunicorn master)"""
+    global _served, _generation
+    if _served is None:
+        with _served_lock:
+            if _served is None:
+                _served, _generation = _load_active()
+    else:
+        _maybe_reload()
+    return _served
+
+
+def served_model():
+    """
+    The (version, forest) this process is scoring with. The first call loads
+    the active registry version (before gunicorn forks, see wsgi.py); later
+    calls cost one stat() every RELOAD_CHECK_SECONDS to spot a new version.
+    """
+    served = preload()
+    _heartbeat(served)
+    return served
+
+
+def get_forest():
+    return served_model().forest
+
+
+def get_model():
+    """sklearn model for the version being served (tooling and tests only)"""
+    version = served_model().version
+    if version not in _sklearn_models:
+        _sklearn_models[version] = _timed_load(f"sklearn model {version}", lambda: registry.load_model(version))
+    return _sklearn_models[version]
+
+
+def _severity(pred):
+    return "high" if pred == 1 else "low"
+
+
+def _count_cascade(rows, gated):
+    with _cascade_lock:
+        _cascade_counts["gated"] += gated
+        _cascade_counts["scored"] += rows - gated
+
+
+def _predict(served, features):
+    """
+    (class, accident probability) per row: the gate answers clearly-normal
+    rows (probability NaN), the forest the rest
+    """
+    preds, probabilities, gated = cascade_predict(served.forest, served.gate, features)
+    _count_cascade(len(features), gated)
+    return preds, probabilities
+
+
+def cascade_stats():
+    with _cascade_lock:
+        gated, scored = _cascade_counts["gated"], _cascade_counts["scored"]
+    total = gated + scored
+    return {"gated": gated, "scored": scored, "short_circuited": gated / total if total else 0.0}
+
+
+# "process" moves scoring into a pool of worker processes; "inline" (the
+# default) scores in the request thread.
+backend = None
+if getattr(settings, "INFERENCE_BACKEND", "inline") == "process":
+    backend = ProcessPoolBackend(
+        processes=getattr(settings, "INFERENCE_PROCESSES", 2),
+        timeout=getattr(settings, "INFERENCE_TIMEOUT_SECONDS", 5.0),
+        use_gate=CASCADE_GATE,
+        max_failures=getattr(settings, "INFERENCE_POOL_MAX_FAILURES", 3),
+        cooldown=getattr(settings, "INFERENCE_POOL_COOLDOWN_SECONDS", 30.0),
+    )
+
+
+def _score_matrix(features):
+    """(classes, accident probabilities, model_version) for a float32 matrix, via the configured backend"""
+    # Keeps this worker's reload check and heartbeat going in process mode too
+    served = served_model()
+    if backend is not None:
+        try:
+            preds, probabilities, version, gated = backend.predict(features)
+            _count_cascade(len(features), gated)
+            return preds, probabilities, version
+        except PoolUnavailable:
+            pass  # the failures that opened the breaker were reported
+        except Exception as e:
+            print(f"❌ [BACKEND] Inference pool failed, scoring in-process: {e}")
+    return (*_predict(served, features), served.version)
+
+
+def _predict_matrix(features):
+    preds, probabilities, version = _score_matrix(features)
+    return [(pred, probability, version) for pred, probability in zip(preds, probabilities)]
+
+
+# Coalesces concurrent predict_accident calls (threaded/async workers) into
+# one forest pass; disabled when INFERENCE_BATCH_WINDOW_MS is 0.
+scheduler = BatchScheduler(
+    _predict_matrix,
+    window_ms=getattr(settings, "INFERENCE_BATCH_WINDOW_MS", 0),
+    max_batch=getattr(settings, "INFERENCE_BATCH_MAX_SIZE", 64),
+)
+
+
+def score_accident(sensor_data):
+    """
+    Like predict_accident, but returns (severity, accident probability,
+    model_version); the probability is NaN when the gate answered alone
+    """
+    if scheduler.enabled:
+        row = np.array([sensor_data[name] for name in FEATURES], dtype=np.float32)
+        pred, probability, version = scheduler.submit(row).result()
+        return _severity(pred), float(probability), version
+    severities, probabilities, version = score_accidents([sensor_data])
+    return severities[0], probabilities[0], version
+
+
+def score_accidents(readings):
+    """Like predict_accidents, but returns (severities, accident probabilities, model_version)"""
+    features = np.array([[reading[name] for name in FEATURES] for reading in readings], dtype=np.float32)
+    preds, probabilities, version = _score_matrix(features)
+    return [_severity(pred) for pred in preds], probabilities.tolist(), version
 
-# Load model (ensure path is correct)
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "accident_model.pkl")
-model = joblib.load(MODEL_PATH)
 
 def predict_accident(sensor_data):
     """
     sensor_data: dict with keys acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z
     """
-    features = np.array([[sensor_data['acc_x'], sensor_data['acc_y'], sensor_data['acc_z'],
-                          sensor_data['gyro_x'], sensor_data['gyro_y'], sensor_data['gyro_z']]])
-    pred = model.predict(features)[0]
-    severity = "high" if pred == 1 else "low"
-    return severity
+    return score_accident(sensor_data)[0]
+
+
+def predict_accidents(readings):
+    """
+    readings: list of dicts with the same keys as predict_accident.
+    All rows are stacked into one matrix and scored in one pass of the
+    compiled forest (same predictions as model.predict, without sklearn's
+    per-call overhead); severities come back in input order.
+    """
+    return score_accidents(readings)[0]
@@ -1,16 +1,54 @@
-import uuid
+from datetime import timedelta
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
 
+from . import geo, ids
+
+
+class LoadedValuesMixin:
+    """Keeps the field values an instance was loaded with (see api/rollups.py)"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+        return instance
+
+
 class User(AbstractUser):
     phone_number = models.CharField(max_length=15, unique=True)
     is_driver = models.BooleanField(default=False)
     is_bystander = models.BooleanField(default=False)
 
+class Incident(models.Model):
+    """
+    One real-world crash. Reports that arrive within the distance and time
+    windows of an open incident join it instead of starting a new one (see
+    api/incidents.py). latitude/longitude are the first report's position.
+    """
+    id = models.UUIDField(primary_key=True, default=ids.uuid7, editable=False)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geo_cell = models.IntegerField()
+    severity = models.CharField(max_length=50, default='low')
+    opened_at = models.DateTimeField(default=timezone.now)
+    last_report_at = models.DateTimeField(default=timezone.now)
+    report_count = models.IntegerField(default=1)
+
+    def __str__(self):
+        return f"Incident {self.id} ({self.report_count} reports)"
+
+    class Meta:
+        # Open-incident lookups: a few geo_cell ranges, recent ones only
+        indexes = [models.Index(fields=['geo_cell', 'last_report_at'])]
+
+
 # Accident Report
-class AccidentReport(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+class AccidentReport(LoadedValuesMixin, models.Model):
+    id = models.UUIDField(primary_key=True, default=ids.uuid7, editable=False)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     latitude = models.FloatField()
     longitude = models.FloatField()
@@ -26,13 +64,52 @@ class AccidentReport(models.Model):
         ('voice', 'Voice'),
         ('manual', 'Manual')
     ], default='sensor')
+    # Registry version that produced the severity (blank for voice/manual)
+    model_version = models.CharField(max_length=32, blank=True, default='')
+    # Spatial grid cell of (latitude, longitude); see api/geo.py
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False)
+    incident = models.ForeignKey(
+        Incident, on_delete=models.SET_NULL, null=True, blank=True, related_name='reports', editable=False
+    )
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = geo.cell_for(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user} - {self.timestamp}"
 
+    class Meta:
+        # Keyset pagination walks (timestamp, id); see api/pagination.py
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['geo_cell', 'timestamp']),
+        ]
+
 
-class BLEAlert(models.Model):
-    id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False)
+class SensorReading(models.Model):
+    """
+    The raw channels behind a sensor report and the model's probability,
+    packed into one fixed-size record (layout in api/readings.py) so time
+    ranges load straight into NumPy. timestamp copies the report's.
+    """
+    report = models.OneToOneField(
+        AccidentReport, on_delete=models.CASCADE, primary_key=True, related_name='sensor_reading'
+    )
+    timestamp = models.DateTimeField()
+    values = models.BinaryField()
+
+    class Meta:
+        # Range loads walk (timestamp, report); see api/readings.py
+        indexes = [models.Index(fields=['timestamp', 'report'])]
+
+
+# BLE alerts in these states are live until expires_at
+ACTIVE_BLE_STATUSES = ('broadcast', 'received')
+
+
+class BLEAlert(LoadedValuesMixin, models.Model):
+    id = models.UUIDField(default=ids.uuid7, primary_key=True, editable=False)
     message = models.TextField(default="Emergency detected nearby!")
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
@@ -49,16 +126,33 @@ class BLEAlert(models.Model):
         ('received', 'Received'),
         ('expired', 'Expired')
     ])
+    # Spatial grid cell of (latitude, longitude); see api/geo.py
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False)
+    # timestamp + broadcast_duration, stored so "active" is an index range
+    expires_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Id the originating phone gave the alert; relays re-sending it are deduplicated
+    client_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = geo.cell_for(self.latitude, self.longitude)
+        self.expires_at = self.timestamp + timedelta(seconds=int(self.broadcast_duration or 0))
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"BLE Alert: {self.message[:50]}..."
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['geo_cell', 'timestamp']),
+            # Active alerts (and ones due to expire) are a range per status
+            models.Index(fields=['status', 'expires_at']),
+        ]
 
 
-class CloudAlert(models.Model):
-    id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False)
+class CloudAlert(LoadedValuesMixin, models.Model):
+    id = models.UUIDField(default=ids.uuid7, primary_key=True, editable=False)
     device_token = models.TextField()
     title = models.CharField(max_length=255, default="Emergency Alert")
     alert_message = models.TextField(default="Emergency alert!")
@@ -77,4 +171,31 @@ class CloudAlert(models.Model):
         return f"Cloud Alert: {self.title}"
 
     class Meta:
-        ordering = ['-timestamp']
\ No newline at end of file
+        ordering = ['-timestamp']
+        indexes = [models.Index(fields=['timestamp', 'id'])]
+
+
+class HourlyRollup(models.Model):
+    """
+    Row counts per hour and (channel, severity, status, is_emergency),
+    kept up to date by api/rollups.py so statistics never scan raw rows.
+    channel is "ble", "cloud", or an AccidentReport's reported_via;
+    fields a source doesn't have are stored as "" / False.
+    """
+    hour = models.DateTimeField()
+    channel = models.CharField(max_length=20)
+    severity = models.CharField(max_length=20, blank=True, default='')
+    status = models.CharField(max_length=50, blank=True, default='')
+    is_emergency = models.BooleanField(default=False)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.channel} {self.severity}/{self.status}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'channel', 'severity', 'status', 'is_emergency'], name='unique_rollup_bucket'
+            )
+        ]
+        indexes = [models.Index(fields=['channel', 'hour'])]
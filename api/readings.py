@@ -0,0 +1,71 @@
+"""
+Sensor channels of sensor reports, stored for bulk loading.
+
+Every sensor report gets a SensorReading whose `values` is one packed
+little-endian record of RECORD.size (36) bytes: the report time as int64
+microseconds since the epoch, the six channels and the model's accident
+probability as float32 (NaN when unknown: rows backfilled from the old
+description strings, or readings the cascade gate answered without the
+forest). The probability comes from the same forest pass as the
+severity. The layout is fixed: changing it means a new record format,
+not an edit here.
+
+load() reads a time range by fetching only that column from a raw cursor
+and handing the concatenated bytes to np.frombuffer, so a row costs the
+driver's one bytes object instead of a model instance plus seven floats,
+and nothing has to parse the human-readable description.
+"""
+import struct
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+
+from .models import SensorReading
+
+CHANNELS = ("acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y", "gyro_z")
+RECORD = struct.Struct("<q7f")
+DTYPE = np.dtype([("time", "<i8"), *((name, "<f4") for name in CHANNELS), ("probability", "<f4")])
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def pack(reading, timestamp, probability=None):
+    """One record for a reading dict (channel -> float) taken at `timestamp`"""
+    micros = (timestamp - EPOCH) // timedelta(microseconds=1)
+    probability = float("nan") if probability is None else probability
+    return RECORD.pack(micros, *(reading[name] for name in CHANNELS), probability)
+
+
+def build(reports, readings, probabilities):
+    """SensorReading rows for saved reports (their timestamps must be set)"""
+    return [
+        SensorReading(report=report, timestamp=report.timestamp, values=pack(reading, report.timestamp, probability))
+        for report, reading, probability in zip(reports, readings, probabilities)
+    ]
+
+
+def load(start=None, end=None, chunk_size=10000):
+    """Readings with start <= timestamp < end as a DTYPE array, oldest first"""
+    rows = SensorReading.objects.order_by("timestamp", "report")
+    if start is not None:
+        rows = rows.filter(timestamp__gte=start)
+    if end is not None:
+        rows = rows.filter(timestamp__lt=end)
+    compiler = rows.values_list("values").query.get_compiler(rows.db)
+    sql, params = compiler.as_sql()
+    data = bytearray()
+    with compiler.connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while batch := cursor.fetchmany(chunk_size):
+            data += b"".join(row[0] for row in batch)
+    return np.frombuffer(data, dtype=DTYPE)
+
+
+def load_matrix(start=None, end=None, columns=CHANNELS + ("probability",)):
+    """
+    (times as datetime64[us], float32 matrix with one column per name in
+    `columns`) for readings in [start, end)
+    """
+    rows = load(start, end)
+    return rows["time"].astype("datetime64[us]"), structured_to_unstructured(rows[list(columns)])
@@ -0,0 +1,254 @@
+"""
+Versioned store for trained accident models.
+
+    model_registry/
+        ACTIVE              name of the version workers should serve
+        v1/model.pkl        sklearn RandomForest (joblib, uncompressed)
+        v1/forest.joblib    compiled flat-array copy used for scoring
+        v1/meta.json        features, metrics, checksums, timestamps
+        workers/            one heartbeat per serving process
+
+Versions are immutable once published (written to a temp dir, then renamed
+into place) and ACTIVE is swapped with os.replace, so readers never see a
+half-written model. Workers notice a new ACTIVE with a single stat() call.
+
+No Django imports here so train_model.py can use it as a plain script.
+"""
+import json
+import os
+import re
+import shutil
+import socket
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import joblib
+
+from .compiled_forest import CompiledForest, file_sha256
+
+REGISTRY_DIR = os.environ.get(
+    "MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(__file__), "model_registry")
+)
+# Column order every registered model is trained and scored on
+FEATURES = ["acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y", "gyro_z"]
+
+ACTIVE_FILE = "ACTIVE"
+MODEL_FILE = "model.pkl"
+FOREST_FILE = "forest.joblib"
+META_FILE = "meta.json"
+WORKERS_DIR = "workers"
+
+_VERSION_RE = re.compile(r"^v(\d+)$")
+
+
+class RegistryError(Exception):
+    pass
+
+
+def version_dir(version, root=None):
+    return os.path.join(root or REGISTRY_DIR, version)
+
+
+def _atomic_write(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(tmp, 0o644)  # mkstemp creates 0600; other worker users must read it
+    os.replace(tmp, path)
+
+
+def list_versions(root=None):
+    """Metadata of every published version, oldest first"""
+    root = root or REGISTRY_DIR
+    if not os.path.isdir(root):
+        return []
+    versions = []
+    for name in os.listdir(root):
+        match = _VERSION_RE.match(name)
+        if match:
+            versions.append((int(match.group(1)), name))
+    return [read_meta(name, root) for _, name in sorted(versions)]
+
+
+def read_meta(version, root=None):
+    path = os.path.join(version_dir(version, root), META_FILE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise RegistryError(f"Unknown model version: {version}")
+
+
+def register(model, features, metrics=None, root=None, activate=False, extra=None):
+    """Publish a fitted model as the next version; returns its metadata"""
+    root = root or REGISTRY_DIR
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=root, prefix=".tmp-")
+    os.chmod(staging, 0o755)
+    try:
+        model_path = os.path.join(staging, MODEL_FILE)
+        forest_path = os.path.join(staging, FOREST_FILE)
+        # Uncompressed so both files can be memory-mapped
+        joblib.dump(model, model_path)
+        forest = CompiledForest.from_model(model)
+        forest.arrays["source_sha256"] = file_sha256(model_path)
+        forest.save(forest_path)
+
+        meta = {
+            "features": list(features),
+            "classes": [int(c) for c in model.classes_],
+            "n_estimators": len(model.estimators_),
+            "n_nodes": forest.n_nodes,
+            "metrics": metrics or {},
+            "sha256": {
+                MODEL_FILE: forest.arrays["source_sha256"],
+                FOREST_FILE: file_sha256(forest_path),
+            },
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        meta.update(extra or {})
+
+        # Claim the next free version name; rename fails if someone beat us to it
+        while True:
+            existing = [int(m.group(1)) for m in map(_VERSION_RE.match, os.listdir(root)) if m]
+            version = f"v{max(existing, default=0) + 1}"
+            meta["version"] = version
+            _atomic_write(os.path.join(staging, META_FILE), json.dumps(meta, indent=2))
+            try:
+                os.rename(staging, version_dir(version, root))
+                break
+            except OSError:
+                if not os.path.exists(version_dir(version, root)):
+                    raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if activate:
+        activate_version(version, root)
+    return meta
+
+
+def update_meta(version, root=None, **fields):
+    """
+    Add derived fields (e.g. a cascade gate) to a version's meta.json;
+    artifacts stay untouched. If the version is active, ACTIVE is rewritten
+    too, so every worker reloads it instead of only the ones started later.
+    """
+    meta = read_meta(version, root)
+    meta.update(fields)
+    _atomic_write(os.path.join(version_dir(version, root), META_FILE), json.dumps(meta, indent=2))
+    if active_version(root) == version:
+        activate_version(version, root)
+    return meta
+
+
+def verify(version, root=None):
+    """Raise RegistryError unless every artifact matches its recorded checksum"""
+    meta = read_meta(version, root)
+    for name, expected in meta["sha256"].items():
+        path = os.path.join(version_dir(version, root), name)
+        if not os.path.exists(path) or file_sha256(path) != expected:
+            raise RegistryError(f"{version}/{name} is missing or does not match its checksum")
+    return meta
+
+
+def activate_version(version, root=None):
+    """Point ACTIVE at `version`; running workers pick it up on their next check"""
+    root = root or REGISTRY_DIR
+    verify(version, root)
+    _atomic_write(os.path.join(root, ACTIVE_FILE), version + "\n")
+
+
+def active_version(root=None):
+    try:
+        with open(os.path.join(root or REGISTRY_DIR, ACTIVE_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def generation(root=None):
+    """Cheap change marker for ACTIVE: os.replace always yields a new inode"""
+    try:
+        stat = os.stat(os.path.join(root or REGISTRY_DIR, ACTIVE_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def load_model(version, root=None):
+    return joblib.load(os.path.join(version_dir(version, root), MODEL_FILE), mmap_mode="r")
+
+
+def load_forest(version, root=None):
+    """Memory-mapped compiled forest for `version`, recompiled if it is stale"""
+    meta = read_meta(version, root)
+    forest = CompiledForest.load(os.path.join(version_dir(version, root), FOREST_FILE))
+    if forest.arrays.get("source_sha256") != meta["sha256"][MODEL_FILE]:
+        forest = CompiledForest.from_model(load_model(version, root))
+    return forest
+
+
+def workers_dir(root=None, workers=None):
+    """Heartbeat directory: `workers` if given, else <registry>/workers"""
+    return workers or os.path.join(root or REGISTRY_DIR, WORKERS_DIR)
+
+
+def write_heartbeat(version, root=None, workers=None, **details):
+    """Record which version this process serves (read by `model_registry status`)"""
+    workers = workers_dir(root, workers)
+    try:
+        os.makedirs(workers, exist_ok=True)
+        record = {
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "version": version,
+            "updated_at": time.time(),
+        }
+        record.update(details)
+        _atomic_write(os.path.join(workers, f"{record['host']}-{record['pid']}.json"), json.dumps(record))
+    except OSError:
+        # A read-only deploy still serves; it just can't report itself
+        pass
+
+
+def worker_status(root=None, workers=None):
+    """Heartbeats of every process that has served a model, newest first"""
+    workers = workers_dir(root, workers)
+    if not os.path.isdir(workers):
+        return []
+    host = socket.gethostname()
+    records = []
+    for name in os.listdir(workers):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(workers, name)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        record["alive"] = _pid_alive(record["pid"]) if record.get("host") == host else None
+        records.append(record)
+    return sorted(records, key=lambda r: r["updated_at"], reverse=True)
+
+
+def remove_heartbeat(record, root=None, workers=None):
+    path = os.path.join(workers_dir(root, workers), f"{record['host']}-{record['pid']}.json")
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
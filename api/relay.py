@@ -0,0 +1,128 @@
+"""
+Bulk ingestion of BLE alerts relayed by phones.
+
+A phone that picked up broadcasts while offline uploads them all at once
+when it reconnects, and after an outage thousands of phones do so at the
+same moment, many carrying the same alerts. ingest() handles one upload
+with a fixed number of queries whatever its size:
+
+  - fields are validated column-wise (pandas/NumPy) rather than per item;
+  - duplicates are dropped by the originating phone's client_id, within the
+    upload and against stored alerts (one IN query on the unique column);
+  - new alerts go in with a single bulk_create(ignore_conflicts=True), so
+    a concurrent relay of the same alert loses quietly instead of failing
+    the batch.
+"""
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+from . import commit_queue, geo, ids, rollups
+from .models import BLEAlert
+
+FIELDS = ("client_id", "latitude", "longitude", "severity", "message", "location_name", "duration_seconds", "timestamp")
+SEVERITIES = ("low", "medium", "high", "unknown")
+MAX_CLOCK_SKEW = timezone.timedelta(minutes=5)
+
+
+def _validate(frame, now):
+    """(per-row error message or None, parsed columns)"""
+    client_id = frame["client_id"].astype("string")
+    lat = pd.to_numeric(frame["latitude"], errors="coerce").to_numpy(np.float64)
+    lon = pd.to_numeric(frame["longitude"], errors="coerce").to_numpy(np.float64)
+    duration = pd.to_numeric(frame["duration_seconds"], errors="coerce").to_numpy(np.float64)
+    duration = np.where(frame["duration_seconds"].isna().to_numpy(), 30, duration)
+    stamp = pd.to_datetime(frame["timestamp"], errors="coerce", utc=True, format="ISO8601")
+    stamp = stamp.where(frame["timestamp"].notna(), pd.Timestamp(now))
+    severity = frame["severity"].fillna("unknown").astype(str)
+
+    located = ~np.isnan(lat)
+    unlocated = frame["latitude"].isna().to_numpy() & frame["longitude"].isna().to_numpy()
+    checks = [
+        (client_id.isna() | (client_id.str.len() == 0) | (client_id.str.len() > 64)).to_numpy(bool),
+        ~(unlocated | (located & (np.abs(lat) <= 90) & (np.abs(lon) <= 180))),
+        ~severity.isin(SEVERITIES).to_numpy(),
+        ~((duration >= 0) & (duration <= 86400) & (duration == np.floor(duration))),
+        (stamp.isna() | (stamp > pd.Timestamp(now + MAX_CLOCK_SKEW))).to_numpy(bool),
+    ]
+    messages = [
+        "client_id must be a string of 1 to 64 characters",
+        "latitude/longitude must both be valid coordinates or both be absent",
+        f"severity must be one of {', '.join(SEVERITIES)}",
+        "duration_seconds must be a whole number of seconds up to 86400",
+        "timestamp must be an ISO 8601 datetime, not in the future",
+    ]
+    errors = np.select(checks, messages, default="")
+    parsed = {
+        "client_id": client_id, "lat": lat, "lon": lon, "duration": duration,
+        "stamp": stamp, "severity": severity,
+        "cell": geo.cells(np.nan_to_num(lat), np.nan_to_num(lon)),
+    }
+    return errors, parsed
+
+
+def _insert(alerts):
+    """bulk_create, skipping client_ids already stored; returns the pks inserted"""
+    BLEAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+    # Rows a concurrent relay inserted first were skipped by the database
+    inserted = set(BLEAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).order_by().values_list("pk", flat=True))
+    rollups.record_created([alert for alert in alerts if alert.pk in inserted])
+    return inserted
+
+
+def ingest(items, now=None):
+    """Store relayed alerts; returns one {"index", "client_id", "status", ...} per item"""
+    now = now or timezone.now()
+    frame = pd.DataFrame.from_records(
+        [item if isinstance(item, dict) else {} for item in items], columns=FIELDS
+    ).astype(object).where(lambda f: f.notna(), None)
+    errors, parsed = _validate(frame, now)
+
+    results = []
+    for index, error in enumerate(errors):
+        result = {"index": index, "client_id": frame.at[index, "client_id"], "status": "invalid" if error else "created"}
+        if error:
+            result["message"] = str(error)
+        results.append(result)
+
+    fresh = [i for i, error in enumerate(errors) if not error]
+    client_ids = [str(parsed["client_id"].iat[i]) for i in fresh]
+    stored = dict(BLEAlert.objects.filter(client_id__in=set(client_ids)).order_by().values_list("client_id", "pk"))
+    seen = set()
+    alerts = []
+    for i, client_id in zip(fresh, client_ids):
+        if client_id in stored or client_id in seen:
+            results[i]["status"] = "duplicate"
+            if client_id in stored:
+                results[i]["id"] = str(stored[client_id])
+            continue
+        seen.add(client_id)
+        stamp = parsed["stamp"].iat[i].to_pydatetime()
+        duration = int(parsed["duration"][i])
+        lat, lon = parsed["lat"][i], parsed["lon"][i]
+        located = not np.isnan(lat)
+        alerts.append((i, BLEAlert(
+            # Keyed by the broadcast time, so pk order follows timestamp order
+            id=ids.uuid7(stamp),
+            client_id=client_id,
+            message=str(frame.at[i, "message"] or "Emergency detected nearby!"),
+            latitude=float(lat) if located else None,
+            longitude=float(lon) if located else None,
+            severity=parsed["severity"].iat[i],
+            location_name=str(frame.at[i, "location_name"] or "")[:255],
+            broadcast_duration=duration,
+            timestamp=stamp,
+            status="broadcast",
+            # bulk_create skips save(), which derives these two
+            geo_cell=int(parsed["cell"][i]) if located else None,
+            expires_at=stamp + timezone.timedelta(seconds=duration),
+        )))
+
+    if alerts:
+        inserted = commit_queue.submit(lambda: _insert([alert for _, alert in alerts]))
+        for i, alert in alerts:
+            if alert.pk in inserted:
+                results[i]["id"] = str(alert.pk)
+            else:
+                results[i]["status"] = "duplicate"
+    return results
@@ -0,0 +1,164 @@
+"""
+Expiry, archival and pruning of old alerts and reports.
+
+Every job works in bounded batches, each in its own short transaction, so
+the write lock is never held for longer than one batch and other writers
+get in between batches. Each batch is idempotent, so an interrupted run is
+resumed by simply running again:
+
+  expire_ble_alerts   marks BLE alerts past their expires_at as "expired"
+                      with one UPDATE per batch.
+  archive_and_delete  writes rows older than the retention horizon to a
+                      gzip NDJSON file, fsyncs it, then deletes them. The
+                      file is named after the batch's first row, so a
+                      rerun after a crash between the two steps rewrites
+                      the same file instead of leaving a partial one.
+                      Deleted reports are taken off their incidents'
+                      report_count, and incidents left empty go too.
+  prune_telemetry     deletes whole days of raw samples from the telemetry
+                      store (api/telemetry.py).
+
+Rows changed here bypass the model signals, so the hourly rollups are
+adjusted explicitly (api/rollups.py).
+"""
+import gzip
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollups, telemetry
+from .export import EXPORTS, columns
+from .models import ACTIVE_BLE_STATUSES, BLEAlert, Incident, SensorReading
+
+
+def retention_days(kind):
+    """Days rows of `kind` are kept (0 keeps them forever)"""
+    return getattr(settings, "RETENTION_DAYS", {}).get(kind, 0)
+
+
+def archive_dir():
+    return Path(getattr(settings, "ARCHIVE_DIR", Path(settings.BASE_DIR) / "archive"))
+
+
+def expire_ble_alerts(now=None, batch_size=2000, pause=0.0):
+    """Mark broadcast/received BLE alerts whose broadcast is over; returns rows updated"""
+    now = now or timezone.now()
+    # A range per status on the (status, expires_at) index
+    due = BLEAlert.objects.filter(status__in=ACTIVE_BLE_STATUSES, expires_at__lte=now).order_by()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            rows = list(due.select_for_update().values("pk", "timestamp", "severity", "status")[:batch_size])
+            if not rows:
+                break
+            by_status = defaultdict(list)
+            for row in rows:
+                by_status[row["status"]].append(row)
+            for state, group in by_status.items():
+                expired += BLEAlert.objects.filter(pk__in=[row["pk"] for row in group], status=state).update(status="expired")
+                rollups.record_moved(
+                    [rollups.row_key(BLEAlert, row) for row in group],
+                    [rollups.row_key(BLEAlert, {**row, "status": "expired"}) for row in group],
+                )
+        if pause:
+            time.sleep(pause)
+    return expired
+
+
+def _write_archive(path, rows):
+    """Atomically write rows as gzip NDJSON (byte-identical for identical rows)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    partial = path.with_name(path.name + ".partial")
+    with open(partial, "wb") as raw:
+        # mtime=0 and no file name in the header keep reruns byte-identical
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as out:
+            for row in rows:
+                out.write((encoder.encode(row) + "\n").encode())
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+    directory = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def _delete_where_in(model, field_name, values):
+    """DELETE rows of `model` whose `field_name` is in `values`; returns rows deleted"""
+    field = model._meta.get_field(field_name)
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(field.column)} IN ({placeholders})",
+            [field.get_db_prep_value(value, connection) for value in values],
+        )
+        return cursor.rowcount
+
+
+def _forget_reports(incident_ids):
+    """Take deleted reports off their incidents' counts; drop incidents left empty"""
+    removed = Counter(pk for pk in incident_ids if pk is not None)
+    by_count = defaultdict(list)
+    for pk, count in removed.items():
+        by_count[count].append(pk)
+    for count, pks in by_count.items():
+        Incident.objects.filter(pk__in=pks).update(report_count=F("report_count") - count)
+    Incident.objects.filter(pk__in=list(removed), report_count__lte=0).delete()
+
+
+def archive_and_delete(kind, now=None, batch_size=2000, pause=0.0, archive=True):
+    """
+    Archive (unless archive=False) and delete rows of `kind` past its
+    retention horizon, oldest first; returns rows deleted.
+    """
+    days = retention_days(kind)
+    if not days:
+        return 0
+    model = EXPORTS[kind]
+    horizon = (now or timezone.now()) - timedelta(days=days)
+    old_rows = model.objects.filter(timestamp__lt=horizon).order_by("timestamp", "pk").values(*columns(model))
+    deleted = 0
+    while True:
+        rows = list(old_rows[:batch_size])
+        if not rows:
+            break
+        if archive:
+            first = rows[0]
+            name = f"{first['timestamp']:%Y%m%dT%H%M%S%f}-{first['id']}.ndjson.gz"
+            _write_archive(archive_dir() / kind / name, rows)
+        ids = [row["id"] for row in rows]
+        with transaction.atomic():
+            # A plain DELETE per table: queryset.delete() would load every
+            # row to send the rollup signals. Nothing cascades, so a
+            # report's sensor reading goes first and its incident's count
+            # is adjusted here.
+            if kind == "reports":
+                _delete_where_in(SensorReading, "report", ids)
+            deleted += _delete_where_in(model, "id", ids)
+            if kind == "reports":
+                _forget_reports(row["incident_id"] for row in rows)
+            rollups.record_moved([rollups.row_key(model, row) for row in rows], [])
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def prune_telemetry(now=None):
+    """Delete telemetry days entirely past the retention horizon; returns samples removed"""
+    days = retention_days("telemetry")
+    if not days:
+        return 0
+    return telemetry.prune(((now or timezone.now()) - timedelta(days=days)).date())
+
@@ -0,0 +1,194 @@
+"""
+Hourly rollups of BLEAlert, CloudAlert and AccidentReport rows.
+
+Every insert adds 1 to its (hour, channel, severity, status, is_emergency)
+bucket in HourlyRollup, a status change moves 1 between buckets and a
+delete removes 1. Single-row saves and deletes are tracked by the signal
+receivers at the bottom; code that writes with bulk_create() or
+queryset.update() bypasses signals and must call record_created() /
+record_moved() itself.
+
+`manage.py rebuild_rollups` recomputes the buckets from the raw tables.
+"""
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncHour
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import AccidentReport, BLEAlert, CloudAlert, HourlyRollup
+
+SOURCES = (BLEAlert, CloudAlert, AccidentReport)
+KEY_FIELDS = ("hour", "channel", "severity", "status", "is_emergency")
+
+
+def floor_hour(moment):
+    # Buckets are UTC hours, whatever offset the datetime carries
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(moment):
+    floored = floor_hour(moment)
+    return floored if floored == moment else floored + timedelta(hours=1)
+
+
+def _key(model, hour, severity="", status="", is_emergency=False, reported_via=""):
+    if model is BLEAlert:
+        return (hour, "ble", severity, status, False)
+    if model is CloudAlert:
+        return (hour, "cloud", "", status, is_emergency)
+    return (hour, reported_via, severity, "", False)
+
+
+def rollup_key(instance):
+    """Bucket `instance` counts towards, or None before it has a timestamp"""
+    if instance.timestamp is None:
+        return None
+    return _key(
+        type(instance),
+        floor_hour(instance.timestamp),
+        severity=getattr(instance, "severity", ""),
+        status=getattr(instance, "status", ""),
+        is_emergency=getattr(instance, "is_emergency", False),
+        reported_via=getattr(instance, "reported_via", ""),
+    )
+
+
+def row_key(model, row):
+    """rollup_key() for a .values() dict of a `model` row"""
+    if row["timestamp"] is None:
+        return None
+    return _key(model, floor_hour(row["timestamp"]), **{name: row[name] for name in _ROW_FIELDS if name in row})
+
+
+_ROW_FIELDS = ("severity", "status", "is_emergency", "reported_via")
+
+
+def apply(deltas):
+    """Add each delta in {key: delta} to its bucket"""
+    with transaction.atomic():
+        for key, delta in deltas.items():
+            if not delta or key is None:
+                continue
+            bucket = dict(zip(KEY_FIELDS, key))
+            if HourlyRollup.objects.filter(**bucket).update(count=F("count") + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    HourlyRollup.objects.create(count=delta, **bucket)
+            except IntegrityError:
+                # Another writer created the bucket first
+                HourlyRollup.objects.filter(**bucket).update(count=F("count") + delta)
+
+
+def record_created(instances):
+    """Count rows inserted without signals (bulk_create)"""
+    apply(Counter(rollup_key(instance) for instance in instances))
+
+
+def record_moved(before_keys, after_keys):
+    """Move counts for rows changed without signals (queryset.update)"""
+    deltas = Counter(after_keys)
+    deltas.subtract(Counter(before_keys))
+    apply(deltas)
+
+
+_KEY_SOURCES = {"timestamp", "severity", "status", "is_emergency", "reported_via"}
+
+
+def _key_sources(model):
+    return _KEY_SOURCES & {field.attname for field in model._meta.concrete_fields}
+
+
+def _current_values(instance, names):
+    # Only what's already on the instance: touching a deferred field would load it
+    return {name: instance.__dict__[name] for name in names if name in instance.__dict__}
+
+
+def find_move(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Before an update, work out which bucket the row leaves and which it
+    joins. The old values come from the row as loaded (or last saved), so
+    the database is read only when a key field that was deferred at load
+    has since been set.
+    """
+    instance._rollup_move = None
+    if raw or instance._state.adding:
+        return
+    names = _key_sources(sender)
+    saved = names if update_fields is None else names & set(update_fields)
+    stored = getattr(instance, "_loaded_values", {})
+    current = _current_values(instance, saved)
+    if all(name in stored and stored[name] == value for name, value in current.items()):
+        return
+    stored = {name: stored[name] for name in names if name in stored}
+    if missing := names - stored.keys():
+        row = sender._base_manager.filter(pk=instance.pk).values(*missing).first()
+        if row is None:
+            return
+        stored.update(row)
+    instance._rollup_move = (row_key(sender, stored), row_key(sender, {**stored, **current}))
+
+
+def count_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    names = _key_sources(sender)
+    if created:
+        apply({rollup_key(instance): 1})
+    elif instance._rollup_move and instance._rollup_move[0] != instance._rollup_move[1]:
+        before, after = instance._rollup_move
+        apply(Counter({after: 1, before: -1}))
+    # What the row holds now, for the next save of this instance
+    saved = names if update_fields is None else names & set(update_fields)
+    instance.__dict__.setdefault("_loaded_values", {}).update(_current_values(instance, saved))
+
+
+def count_deleted(sender, instance, **kwargs):
+    stored = getattr(instance, "_loaded_values", {})
+    values = {name: stored.get(name, getattr(instance, name)) for name in _key_sources(sender)}
+    apply({row_key(sender, values): -1})
+
+
+# Connected per model: a sender-less post_delete receiver would stop Django
+# from fast-deleting rows of every other model.
+for _model in SOURCES:
+    pre_save.connect(find_move, sender=_model)
+    post_save.connect(count_saved, sender=_model)
+    post_delete.connect(count_deleted, sender=_model)
+
+
+def rebuild(since=None, sources=SOURCES, rollup_model=HourlyRollup):
+    """
+    Recompute every bucket from `since` (an hour boundary; None for all time)
+    from the raw tables; returns the number of buckets written. Models are
+    parameters so migrations can pass their historical versions.
+    """
+    with transaction.atomic():
+        stale = rollup_model.objects.all()
+        if since is not None:
+            stale = stale.filter(hour__gte=since)
+        stale.delete()
+
+        buckets = Counter()
+        for model in sources:
+            fields = [name for name in ("severity", "status", "is_emergency", "reported_via")
+                      if any(field.name == name for field in model._meta.fields)]
+            rows = model.objects.all()
+            if since is not None:
+                rows = rows.filter(timestamp__gte=since)
+            rows = rows.annotate(bucket=TruncHour("timestamp")).values("bucket", *fields).annotate(n=Count("pk"))
+            # Historical models from migrations are different classes; match by name
+            source = next(s for s in SOURCES if s.__name__ == model.__name__)
+            for row in rows.order_by():
+                bucket = row.pop("bucket")
+                n = row.pop("n")
+                buckets[_key(source, bucket, **row)] += n
+
+        rollup_model.objects.bulk_create(
+            (rollup_model(count=n, **dict(zip(KEY_FIELDS, key))) for key, n in buckets.items()),
+            batch_size=1000,
+        )
+    return len(buckets)
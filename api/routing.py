@@ -0,0 +1,167 @@
+"""
+Read replicas for the heavy read-only endpoints.
+
+Writes, and every read outside a view marked @use_replica, go to
+"default". A marked view's queries go to a randomly chosen healthy
+replica, or to the primary when there is none. Health is probed per
+process at most every REPLICA_CHECK_SECONDS: a replica that can't be
+queried, or that is more than REPLICA_MAX_LAG_SECONDS behind the primary
+(Postgres streaming replicas report it; other backends count as 0), is
+skipped until a later probe finds it usable again.
+
+Read-your-own-writes: a successful write request gets a short-lived
+cookie, and while it's present the client's reads stay on the primary. A
+replica in use is at most REPLICA_MAX_LAG_SECONDS + REPLICA_CHECK_SECONDS
+behind, so that is how long the cookie lasts. Reads inside a transaction
+on the primary stay there too.
+
+To try it locally, copy the SQLite file and point a replica at the copy:
+
+    cp db.sqlite3 replica.sqlite3
+    DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 python manage.py runserver
+
+(or a primary and a streaming standby Postgres, DATABASE_URL and
+DATABASE_REPLICA_URLS=postgres://...); `manage.py check_replicas` shows
+what each process would see.
+"""
+import contextvars
+import functools
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+STICKY_COOKIE = "db_primary"
+
+# Seconds the replica is behind; probed at most every REPLICA_CHECK_SECONDS
+LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+    # A copy without the schema (e.g. a freshly created empty file) fails here
+    "sqlite": "SELECT 0 FROM django_migrations LIMIT 1",
+}
+
+_read_alias = contextvars.ContextVar("read_alias", default=None)
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def max_lag():
+    return getattr(settings, "REPLICA_MAX_LAG_SECONDS", 5.0)
+
+
+def sticky_seconds():
+    return max_lag() + getattr(settings, "REPLICA_CHECK_SECONDS", 5.0)
+
+
+def probe(alias):
+    """(reachable, lag in seconds or None) for one replica"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_QUERIES.get(connection.vendor, "SELECT 0"))
+            row = cursor.fetchone()
+        return True, float(row[0] or 0) if row else 0.0
+    except DatabaseError:
+        connection.close()
+        return False, None
+
+
+class ReplicaHealth:
+    """Last probe result per replica, shared by the threads of one process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.status = {}  # alias -> (reachable, lag, checked_at)
+        self.probing = set()
+
+    def reset(self):
+        with self.lock:
+            self.status.clear()
+
+    def check(self, alias):
+        """(reachable, lag), probing if the last result is too old"""
+        now = time.monotonic()
+        with self.lock:
+            last = self.status.get(alias)
+            due = last is None or now - last[2] >= getattr(settings, "REPLICA_CHECK_SECONDS", 5.0)
+            # One thread probes; the others go on with the previous result
+            mine = due and alias not in self.probing
+            if mine:
+                self.probing.add(alias)
+        if mine:
+            try:
+                last = (*probe(alias), now)
+            finally:
+                with self.lock:
+                    self.probing.discard(alias)
+                    if last is not None:
+                        self.status[alias] = last
+        return (False, None) if last is None else last[:2]
+
+    def usable(self, alias):
+        reachable, lag = self.check(alias)
+        return reachable and lag <= max_lag()
+
+
+health = ReplicaHealth()
+
+
+def choose_replica():
+    """A usable replica alias, or None for the primary"""
+    usable = [alias for alias in replica_aliases() if health.usable(alias)]
+    return random.choice(usable) if usable else None
+
+
+def use_replica(view):
+    """
+    Run a read-only view method's queries on a replica, unless the client
+    wrote recently (see PrimaryAfterWriteMiddleware) or none is usable.
+    """
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        alias = None
+        if replica_aliases() and request.method in ("GET", "HEAD") and STICKY_COOKIE not in request.COOKIES:
+            alias = choose_replica()
+        token = _read_alias.set(alias)
+        try:
+            return view(self, request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        return obj1._state.db in pool and obj2._state.db in pool
+
+
+class PrimaryAfterWriteMiddleware:
+    """Keep a client's reads on the primary for a while after it writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_aliases() and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            response.set_cookie(STICKY_COOKIE, "1", max_age=sticky_seconds(), httponly=True, samesite="Lax")
+        return response
@@ -9,10 +9,17 @@ class UserSerializer(serializers.ModelSerializer):
 
 class AccidentReportSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    # Only known right after the report is created; null when listed
+    is_new_incident = serializers.SerializerMethodField()
     
     class Meta:
         model = AccidentReport
-        fields = ['id', 'user', 'latitude', 'longitude', 'severity', 'description', 'timestamp', 'reported_via']
+        fields = ['id', 'user', 'latitude', 'longitude', 'severity', 'description', 'timestamp', 'reported_via', 'model_version',
+                  'incident', 'is_new_incident']
+        read_only_fields = ['model_version', 'incident']
+
+    def get_is_new_incident(self, obj):
+        return getattr(obj, 'opened_incident', None)
         
 
 class BLEAlertSerializer(serializers.ModelSerializer):
@@ -20,7 +27,7 @@ class BLEAlertSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = BLEAlert
-        fields = '__all__'
+        exclude = ['geo_cell']
     
     def get_formatted_timestamp(self, obj):
         return obj.timestamp.strftime("%Y-%m-%d %H:%M:%S")
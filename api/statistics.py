@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .caching import cached
+from .models import BLEAlert, CloudAlert, HourlyRollup
+from .rollups import ceil_hour, floor_hour
+
+# Dashboards poll the statistics endpoint; a few seconds of staleness is fine
+STATISTICS_CACHE_SECONDS = getattr(settings, "ALERT_STATISTICS_CACHE_SECONDS", 5)
+
+SEVERITIES = ("high", "medium", "low")
+CLOUD_STATES = ("sent", "delivered", "failed")
+
+
+def _windows(now):
+    return {
+        "today": now.replace(hour=0, minute=0, second=0, microsecond=0),
+        "last_24_hours": now - timezone.timedelta(hours=24),
+        "last_7_days": now - timezone.timedelta(days=7),
+    }
+
+
+def _sum(**filters):
+    return Sum("count", filter=Q(**filters), default=0)
+
+
+def _partial_hours(model, windows):
+    """
+    Raw rows in each window's leading partial hour, [start, next hour): the
+    rollups only cover whole hours. One indexed range query per table.
+    """
+    edges = {name: (start, ceil_hour(start)) for name, start in windows.items() if ceil_hour(start) != start}
+    if not edges:
+        return {name: 0 for name in windows}
+    in_edges = Q()
+    for start, end in edges.values():
+        in_edges |= Q(timestamp__gte=start, timestamp__lt=end)
+    counts = model.objects.filter(in_edges).aggregate(**{
+        name: Count("pk", filter=Q(timestamp__gte=start, timestamp__lt=end)) for name, (start, end) in edges.items()
+    })
+    return {name: counts.get(name, 0) for name in windows}
+
+
+def compute_alert_statistics(now=None):
+    """
+    Alert counts for the statistics endpoint, read from the hourly rollups
+    (cost grows with buckets, not rows) plus the partial hour at the start
+    of each rolling window, so the numbers match a scan of the raw tables.
+    """
+    windows = _windows(now or timezone.now())
+    whole_hours = {name: ceil_hour(start) for name, start in windows.items()}
+
+    rollups = HourlyRollup.objects.filter(channel__in=["ble", "cloud"]).aggregate(
+        ble_total=_sum(channel="ble"),
+        cloud_total=_sum(channel="cloud"),
+        cloud_emergency_alerts=_sum(channel="cloud", is_emergency=True),
+        **{f"ble_{name}": _sum(channel="ble", hour__gte=hour) for name, hour in whole_hours.items()},
+        **{f"cloud_{name}": _sum(channel="cloud", hour__gte=hour) for name, hour in whole_hours.items()},
+        **{f"ble_{severity}": _sum(channel="ble", severity=severity) for severity in SEVERITIES},
+        **{f"cloud_{state}": _sum(channel="cloud", status=state) for state in CLOUD_STATES},
+    )
+    ble_edges = _partial_hours(BLEAlert, windows)
+    cloud_edges = _partial_hours(CloudAlert, windows)
+
+    return {
+        "ble_alerts": {
+            "total": rollups["ble_total"],
+            **{name: rollups[f"ble_{name}"] + ble_edges[name] for name in windows},
+            "severity_breakdown": {severity: rollups[f"ble_{severity}"] for severity in SEVERITIES},
+        },
+        "cloud_alerts": {
+            "total": rollups["cloud_total"],
+            **{name: rollups[f"cloud_{name}"] + cloud_edges[name] for name in windows},
+            "emergency_alerts": rollups["cloud_emergency_alerts"],
+            "status_breakdown": {state: rollups[f"cloud_{state}"] for state in CLOUD_STATES},
+        },
+        "total_alerts": rollups["ble_total"] + rollups["cloud_total"],
+    }
+
+
+def alert_statistics():
+    """compute_alert_statistics() behind a short TTL cache shared by concurrent requests"""
+    return cached("alert-statistics", compute_alert_statistics, STATISTICS_CACHE_SECONDS)
+
+
+INTERVALS = {"hour": timezone.timedelta(hours=1), "day": timezone.timedelta(days=1)}
+
+
+def time_series(start, end, interval="hour", channels=None, severity=None, status=None):
+    """
+    Counts per hour or day bucket in [start, end), read from the rollups and
+    zero-filled. Buckets are whole hours/days (UTC), so start is rounded down
+    to its bucket. Returns [{"bucket", "count", "channels": {channel: n}}].
+    """
+    step = INTERVALS[interval]
+    start = floor_hour(start)
+    if interval == "day":
+        start = start.replace(hour=0)
+
+    rows = HourlyRollup.objects.filter(hour__gte=start, hour__lt=end)
+    if channels:
+        rows = rows.filter(channel__in=channels)
+    if severity:
+        rows = rows.filter(severity=severity)
+    if status:
+        rows = rows.filter(status=status)
+    rows = rows.values("hour", "channel").annotate(n=Sum("count")).order_by()
+
+    series = {}
+    bucket = start
+    while bucket < end:
+        series[bucket] = {"bucket": bucket.isoformat(), "count": 0, "channels": {}}
+        bucket += step
+    for row in rows:
+        # Day buckets are summed here rather than with TruncDay so the query
+        # stays an index range scan on hour
+        hour = row["hour"]
+        point = series[hour.replace(hour=0) if interval == "day" else hour]
+        point["count"] += row["n"]
+        point["channels"][row["channel"]] = point["channels"].get(row["channel"], 0) + row["n"]
+    return list(series.values())
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from django.conf import settings
+
+from .ml_model import FEATURES
+
+# Channel layout inside a window row: acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z
+ACC = slice(0, 3)
+GYRO = slice(3, 6)
+
+
+class DeviceWindow:
+    """
+    Fixed-size ring buffer of the last `size` samples for one device.
+
+    Every windowed feature is maintained incrementally: running sums are
+    updated with the incoming sample and the one it overwrites, and the
+    sliding maxima use monotonic deques of sample sequence numbers, so a
+    push is O(1) amortized no matter how large the window is.
+    """
+
+    __slots__ = (
+        "size", "samples", "acc_mag", "jerk", "dt", "seq", "last_t",
+        "gyro_sq_sum", "rotation", "acc_peaks", "jerk_peaks", "last_seen", "alerting",
+    )
+
+    def __init__(self, size):
+        self.size = size
+        self.samples = np.zeros((size, len(FEATURES)), dtype=np.float32)
+        self.acc_mag = np.zeros(size, dtype=np.float32)
+        self.jerk = np.zeros(size, dtype=np.float32)
+        self.dt = np.zeros(size, dtype=np.float32)
+        self.seq = 0  # total samples ever pushed
+        self.last_t = None
+        self.gyro_sq_sum = 0.0
+        self.rotation = np.zeros(3)  # integrated gyro over the window (degrees)
+        self.acc_peaks = deque()
+        self.jerk_peaks = deque()
+        self.last_seen = 0.0
+        self.alerting = False
+
+    def __len__(self):
+        return min(self.seq, self.size)
+
+    def push(self, sample, t, default_dt):
+        """Append one 6-channel sample taken at time t (seconds, may be None)"""
+        slot = self.seq % self.size
+        dt = default_dt if t is None or self.last_t is None else max(t - self.last_t, 1e-3)
+
+        # Drop the contribution of the sample being overwritten
+        if self.seq >= self.size:
+            old_gyro = self.samples[slot, GYRO].astype(np.float64)
+            self.gyro_sq_sum -= float(old_gyro @ old_gyro)
+            self.rotation -= old_gyro * float(self.dt[slot])
+
+        prev = self.samples[(self.seq - 1) % self.size, ACC] if self.seq else None
+        self.samples[slot] = sample
+        acc = self.samples[slot, ACC]
+        gyro = self.samples[slot, GYRO].astype(np.float64)
+        self.acc_mag[slot] = np.sqrt(acc @ acc)
+        self.jerk[slot] = 0.0 if prev is None else np.sqrt(((acc - prev) ** 2).sum()) / dt
+        self.dt[slot] = dt
+        self.gyro_sq_sum += float(gyro @ gyro)
+        self.rotation += gyro * dt
+
+        self._push_peak(self.acc_peaks, self.acc_mag)
+        self._push_peak(self.jerk_peaks, self.jerk)
+
+        self.seq += 1
+        if t is not None:
+            self.last_t = t
+        # Re-derive the running sums once per lap so float drift can't build up
+        if self.seq % self.size == 0:
+            gyro_all = self.samples[:, GYRO].astype(np.float64)
+            self.gyro_sq_sum = float((gyro_all ** 2).sum())
+            self.rotation = (gyro_all * self.dt[:, None]).sum(axis=0)
+
+    def _push_peak(self, peaks, values):
+        seq = self.seq
+        value = values[seq % self.size]
+        while peaks and values[peaks[-1] % self.size] <= value:
+            peaks.pop()
+        peaks.append(seq)
+        if peaks[0] <= seq - self.size:
+            peaks.popleft()
+
+    def peak_sample(self):
+        """Raw sample with the highest acceleration magnitude in the window"""
+        return self.samples[self.acc_peaks[0] % self.size]
+
+    def features(self):
+        n = len(self)
+        return {
+            "samples": n,
+            "peak_acc": float(self.acc_mag[self.acc_peaks[0] % self.size]),
+            "peak_jerk": float(self.jerk[self.jerk_peaks[0] % self.size]),
+            "gyro_energy": self.gyro_sq_sum / n,
+            "orientation_change": float(np.sqrt(self.rotation @ self.rotation)),
+        }
+
+
+class StreamingEngine:
+    """
+    Keeps one DeviceWindow per connected device.
+
+    Memory is bounded by max_devices windows of window_size rows; devices
+    that have not sent anything for idle_seconds are evicted oldest-first.
+    """
+
+    def __init__(self, window_size=50, sample_rate=50.0, idle_seconds=300, max_devices=10000):
+        self.window_size = window_size
+        self.default_dt = 1.0 / sample_rate
+        self.idle_seconds = idle_seconds
+        self.max_devices = max_devices
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def push(self, device_id, samples, times=None):
+        """
+        Feed samples (n x 6 array-like, FEATURES order) for one device.
+        Returns the window after each sample as (features, peak_sample) pairs.
+        """
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1, len(FEATURES))
+        now = time.monotonic()
+        snapshots = []
+        with self._lock:
+            window = self._windows.get(device_id)
+            if window is None:
+                window = DeviceWindow(self.window_size)
+                self._windows[device_id] = window
+            else:
+                self._windows.move_to_end(device_id)
+            window.last_seen = now
+            for i, sample in enumerate(samples):
+                window.push(sample, None if times is None else times[i], self.default_dt)
+                snapshots.append((window.features(), window.peak_sample().copy()))
+            self._evict(now)
+        return window, snapshots
+
+    def _evict(self, now):
+        windows = self._windows
+        while windows:
+            device_id, window = next(iter(windows.items()))
+            if len(windows) <= self.max_devices and now - window.last_seen < self.idle_seconds:
+                break
+            windows.popitem(last=False)
+
+    def set_alerting(self, window, alerting):
+        """Record the latest verdict; True only on a low -> high transition"""
+        with self._lock:
+            triggered = alerting and not window.alerting
+            window.alerting = alerting
+        return triggered
+
+    def forget(self, device_id):
+        with self._lock:
+            self._windows.pop(device_id, None)
+
+
+engine = StreamingEngine(
+    window_size=getattr(settings, "SENSOR_WINDOW_SIZE", 50),
+    sample_rate=getattr(settings, "SENSOR_SAMPLE_RATE", 50.0),
+    idle_seconds=getattr(settings, "SENSOR_DEVICE_IDLE_SECONDS", 300),
+    max_devices=getattr(settings, "SENSOR_MAX_DEVICES", 10000),
+)
@@ -0,0 +1,200 @@
+"""
+Synthetic sensor telemetry for load tests and training experiments.
+
+Rows come as per-device streams sampled at a fixed rate: normal driving is
+a smooth AR(1) signal inside the ranges of the original sensor_data.csv
+(acc within +-2, gyro within +-10), and crashes are injected as short
+bursts of large, decaying shocks (acc up to +-25, gyro up to +-200) whose
+rows are labelled 1. Consecutive rows of a device are therefore correlated
+in time, like a phone streaming to /accidents/sensor/stream/.
+
+Output is produced in chunks of whole devices. Each chunk draws from its
+own SeedSequence(seed, spawn_key=(chunk,)), so the same seed gives the
+same bytes whatever the number of processes, and memory stays at one
+chunk per process.
+
+Formats:
+- csv: device_id,timestamp_ms,<features>,label (4 decimals)
+- columnar: a directory with one .npy file per column (memory-mappable)
+  and a meta.json written last, once every chunk is in place.
+
+No Django imports here so generate_sensor_dataset.py can use it as a plain script.
+"""
+import json
+import multiprocessing
+import os
+import time
+from functools import partial
+
+import numpy as np
+from scipy.signal import lfilter
+
+from .registry import FEATURES
+
+LABEL = "label"
+COLUMNS = {"device_id": np.int32, "timestamp_ms": np.int64, **{name: np.float32 for name in FEATURES}, LABEL: np.int8}
+META_FILE = "meta.json"
+
+# Stationary spread and clip limit of normal driving, per channel
+NORMAL_STD = np.array([0.7, 0.7, 0.7, 3.5, 3.5, 3.5])
+NORMAL_LIMIT = np.array([2.0, 2.0, 2.0, 10.0, 10.0, 10.0])
+# Peak shock of a crash burst, per channel
+CRASH_PEAK = np.array([25.0, 25.0, 25.0, 200.0, 200.0, 200.0])
+
+
+class Spec:
+    """Shape of a dataset: devices x samples_per_device rows, in chunks of devices_per_chunk"""
+
+    def __init__(self, devices, samples_per_device, devices_per_chunk=1000, seed=0, sample_rate=50.0,
+                 crash_share=0.25, burst_samples=(10, 40), smoothing=0.9, start_ms=1_700_000_000_000):
+        self.devices = devices
+        self.samples_per_device = samples_per_device
+        self.devices_per_chunk = max(1, min(devices_per_chunk, devices))
+        self.seed = seed
+        self.sample_rate = sample_rate
+        self.crash_share = crash_share
+        self.burst_samples = burst_samples
+        self.smoothing = smoothing
+        self.start_ms = start_ms
+
+    @property
+    def rows(self):
+        return self.devices * self.samples_per_device
+
+    @property
+    def chunks(self):
+        return -(-self.devices // self.devices_per_chunk)
+
+    def chunk_devices(self, chunk):
+        first = chunk * self.devices_per_chunk
+        return first, min(first + self.devices_per_chunk, self.devices)
+
+    def to_dict(self):
+        return dict(vars(self), burst_samples=list(self.burst_samples), rows=self.rows)
+
+
+def _normal(rng, devices, samples, smoothing):
+    # AR(1) per device and channel, scaled to unit stationary variance
+    noise = rng.standard_normal((devices, samples, len(FEATURES)), dtype=np.float32)
+    noise *= np.sqrt(1 - smoothing ** 2)
+    signal = lfilter([1.0], [1.0, -smoothing], noise, axis=1)
+    return np.clip(signal * NORMAL_STD, -NORMAL_LIMIT, NORMAL_LIMIT).astype(np.float32)
+
+
+def _inject_crashes(rng, values, labels, spec):
+    devices, samples, _ = values.shape
+    low, high = spec.burst_samples
+    mean_length = (low + high) / 2
+    counts = rng.poisson(samples * spec.crash_share / mean_length, devices)
+    for device, count in enumerate(counts):
+        for _ in range(count):
+            length = int(rng.integers(low, high + 1))
+            begin = int(rng.integers(0, max(1, samples - length)))
+            end = min(begin + length, samples)
+            # Impact then ringing: per-channel amplitude decays to about a
+            # third of its peak, with a random sign on every sample.
+            decay = np.exp(-np.arange(end - begin) / (length / 1.1))[:, None]
+            peak = CRASH_PEAK * rng.uniform(0.4, 1.0, len(FEATURES))
+            shock = peak * decay * rng.uniform(0.6, 1.0, (end - begin, len(FEATURES)))
+            values[device, begin:end] = shock * rng.choice([-1.0, 1.0], shock.shape)
+            labels[device, begin:end] = 1
+
+
+def generate_chunk(spec, chunk):
+    """Columns (dict of 1-D arrays) for one chunk, device-major and time-ordered"""
+    rng = np.random.default_rng(np.random.SeedSequence(spec.seed, spawn_key=(chunk,)))
+    first, last = spec.chunk_devices(chunk)
+    devices, samples = last - first, spec.samples_per_device
+
+    values = _normal(rng, devices, samples, spec.smoothing)
+    labels = np.zeros((devices, samples), dtype=np.int8)
+    _inject_crashes(rng, values, labels, spec)
+
+    # Devices come online at different times within the first hour
+    starts = spec.start_ms + rng.integers(0, 3_600_000, devices)
+    timestamps = starts[:, None] + (np.arange(samples) * (1000 / spec.sample_rate)).astype(np.int64)
+
+    columns = {
+        "device_id": np.repeat(np.arange(first, last, dtype=np.int32), samples),
+        "timestamp_ms": timestamps.reshape(-1),
+        LABEL: labels.reshape(-1),
+    }
+    flat = values.reshape(-1, len(FEATURES))
+    for i, name in enumerate(FEATURES):
+        columns[name] = flat[:, i]
+    return columns
+
+
+def _csv_chunk(spec, chunk):
+    import pandas as pd
+
+    # Rounding first lets pandas use its fast shortest-repr path; 4 decimals
+    # is finer than any phone sensor resolves.
+    frame = pd.DataFrame(generate_chunk(spec, chunk), columns=list(COLUMNS)).round(4)
+    return len(frame), frame.to_csv(header=False, index=False).encode()
+
+
+def _columnar_chunk(spec, chunk, out):
+    columns = generate_chunk(spec, chunk)
+    offset = spec.chunk_devices(chunk)[0] * spec.samples_per_device
+    for name, column in columns.items():
+        # Every chunk owns a fixed row range, so processes write in place
+        target = np.load(os.path.join(out, f"{name}.npy"), mmap_mode="r+")
+        target[offset:offset + len(column)] = column
+        target.flush()
+        del target
+    return len(columns[LABEL])
+
+
+def _run(pool, fn, chunks, processes):
+    if processes == 1:
+        return map(fn, chunks)
+    # imap keeps chunk order, so CSV output is identical for any pool size
+    return pool.imap(fn, chunks)
+
+
+def write(spec, out, fmt="csv", processes=None, log=print):
+    """Write the dataset to `out` (a .csv file or a columnar directory); returns rows/second"""
+    processes = processes or os.cpu_count() or 1
+    started = time.perf_counter()
+    rows = 0
+    chunks = range(spec.chunks)
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    pool = context.Pool(processes) if processes > 1 else None
+    try:
+        if fmt == "csv":
+            with open(out, "wb") as f:
+                f.write((",".join(COLUMNS) + "\n").encode())
+                for written, data in _run(pool, partial(_csv_chunk, spec), chunks, processes):
+                    f.write(data)
+                    rows += written
+                    log(f"  {rows:,} rows, {rows / (time.perf_counter() - started):,.0f} rows/s")
+        elif fmt == "columnar":
+            os.makedirs(out, exist_ok=True)
+            meta_path = os.path.join(out, META_FILE)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)  # incomplete until rewritten below
+            for name, dtype in COLUMNS.items():
+                np.lib.format.open_memmap(os.path.join(out, f"{name}.npy"), mode="w+", dtype=dtype, shape=(spec.rows,))
+            for written in _run(pool, partial(_columnar_chunk, spec, out=out), chunks, processes):
+                rows += written
+                log(f"  {rows:,} rows, {rows / (time.perf_counter() - started):,.0f} rows/s")
+            with open(meta_path, "w") as f:
+                json.dump({"columns": {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()},
+                           "spec": spec.to_dict()}, f, indent=2)
+        else:
+            raise ValueError(f"Unknown format: {fmt}")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return rows / (time.perf_counter() - started)
+
+
+def open_columnar(path):
+    """Memory-mapped columns of a columnar dataset; raises ValueError if it is incomplete"""
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        raise ValueError(f"{path} has no {META_FILE}; it was not written completely")
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in meta["columns"]}
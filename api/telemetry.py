@@ -0,0 +1,365 @@
+"""
+Append-only columnar store for raw sensor samples.
+
+Every sample the stream endpoint receives is kept here on local disk
+rather than in the relational database. Each UTC day has one directory
+per shard (crc32 of the device id modulo TELEMETRY_SHARDS), and each
+holds one fixed-width file per column:
+
+  time.i8            int64 microseconds since the epoch
+  device.u4          device code, the line number in devices.jsonl
+  acc_x.f4 ... gyro_z.f4  the six channels, float32
+  index.bin          one INDEX record per appended block
+  devices.jsonl      device ids, one JSON string per line (so an id
+                     containing a line break still takes one line)
+
+Samples are buffered per process and a background thread appends them
+every TELEMETRY_FLUSH_SECONDS, or as soon as TELEMETRY_FLUSH_SAMPLES are
+waiting. Each flush writes one block per segment, sorted by (device,
+time), while holding that segment's lock file. Processes sharing the
+directory never interleave. The column files are fsynced before the
+index record that covers them is written and fsynced. So a block is
+visible only once it is durable, and anything past the last index record
+is leftover from a crash. The next writer truncates it away. Samples
+still in a process's buffer are lost if the process dies. At most one
+flush interval of telemetry is at risk, and nothing a client was told
+was stored.
+
+Reads take no lock. samples() memory-maps the columns up to the last
+complete index record. It picks the blocks whose time range overlaps the
+query, and finds the device's rows in each by binary search on the
+sorted device column. Only those rows are copied out. segment() exposes a
+whole day/shard as memmaps for training jobs.
+"""
+import atexit
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .readings import CHANNELS
+
+COLUMNS = {"time": np.dtype("<i8"), "device": np.dtype("<u4"), **{name: np.dtype("<f4") for name in CHANNELS}}
+DEVICES = "devices.jsonl"
+INDEX = np.dtype([("start", "<u8"), ("count", "<u4"), ("t_min", "<i8"), ("t_max", "<i8")])
+US_PER_DAY = 86400 * 1_000_000
+
+
+def telemetry_dir():
+    return Path(getattr(settings, "TELEMETRY_DIR", Path(settings.BASE_DIR) / "telemetry"))
+
+
+def shard_for(device_id, shards=None):
+    shards = shards or getattr(settings, "TELEMETRY_SHARDS", 16)
+    return zlib.crc32(device_id.encode()) % shards
+
+
+def segment_dir(day, shard, root=None):
+    return (root or telemetry_dir()) / day.isoformat() / f"shard-{shard:02d}"
+
+
+def to_micros(moment):
+    return (moment - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+
+
+def sample_times(count, device_times=None, received=None, sample_rate=None):
+    """
+    int64 microsecond timestamps for `count` samples that arrived together
+    at `received`. The last sample is taken to be the arrival time, and the
+    others are placed before it using the device's own clock (seconds) if
+    it sent one, else spaced at the nominal sample rate.
+    """
+    received = to_micros(received or datetime.now(timezone.utc))
+    if device_times is not None:
+        offsets = np.asarray(device_times, dtype=np.float64)
+        offsets = offsets - offsets[-1]
+    else:
+        rate = sample_rate or getattr(settings, "SENSOR_SAMPLE_RATE", 50.0)
+        offsets = (np.arange(count) - (count - 1)) / rate
+    return received + np.round(offsets * 1_000_000).astype(np.int64)
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _read_index(directory):
+    """Complete index records (a torn last record is ignored)"""
+    try:
+        raw = (directory / "index.bin").read_bytes()
+    except FileNotFoundError:
+        return np.zeros(0, dtype=INDEX)
+    return np.frombuffer(raw[:len(raw) - len(raw) % INDEX.itemsize], dtype=INDEX)
+
+
+def _indexed_rows(index):
+    return int(index["start"][-1]) + int(index["count"][-1]) if len(index) else 0
+
+
+class Segment:
+    """One day/shard, memory-mapped read-only up to its last complete block"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.index = _read_index(self.directory)
+        self.rows = _indexed_rows(self.index)
+        self._columns = {}
+
+    def column(self, name):
+        if name not in self._columns:
+            if self.rows == 0:
+                self._columns[name] = np.zeros(0, dtype=COLUMNS[name])
+            else:
+                self._columns[name] = np.memmap(
+                    self.directory / f"{name}.{COLUMNS[name].str[1:]}", dtype=COLUMNS[name], mode="r", shape=(self.rows,)
+                )
+        return self._columns[name]
+
+    def devices(self):
+        try:
+            return [json.loads(line) for line in (self.directory / DEVICES).read_text().split("\n")[:-1]]
+        except FileNotFoundError:
+            return []
+
+    def rows_for(self, device_id, start_us, end_us):
+        """Row numbers of device_id's samples with start_us <= time < end_us"""
+        try:
+            code = self.devices().index(device_id)
+        except ValueError:
+            return np.zeros(0, dtype=np.int64)
+        blocks = self.index[(self.index["t_max"] >= start_us) & (self.index["t_min"] < end_us)]
+        device, times = self.column("device"), self.column("time")
+        found = []
+        for block in blocks:
+            lo, hi = int(block["start"]), int(block["start"]) + int(block["count"])
+            first = lo + int(np.searchsorted(device[lo:hi], code, "left"))
+            last = lo + int(np.searchsorted(device[lo:hi], code, "right"))
+            if first == last:
+                continue
+            # A device's rows are time-sorted within the block
+            run = times[first:last]
+            found.append(np.arange(first + int(np.searchsorted(run, start_us, "left")),
+                                   first + int(np.searchsorted(run, end_us, "left"))))
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+
+def segment(day, shard, root=None):
+    return Segment(segment_dir(day, shard, root))
+
+
+def samples(device_id, start, end, root=None):
+    """
+    (times as datetime64[us], float32 (n, 6) channel matrix) for device_id's
+    flushed samples with start <= time < end, oldest first
+    """
+    start_us, end_us = to_micros(start), to_micros(end)
+    shard = shard_for(device_id)
+    times, rows = [], []
+    day = start.astimezone(timezone.utc).date()
+    while day <= end.astimezone(timezone.utc).date():
+        seg = segment(day, shard, root)
+        picked = seg.rows_for(device_id, start_us, end_us)
+        if len(picked):
+            times.append(seg.column("time")[picked])
+            rows.append(np.stack([seg.column(name)[picked] for name in CHANNELS], axis=1))
+        day += timedelta(days=1)
+    if not rows:
+        return np.zeros(0, dtype="datetime64[us]"), np.zeros((0, len(CHANNELS)), dtype=np.float32)
+    times, rows = np.concatenate(times), np.concatenate(rows)
+    # Blocks from different processes can overlap in time
+    order = np.argsort(times, kind="stable")
+    return times[order].astype("datetime64[us]"), rows[order]
+
+
+def prune(before, root=None):
+    """Delete whole days older than date `before`; returns the samples removed"""
+    root = root or telemetry_dir()
+    removed = 0
+    for day_dir in sorted(root.glob("????-??-??")):
+        try:
+            day = date.fromisoformat(day_dir.name)
+        except ValueError:
+            continue
+        if day >= before:
+            break
+        removed += sum(_indexed_rows(_read_index(shard)) for shard in day_dir.glob("shard-*"))
+        shutil.rmtree(day_dir)
+    return removed
+
+
+class TelemetryWriter:
+    def __init__(self, flush_samples=20000, flush_seconds=2.0, max_buffered=1_000_000):
+        self.flush_samples = flush_samples
+        self.flush_seconds = flush_seconds
+        self.max_buffered = max_buffered
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.flush_lock = threading.Lock()
+        self.pending = []
+        self.buffered = 0
+        self.thread = None
+        self.pid = None
+        self.devices = {}  # segment directory -> {device id: code}
+        self.flushed = 0
+        self.dropped = 0
+
+    def _ensure_thread(self):
+        # Started lazily, and again in each worker after a gunicorn --preload fork
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+                if self.pid != os.getpid():
+                    self.pending, self.buffered, self.devices = [], 0, {}
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self._run, name="telemetry-flush", daemon=True)
+                self.thread.start()
+
+    def append(self, device_id, times, values):
+        """Buffer samples: times (int64 us, from sample_times()), values (n, 6) floats"""
+        self._ensure_thread()
+        values = np.asarray(values, dtype=np.float32).reshape(-1, len(CHANNELS))
+        with self.lock:
+            if self.buffered + len(values) > self.max_buffered:
+                # The disk can't keep up: shed telemetry rather than memory
+                self.dropped += len(values)
+                return
+            self.pending.append((str(device_id), np.asarray(times, dtype=np.int64), values))
+            self.buffered += len(values)
+            if self.buffered >= self.flush_samples:
+                self.wake.notify()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                self.wake.wait_for(lambda: self.buffered >= self.flush_samples, timeout=self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ [BACKEND] Telemetry flush failed: {e}")
+                time.sleep(self.flush_seconds)
+
+    def flush(self, root=None):
+        """Write everything buffered so far; returns the samples written"""
+        with self.flush_lock:
+            with self.lock:
+                pending, self.pending, self.buffered = self.pending, [], 0
+            if not pending:
+                return 0
+            root = root or telemetry_dir()
+            segments = defaultdict(list)
+            for device_id, times, values in pending:
+                days = times // US_PER_DAY
+                shard = shard_for(device_id)
+                for day in np.unique(days):
+                    mask = days == day
+                    directory = segment_dir(date(1970, 1, 1) + timedelta(days=int(day)), shard, root)
+                    segments[directory].append((device_id, times[mask], values[mask]))
+            remaining = list(segments.items())
+            try:
+                while remaining:
+                    self._append_block(*remaining[0])
+                    remaining.pop(0)
+            except Exception:
+                # Keep the segments that weren't written for the next attempt
+                unwritten = [group for _, groups in remaining for group in groups]
+                with self.lock:
+                    self.pending[:0] = unwritten
+                    self.buffered += sum(len(times) for _, times, _ in unwritten)
+                raise
+            written = sum(len(times) for _, times, _ in pending)
+            self.flushed += written
+            return written
+
+    def _device_codes(self, directory, device_ids):
+        """Codes for device_ids in this segment, registering new ones (segment lock held)"""
+        known = self.devices.setdefault(directory, {})
+        path = directory / DEVICES
+        if any(device_id not in known for device_id in device_ids):
+            # Other processes may have registered devices since we last looked
+            lines = path.read_text().split("\n") if path.exists() else [""]
+            if lines[-1]:
+                # A torn last line from a crash: nothing refers to it yet
+                with open(path, "r+") as f:
+                    f.truncate(sum(len(line.encode()) + 1 for line in lines[:-1]))
+            known.clear()
+            for code, line in enumerate(lines[:-1]):
+                # Readers take the first line of an id, so the writer must too
+                known.setdefault(json.loads(line), code)
+            new = [device_id for device_id in dict.fromkeys(device_ids) if device_id not in known]
+            if new:
+                with open(path, "a") as f:
+                    f.write("".join(json.dumps(device_id) + "\n" for device_id in new))
+                    f.flush()
+                    os.fsync(f.fileno())
+                # Codes are line numbers, whatever ids the file repeats
+                known.update((device_id, code) for code, device_id in enumerate(new, len(lines) - 1))
+        return np.array([known[device_id] for device_id in device_ids], dtype=np.uint32)
+
+    def _append_block(self, directory, groups):
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / "lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                index = _read_index(directory)
+                rows = _indexed_rows(index)
+                codes = self._device_codes(directory, [device_id for device_id, _, _ in groups])
+                device = np.concatenate([np.full(len(times), code, dtype=np.uint32)
+                                         for code, (_, times, _) in zip(codes, groups)])
+                times = np.concatenate([times for _, times, _ in groups])
+                values = np.concatenate([values for _, _, values in groups])
+                order = np.lexsort((times, device))
+                columns = {"time": times[order], "device": device[order]}
+                columns.update((name, values[order, i]) for i, name in enumerate(CHANNELS))
+
+                created = not (directory / "index.bin").exists()
+                for name, data in columns.items():
+                    path = directory / f"{name}.{COLUMNS[name].str[1:]}"
+                    with open(path, "ab") as f:
+                        # Drop bytes from a block whose index record never made it
+                        f.truncate(rows * COLUMNS[name].itemsize)
+                        f.write(data.astype(COLUMNS[name], copy=False).tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+                record = np.array([(rows, len(times), times.min(), times.max())], dtype=INDEX)
+                with open(directory / "index.bin", "ab") as f:
+                    f.truncate(len(index) * INDEX.itemsize)
+                    f.write(record.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                if created:
+                    _fsync_dir(directory)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+writer = TelemetryWriter(
+    flush_samples=getattr(settings, "TELEMETRY_FLUSH_SAMPLES", 20000),
+    flush_seconds=getattr(settings, "TELEMETRY_FLUSH_SECONDS", 2.0),
+    max_buffered=getattr(settings, "TELEMETRY_MAX_BUFFERED_SAMPLES", 1_000_000),
+)
+# Best effort: a clean worker shutdown shouldn't lose the last interval
+atexit.register(lambda: writer.pid == os.getpid() and writer.flush())
+
+
+def enabled():
+    return getattr(settings, "TELEMETRY_ENABLED", True)
+
+
+def record(device_id, values, device_times=None, received=None):
+    """Keep raw samples (n, 6) from one request, if the store is enabled"""
+    if enabled() and len(values):
+        writer.append(device_id, sample_times(len(values), device_times, received), values)
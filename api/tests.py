@@ -1,3 +1,1063 @@
-from django.test import TestCase
+import gzip
+import importlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import IntegrityError, connection, connections
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import bench, commit_queue, geo, ids, incidents, ml_model, readings, registry, retention, rollups, routing, synthetic, telemetry, training
+from .cascade import Gate, cascade_predict
+from .compiled_forest import CompiledForest
+from .inference import BatchScheduler, PoolUnavailable, ProcessPoolBackend
+from .ml_model import FEATURES, get_model, predict_accidents
+from .models import AccidentReport, BLEAlert, CloudAlert, HourlyRollup, Incident, SensorReading
+from .statistics import time_series
+from .streaming import StreamingEngine
+
+
+class ReplicaMirrorMixin:
+    """
+    For test cases calling @use_replica views. With DATABASE_REPLICA_URLS
+    set, the replicas are test mirrors of "default"; they share its
+    connection here so they see the test's uncommitted rows.
+    """
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    @classmethod
+    def setUpClass(cls):
+        for alias in settings.DATABASE_REPLICAS:
+            cls.addClassCleanup(connections.__setitem__, alias, connections[alias])
+            connections[alias] = connections["default"]
+        super().setUpClass()
+
+
+def setUpModule():
+    # Models loaded by these tests leave their heartbeats in a scratch
+    # directory instead of api/model_registry/workers/
+    directory = tempfile.TemporaryDirectory()
+    heartbeats = override_settings(MODEL_HEARTBEAT_DIR=directory.name)
+    heartbeats.enable()
+    unittest.addModuleCleanup(directory.cleanup)
+    unittest.addModuleCleanup(heartbeats.disable)
+
+
+class CompiledForestParityTests(SimpleTestCase):
+    """The compiled forest must agree with sklearn row for row"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = get_model()
+        cls.forest = CompiledForest.from_model(cls.model)
+        cls.X = pd.read_csv(settings.BASE_DIR / "sensor_data.csv")[FEATURES].to_numpy()
+
+    def assert_parity(self, X):
+        np.testing.assert_array_equal(self.forest.predict(X), self.model.predict(pd.DataFrame(X, columns=FEATURES)))
+        np.testing.assert_array_equal(self.forest.predict_proba(X), self.model.predict_proba(pd.DataFrame(X, columns=FEATURES)))
+
+    def test_sensor_data(self):
+        self.assert_parity(self.X)
+
+    def test_split_thresholds(self):
+        # Values sitting exactly on a split must take the same `<=` branch
+        thresholds = self.forest.threshold[np.isfinite(self.forest.threshold)]
+        self.assert_parity(np.repeat(thresholds[:, None], len(FEATURES), axis=1))
+
+    def test_out_of_range_and_missing(self):
+        rng = np.random.default_rng(42)
+        X = rng.uniform(-300, 300, size=(5000, len(FEATURES)))
+        X[::13, 2] = np.nan
+        self.assert_parity(X)
+
+    def test_single_rows(self):
+        for row in self.X[:20]:
+            self.assert_parity(row[None, :])
+
+    def test_predict_accidents_uses_same_labels(self):
+        readings = [dict(zip(FEATURES, row)) for row in self.X]
+        expected = ["high" if pred == 1 else "low" for pred in self.model.predict(pd.DataFrame(self.X, columns=FEATURES))]
+        self.assertEqual(predict_accidents(readings), expected)
+
+
+class CascadeGateTests(SimpleTestCase):
+    def test_gate_never_changes_the_forest_prediction(self):
+        forest = registry.load_forest("v1")
+        gate = Gate.from_dict(registry.read_meta("v1")["gate"])
+        rng = np.random.default_rng(7)
+        X = rng.uniform(gate.lower, gate.upper, size=(20000, len(FEATURES)))
+        self.assertTrue(gate.contains(X).all())
+        np.testing.assert_array_equal(forest.predict(X), np.full(len(X), gate.label))
+
+    def test_cascade_returns_the_forest_probability_with_the_class(self):
+        forest = registry.load_forest("v1")
+        gate = Gate.from_dict(registry.read_meta("v1")["gate"])
+        rng = np.random.default_rng(8)
+        X = np.concatenate([rng.uniform(gate.lower, gate.upper, size=(50, len(FEATURES))),
+                            rng.normal(0, 60, size=(200, len(FEATURES)))]).astype(np.float32)
+        preds, probabilities, gated = cascade_predict(forest, gate, X)
+        inside = gate.contains(X)
+        self.assertEqual(gated, inside.sum())
+        np.testing.assert_array_equal(preds, forest.predict(X))
+        self.assertTrue(np.isnan(probabilities[inside]).all())
+        proba = forest.predict_proba(X[~inside])[:, list(forest.classes).index(1)]
+        np.testing.assert_allclose(probabilities[~inside], proba, rtol=1e-6)
+
+
+class AlertStatisticsTests(ReplicaMirrorMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for days, severity in [(0, "high"), (0, "low"), (3, "medium"), (30, "high")]:
+            BLEAlert.objects.create(severity=severity, timestamp=now - timezone.timedelta(days=days))
+        for days, state, emergency in [(0, "sent", True), (2, "failed", False), (10, "delivered", True)]:
+            CloudAlert.objects.create(device_token="t", status=state, is_emergency=emergency,
+                                      timestamp=now - timezone.timedelta(days=days))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rollups_plus_edge_queries_then_cached(self):
+        # One rollup aggregate, plus one partial-hour query per table
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("alert_statistics"))
+        stats = response.json()["statistics"]
+        self.assertEqual(stats["ble_alerts"]["total"], 4)
+        self.assertEqual(stats["ble_alerts"]["last_7_days"], 3)
+        self.assertEqual(stats["ble_alerts"]["severity_breakdown"], {"high": 2, "medium": 1, "low": 1})
+        self.assertEqual(stats["cloud_alerts"]["last_7_days"], 2)
+        self.assertEqual(stats["cloud_alerts"]["emergency_alerts"], 2)
+        self.assertEqual(stats["cloud_alerts"]["status_breakdown"], {"sent": 1, "delivered": 1, "failed": 1})
+        self.assertEqual(stats["total_alerts"], 7)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse("alert_statistics")).json()["statistics"], stats)
+
+    def test_rollups_follow_updates_deletes_and_rebuild(self):
+        alert = BLEAlert.objects.filter(severity="medium").get()
+        alert.status = "expired"
+        alert.save()
+        CloudAlert.objects.filter(status="failed").get().delete()
+        report = AccidentReport(latitude=0, longitude=0, severity="high")
+        AccidentReport.objects.bulk_create([report])
+        rollups.record_created([report])
+
+        def buckets():
+            return sorted(HourlyRollup.objects.filter(count__gt=0).values_list(*rollups.KEY_FIELDS, "count"))
+
+        live = buckets()
+        self.assertIn("expired", [row[3] for row in live])
+        self.assertEqual(sum(row[-1] for row in live), 7)
+        rollups.rebuild()
+        self.assertEqual(buckets(), live)
+
+        now = timezone.now()
+        series = time_series(now - timezone.timedelta(days=40), now, "day")
+        self.assertEqual(sum(point["count"] for point in series), 7)
+        self.assertEqual(sum(point["channels"].get("sensor", 0) for point in series), 1)
+
+    def test_rollups_read_the_row_only_for_deferred_key_changes(self):
+        def buckets():
+            return sorted(HourlyRollup.objects.filter(count__gt=0).values_list(*rollups.KEY_FIELDS, "count"))
+
+        alert = BLEAlert.objects.filter(severity="high").first()
+        alert.message = "Still there"
+        with self.assertNumQueries(1):
+            alert.save()
+        # Untouched deferred key fields aren't written, so nothing is read either
+        cloud = CloudAlert.objects.filter(status="sent").first()
+        deferred = CloudAlert.objects.only("id", "title").get(pk=cloud.pk)
+        deferred.title = "Gone"
+        with self.assertNumQueries(1):
+            deferred.save()
+
+        deferred = CloudAlert.objects.only("id", "title").get(pk=cloud.pk)
+        deferred.status = "read"
+        with CaptureQueriesContext(connection) as queries:
+            deferred.save()
+        # The old status is read once; the new and old buckets are then adjusted
+        self.assertEqual(sum(query["sql"].startswith('SELECT "api_cloudalert"') for query in queries), 1)
+        live = buckets()
+        rollups.rebuild()
+        self.assertEqual(buckets(), live)
+        self.assertIn("read", [row[3] for row in live])
+
+
+class KeysetPaginationTests(ReplicaMirrorMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # Pairs of rows share a timestamp so ties must be broken by id
+        BLEAlert.objects.bulk_create(
+            BLEAlert(severity="high", timestamp=now - timezone.timedelta(minutes=i // 2)) for i in range(25)
+        )
+
+    def test_pages_cover_every_row_once_in_order(self):
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {"page_size": 4} | ({"cursor": cursor} if cursor else {})
+            # One query per page, however deep
+            with self.assertNumQueries(1):
+                body = self.client.get(reverse("ble_alerts_list"), params).json()
+            self.assertNotIn("count", body)
+            pages += 1
+            seen += [alert["id"] for alert in body["alerts"]]
+            cursor = body["next_cursor"]
+            self.assertEqual(body["has_more"], cursor is not None)
+            if not cursor:
+                break
+
+        expected = [str(pk) for pk in BLEAlert.objects.order_by("-timestamp", "-pk").values_list("pk", flat=True)]
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 7)
+
+    def test_counts_on_request(self):
+        with self.assertNumQueries(2):
+            body = self.client.get(reverse("ble_alerts_list"), {"page_size": 4, "include_counts": "1"}).json()
+        self.assertEqual(body["count"], 25)
+        self.assertEqual(body["statistics"]["high_severity"], 25)
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse("ble_alerts_list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for days, severity in [(1, "high"), (2, "low"), (3, "high"), (9, "high")]:
+            BLEAlert.objects.create(severity=severity, timestamp=now - timezone.timedelta(days=days))
+
+    def export(self, **params):
+        response = self.client.get(reverse("export_rows", args=["ble-alerts"]), params)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_filters_in_sql_oldest_first(self):
+        start = (timezone.now() - timezone.timedelta(days=5)).isoformat()
+        rows = [json.loads(line) for line in self.export(severity="high", start=start).splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertLess(rows[0]["timestamp"], rows[1]["timestamp"])
+
+    def test_csv(self):
+        lines = self.export(format="csv").splitlines()
+        self.assertEqual(lines[0].split(",")[:2], ["id", "message"])
+        self.assertEqual(len(lines), 5)
+
+
+class NearbyTests(TestCase):
+    def test_cell_index_matches_brute_force(self):
+        rng = np.random.default_rng(3)
+        # Points around Hyderabad plus a cluster straddling the antimeridian
+        lats = np.concatenate([17.385 + rng.normal(0, 0.1, 300), -16.5 + rng.normal(0, 0.05, 100)])
+        lons = np.concatenate([78.4867 + rng.normal(0, 0.1, 300), (180 + rng.normal(0, 0.05, 100) + 180) % 360 - 180])
+        for lat, lon in zip(lats, lons):
+            AccidentReport.objects.create(latitude=lat, longitude=lon, severity="high")
+
+        for lat, lon, radius in [(17.385, 78.4867, 5), (17.4, 78.5, 12.5), (-16.5, 179.99, 4), (-16.5, -179.99, 8)]:
+            response = self.client.get(reverse("nearby"), {"lat": lat, "lon": lon, "radius_km": radius, "limit": 1000})
+            body = response.json()
+            expected = int((geo.haversine_km(lat, lon, lats, lons) <= radius).sum())
+            self.assertGreater(expected, 0)
+            self.assertEqual(body["count"], expected)
+            distances = [item["distance_km"] for item in body["results"]]
+            self.assertEqual(distances, sorted(distances))
+            self.assertLess(body["candidates_scanned"], len(lats))
+
+            # The SQL distance filter agrees with the NumPy one
+            inside = geo.within(AccidentReport.objects.all(), lat, lon, radius)
+            self.assertEqual(inside.count(), expected)
+
+
+class IncidentTests(TestCase):
+    def setUp(self):
+        incidents.forget_all()
+
+    def notify(self, lat, lon, severity="medium"):
+        response = self.client.post(reverse("emergency_notify"), {"latitude": lat, "longitude": lon, "severity": severity},
+                                    content_type="application/json")
+        return response.json()["report"]
+
+    def test_nearby_reports_join_one_incident(self):
+        first = self.notify(17.3850, 78.4867)
+        second = self.notify(17.3860, 78.4870, "high")  # ~120 m away
+        far = self.notify(17.4000, 78.4867)  # ~1.7 km away
+        self.assertTrue(first["is_new_incident"])
+        self.assertFalse(second["is_new_incident"])
+        self.assertEqual(first["incident"], second["incident"])
+        self.assertTrue(far["is_new_incident"])
+        incident = Incident.objects.get(pk=first["incident"])
+        self.assertEqual((incident.report_count, incident.severity), (2, "high"))
+
+        # Another worker's incident is found through the table
+        incidents.forget_all()
+        self.assertEqual(self.notify(17.3851, 78.4868)["incident"], first["incident"])
+
+        # Once the window has passed, the same spot opens a new incident
+        Incident.objects.update(last_report_at=timezone.now() - timezone.timedelta(hours=1))
+        later = self.notify(17.3850, 78.4867)
+        self.assertTrue(later["is_new_incident"])
+        self.assertNotEqual(later["incident"], first["incident"])
+
+    def test_unlocated_and_lone_low_reports_stay_out_of_incidents(self):
+        for reading in ({}, {"latitude": 0, "longitude": 0}, {"latitude": 0, "longitude": 0, "acc_x": 50}):
+            self.client.post(reverse("sensor_accident"), reading, content_type="application/json")
+        self.assertEqual(AccidentReport.objects.count(), 3)
+        self.assertFalse(AccidentReport.objects.filter(incident__isnull=False).exists())
+
+        low = AccidentReport.objects.create(latitude=17.385, longitude=78.4867, severity="low")
+        self.assertIsNone(low.incident_id)
+        high = AccidentReport.objects.create(latitude=17.385, longitude=78.4867, severity="high")
+        # Once a crash is reported, low readings next to it join it
+        later = AccidentReport.objects.create(latitude=17.3851, longitude=78.4867, severity="low")
+        self.assertEqual(later.incident_id, high.incident_id)
+        self.assertEqual(Incident.objects.get().report_count, 2)
+
+    def test_bulk_assign_clusters_within_the_batch(self):
+        reports = [AccidentReport(latitude=17.385 + i * 1e-4, longitude=78.4867, severity="high") for i in range(5)]
+        reports.append(AccidentReport(latitude=28.6139, longitude=77.209, severity="high"))
+        incidents.assign(reports)
+        AccidentReport.objects.bulk_create(reports)
+        self.assertEqual([r.opened_incident for r in reports], [True, False, False, False, False, True])
+        self.assertEqual(len({r.incident_id for r in reports[:5]}), 1)
+        self.assertEqual(Incident.objects.get(pk=reports[0].incident_id).report_count, 5)
+        self.assertEqual(Incident.objects.count(), 2)
+
+
+class RetentionTests(TestCase):
+    def buckets(self):
+        return sorted(HourlyRollup.objects.filter(count__gt=0).values_list(*rollups.KEY_FIELDS, "count"))
+
+    def test_expire_then_archive_and_delete(self):
+        now = timezone.now()
+        for seconds, duration in [(10, 30), (40, 30), (120, 60), (100 * 86400, 30)]:
+            BLEAlert.objects.create(timestamp=now - timezone.timedelta(seconds=seconds), broadcast_duration=duration)
+        CloudAlert.objects.create(device_token="t", timestamp=now - timezone.timedelta(days=400))
+
+        self.assertEqual(retention.expire_ble_alerts(now, batch_size=2), 3)
+        self.assertEqual(BLEAlert.objects.exclude(status="expired").count(), 1)
+        self.assertEqual(retention.expire_ble_alerts(now), 0)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(ARCHIVE_DIR=directory):
+            self.assertEqual(retention.archive_and_delete("ble-alerts", now, batch_size=1), 1)
+            self.assertEqual(retention.archive_and_delete("cloud-alerts", now), 1)
+            self.assertEqual(retention.archive_and_delete("reports", now), 0)
+            files = sorted(Path(directory).rglob("*.ndjson.gz"))
+            self.assertEqual([f.parent.name for f in files], ["ble-alerts", "cloud-alerts"])
+            archived = json.loads(gzip.decompress(files[0].read_bytes()))
+            self.assertEqual(archived["status"], "expired")
+
+        self.assertEqual((BLEAlert.objects.count(), CloudAlert.objects.count()), (3, 0))
+        # Adjusted in place, the rollups match a rebuild from the raw tables
+        live = self.buckets()
+        rollups.rebuild()
+        self.assertEqual(self.buckets(), live)
+
+    def test_deleted_reports_leave_their_incidents(self):
+        now = timezone.now()
+        shared = Incident.objects.create(latitude=0, longitude=0, geo_cell=0, report_count=3)
+        alone = Incident.objects.create(latitude=0, longitude=0, geo_cell=0, report_count=1)
+        old = [AccidentReport.objects.create(latitude=0, longitude=0, severity="high", incident=incident)
+               for incident in (shared, shared, alone, None)]
+        kept = AccidentReport.objects.create(latitude=0, longitude=0, severity="low", incident=shared)
+        SensorReading.objects.create(report=old[0], timestamp=now, values=b"")
+        AccidentReport.objects.filter(pk__in=[report.pk for report in old]).update(
+            timestamp=now - timezone.timedelta(days=400)
+        )
+        rollups.rebuild()
+
+        self.assertEqual(retention.archive_and_delete("reports", now, batch_size=3, archive=False), 4)
+        self.assertEqual(list(AccidentReport.objects.values_list("pk", flat=True)), [kept.pk])
+        self.assertFalse(SensorReading.objects.exists())
+        self.assertEqual(list(Incident.objects.values_list("pk", "report_count")), [(shared.pk, 1)])
+        self.assertEqual(AccidentReport.objects.get().incident_id, shared.pk)
+        live = self.buckets()
+        rollups.rebuild()
+        self.assertEqual(self.buckets(), live)
+
+
+class ActiveBLEAlertTests(ReplicaMirrorMixin, TestCase):
+    def test_expires_at_and_active_filter(self):
+        now = timezone.now()
+        live = BLEAlert.objects.create(latitude=17.385, longitude=78.4867, broadcast_duration=60,
+                                       timestamp=now - timezone.timedelta(seconds=30))
+        far = BLEAlert.objects.create(latitude=28.6139, longitude=77.209, broadcast_duration=60)
+        over = BLEAlert.objects.create(latitude=17.385, longitude=78.4867, broadcast_duration=10,
+                                       timestamp=now - timezone.timedelta(seconds=30))
+        BLEAlert.objects.create(latitude=17.385, longitude=78.4867, status="expired")
+        self.assertEqual(live.expires_at, live.timestamp + timezone.timedelta(seconds=60))
+
+        def active_ids(**params):
+            response = self.client.get(reverse("ble_alerts_list"), {"active": "true", **params})
+            return {alert["id"] for alert in response.json()["alerts"]}
+
+        self.assertEqual(active_ids(), {str(live.id), str(far.id)})
+        self.assertEqual(active_ids(lat=17.385, lon=78.4867, radius_km=1), {str(live.id)})
+
+        # Extending the broadcast moves expires_at with it
+        over.broadcast_duration = 120
+        over.save()
+        self.assertEqual(active_ids(lat=17.385, lon=78.4867, radius_km=1), {str(live.id), str(over.id)})
+
+        nearby = self.client.get(reverse("nearby"), {"kind": "ble-alerts", "active": "true", "lat": 28.6, "lon": 77.2}).json()
+        self.assertEqual([alert["id"] for alert in nearby["results"]], [str(far.id)])
+        self.assertEqual(self.client.get(reverse("ble_alerts_list"), {"lat": 91, "lon": 0}).status_code, 400)
+
+
+class BLEAlertBulkTests(TestCase):
+    def test_bulk_relay_validates_and_deduplicates(self):
+        BLEAlert.objects.create(client_id="stored", severity="low")
+        alerts = [
+            {"client_id": f"phone-{i}", "latitude": 17.385, "longitude": 78.4867, "severity": "high",
+             "duration_seconds": 60, "timestamp": "2026-01-01T10:00:00Z"}
+            for i in range(50)
+        ]
+        alerts += [
+            {"client_id": "phone-0", "severity": "high"},  # repeated within the upload
+            {"client_id": "stored"},
+            {"client_id": "bad-lat", "latitude": 123, "longitude": 0},
+            {"client_id": "bad-severity", "severity": "extreme"},
+            {"latitude": 1, "longitude": 1},
+            "not an alert",
+        ]
+        # Lookup, insert, inserted-check and one rollup bucket (plus savepoints),
+        # whatever the upload size
+        with self.assertNumQueries(11):
+            response = self.client.post(reverse("ble_alerts_bulk"), {"alerts": alerts}, content_type="application/json")
+        body = response.json()
+        self.assertEqual((body["created"], body["duplicates"], body["invalid"]), (50, 2, 4))
+        self.assertEqual([r["status"] for r in body["results"][50:]], ["duplicate", "duplicate"] + ["invalid"] * 4)
+        self.assertEqual(body["results"][51]["id"], str(BLEAlert.objects.get(client_id="stored").id))
+
+        alert = BLEAlert.objects.get(client_id="phone-7")
+        self.assertEqual(alert.geo_cell, geo.cell_for(17.385, 78.4867))
+        self.assertEqual(alert.expires_at - alert.timestamp, timezone.timedelta(seconds=60))
+        self.assertEqual(sum(HourlyRollup.objects.filter(channel="ble").values_list("count", flat=True)), 51)
+
+        # Reconnecting again changes nothing
+        again = self.client.post(reverse("ble_alerts_bulk"), {"alerts": alerts[:50]}, content_type="application/json")
+        self.assertEqual(again.json()["duplicates"], 50)
+        self.assertEqual(BLEAlert.objects.count(), 51)
+
+
+class BLEAlertRelayTests(TestCase):
+    def post(self, **fields):
+        return self.client.post(reverse("ble_alert"), {"severity": "high", **fields}, content_type="application/json")
+
+    def test_resent_alert_is_returned_not_stored_again(self):
+        first = self.post(client_id="phone-1")
+        again = self.post(client_id="phone-1")
+        self.assertEqual((first.status_code, again.status_code), (201, 200))
+        self.assertTrue(again.json()["duplicate"])
+        self.assertEqual(again.json()["alert_id"], first.json()["alert_id"])
+        self.assertEqual(BLEAlert.objects.count(), 1)
+
+    def test_relay_losing_the_insert_race_gets_the_stored_alert(self):
+        # Another relay stores the same alert between our lookup and insert
+        winner = BLEAlert(client_id="phone-2", severity="low")
+
+        def race(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if sql.startswith('SELECT') and '"client_id"' in sql and winner._state.adding:
+                BLEAlert.objects.bulk_create([winner])
+            return result
+
+        with connection.execute_wrapper(race):
+            response = self.post(client_id="phone-2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["alert_id"], str(winner.pk))
+        self.assertEqual(BLEAlert.objects.count(), 1)
+
+
+class UUID7Tests(SimpleTestCase):
+    def test_keys_increase_and_carry_their_time(self):
+        before = timezone.now()
+        keys = [ids.uuid7() for _ in range(20000)]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertTrue(all(key.version == 7 and key.variant == uuid.RFC_4122 for key in keys))
+        # The first 48 bits are the Unix time in milliseconds
+        self.assertLess(abs((keys[0].int >> 80) - before.timestamp() * 1000), 1000)
+
+        past = timezone.now() - timezone.timedelta(days=3)
+        self.assertEqual(ids.uuid7(past).int >> 80, int(past.timestamp() * 1000))
+
+
+@override_settings(SQLITE_COMMIT_QUEUE=True)
+class CommitQueueTests(TransactionTestCase):
+    def test_concurrent_writes_are_group_committed(self):
+        groups = commit_queue.committer.groups
+        errors = []
+
+        def write(n):
+            try:
+                for i in range(25):
+                    commit_queue.create(CloudAlert, device_token=f"{n}-{i}")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(CloudAlert.objects.count(), 200)
+        self.assertLess(commit_queue.committer.groups - groups, 200)
+
+    def test_failed_write_only_fails_its_own_request(self):
+        BLEAlert.objects.create(client_id="taken")
+        jobs = [(lambda c=c: BLEAlert.objects.create(client_id=c), Future()) for c in ("a", "taken", "b")]
+        commit_queue.committer._commit(jobs)
+        self.assertIsInstance(jobs[1][1].exception(), IntegrityError)
+        self.assertEqual(jobs[0][1].result().client_id, "a")
+        self.assertEqual(sorted(BLEAlert.objects.values_list("client_id", flat=True)), ["a", "b", "taken"])
+
+    def test_timed_out_write_is_withdrawn_and_a_running_one_is_awaited(self):
+        committer = commit_queue.GroupCommitter(timeout=0.2)
+        started, release = threading.Event(), threading.Event()
+
+        def busy():
+            started.set()
+            release.wait(5)
+            return "slow"
+
+        results = []
+        blocker = threading.Thread(target=lambda: results.append(committer.submit(busy)))
+        blocker.start()
+        started.wait(5)
+        # Queued behind a busy writer: the caller hears "timed out" and the row never appears
+        with self.assertRaises(FutureTimeout):
+            committer.submit(lambda: CloudAlert.objects.create(device_token="late"))
+        release.set()
+        blocker.join()
+        # Running past the timeout: the caller gets the committed result, not an error
+        self.assertEqual(results, ["slow"])
+        self.assertEqual(committer.submit(lambda: time.sleep(0.4) or "done"), "done")
+        self.assertFalse(CloudAlert.objects.filter(device_token="late").exists())
+
+
+@override_settings(DATABASE_REPLICAS=["replica_test"])
+class ReplicaRoutingTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "replica.sqlite3")
+        connections.settings["replica_test"] = dict(connections["default"].settings_dict, NAME=cls.path)
+        # Declared only now: the test runner would try to create the alias's test database
+        cls.databases = {"default", "replica_test"}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica_test"].close()
+        del connections["replica_test"]
+        del connections.settings["replica_test"]
+        cls.directory.cleanup()
+
+    def setUp(self):
+        # The replica is a copy of the primary taken now; later writes are "lag"
+        AccidentReport.objects.create(latitude=1, longitude=1, severity="low")
+        connections["replica_test"].close()
+        connection.ensure_connection()
+        with sqlite3.connect(self.path) as replica:
+            connection.connection.backup(replica)
+        routing.health.reset()
+
+    def report_count(self, client=None):
+        response = (client or self.client).get(reverse("accident_reports"))
+        return len(response.json()["reports"])
+
+    def test_reads_use_replica_writes_use_primary(self):
+        AccidentReport.objects.create(latitude=2, longitude=2, severity="low")
+        self.assertEqual(self.report_count(), 1)
+
+        response = self.client.post(
+            reverse("accident_reports"), {"latitude": 3, "longitude": 3, "severity": "high"}, content_type="application/json"
+        )
+        self.assertIn(routing.STICKY_COOKIE, response.cookies)
+        self.assertEqual(AccidentReport.objects.count(), 3)
+        self.assertEqual(AccidentReport.objects.using("replica_test").count(), 1)
+        # The writer now reads its own writes; other clients still see the replica
+        self.assertEqual(self.report_count(), 3)
+        self.assertEqual(self.report_count(self.client_class()), 1)
+
+    def test_falls_back_to_primary(self):
+        AccidentReport.objects.create(latitude=2, longitude=2, severity="low")
+        with override_settings(REPLICA_MAX_LAG_SECONDS=-1):
+            self.assertEqual(self.report_count(), 2)
+
+        routing.health.reset()
+        replica = connections["replica_test"]
+        replica.close()
+        replica.settings_dict["NAME"] = os.path.join(self.directory.name, "missing", "x.sqlite3")
+        self.addCleanup(replica.settings_dict.__setitem__, "NAME", self.path)
+        self.assertEqual(self.report_count(), 2)
+
+
+class SensorReadingTests(TestCase):
+    def test_sensor_reports_load_as_a_matrix(self):
+        rng = np.random.default_rng(0)
+        rows = rng.normal(0, 40, (20, len(FEATURES))).round(3)
+        single = dict(zip(FEATURES, rows[0].tolist()), latitude=17.385, longitude=78.4867)
+        self.client.post(reverse("sensor_accident"), single, content_type="application/json")
+        batch = [dict(zip(FEATURES, row)) for row in rows[1:].tolist()]
+        response = self.client.post(reverse("sensor_accident_batch"), {"readings": batch}, content_type="application/json")
+        stored = [0] + [i + 1 for i, result in enumerate(response.json()["results"]) if result["severity"] == "high"]
+
+        times, matrix = readings.load_matrix()
+        self.assertEqual(matrix.shape, (len(stored), len(FEATURES) + 1))
+        np.testing.assert_array_equal(matrix[:, :-1], rows[stored].astype(np.float32))
+        # Only high-severity readings are stored, so the forest scored each one
+        self.assertTrue(((matrix[:, -1] >= 0.5) & (matrix[:, -1] <= 1)).all())
+        reports = AccidentReport.objects.order_by("timestamp", "pk")
+        self.assertEqual(times.tolist(), [report.timestamp.replace(tzinfo=None) for report in reports])
+
+        # Retention deletes the readings along with their reports
+        with tempfile.TemporaryDirectory() as directory, override_settings(ARCHIVE_DIR=directory):
+            retention.archive_and_delete("reports", timezone.now() + timezone.timedelta(days=400))
+        self.assertFalse(SensorReading.objects.exists())
+
+    def test_backfill_parses_old_descriptions(self):
+        migration = importlib.import_module("api.migrations.0012_sensorreading")
+        description = "Sensor data detected accident: acc_x=12.3, acc_y=20.4, acc_z=18.1, gyro_x=80.3, gyro_y=-65.1, gyro_z=90.8"
+        self.assertEqual(migration.parse_description(description), [12.3, 20.4, 18.1, 80.3, -65.1, 90.8])
+        self.assertIsNone(migration.parse_description("Sensor data detected accident: acc_x=1"))
+
+
+class TelemetryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.enterContext(override_settings(TELEMETRY_DIR=self.root, TELEMETRY_SHARDS=4))
+
+    def test_samples_round_trip_across_days_and_crashes(self):
+        writer = telemetry.TelemetryWriter(flush_samples=10**9, flush_seconds=3600)
+        midnight = timezone.datetime(2026, 3, 1, tzinfo=timezone.get_fixed_timezone(0))
+        rng = np.random.default_rng(0)
+        values = {device: rng.normal(size=(300, 6)).astype(np.float32) for device in ("a", "b")}
+        times = {device: telemetry.sample_times(300, received=midnight + timezone.timedelta(seconds=3)) for device in values}
+        for device in values:
+            writer.append(device, times[device][:150], values[device][:150])
+        self.assertEqual(writer.flush(), 300)
+
+        # A flush that died after writing column bytes but before its index record
+        shard = self.root / "2026-03-01" / f"shard-{telemetry.shard_for('a'):02d}"
+        with open(shard / "acc_x.f4", "ab") as f:
+            f.write(b"\xff" * 40)
+        with open(shard / "index.bin", "ab") as f:
+            f.write(b"\x01" * 7)
+        for device in values:
+            writer.append(device, times[device][150:], values[device][150:])
+        writer.flush()
+
+        got_times, got = telemetry.samples("a", midnight - timezone.timedelta(hours=1), midnight + timezone.timedelta(hours=1))
+        np.testing.assert_array_equal(got_times.astype(np.int64), times["a"])
+        np.testing.assert_array_equal(got, values["a"])
+        got_times, got = telemetry.samples("b", midnight, midnight + timezone.timedelta(seconds=1))
+        in_range = (times["b"] >= telemetry.to_micros(midnight)) & (times["b"] < telemetry.to_micros(midnight) + 1_000_000)
+        np.testing.assert_array_equal(got, values["b"][in_range])
+        self.assertEqual(len(telemetry.samples("c", midnight, midnight + timezone.timedelta(hours=1))[1]), 0)
+
+        before_midnight = sum(int((t < telemetry.to_micros(midnight)).sum()) for t in times.values())
+        self.assertEqual(telemetry.prune(midnight.date()), before_midnight)
+        self.assertEqual([p.name for p in self.root.iterdir()], ["2026-03-01"])
+
+    def test_device_ids_with_line_breaks_keep_their_own_codes(self):
+        writer = telemetry.TelemetryWriter(flush_samples=10**9, flush_seconds=3600)
+        received = timezone.datetime(2026, 3, 2, tzinfo=timezone.get_fixed_timezone(0))
+        shards = {telemetry.shard_for(device) for device in ("x", "x\ny", "y", "x\r")}
+        for shard in shards:
+            # A devices file that repeats an id, as a pre-JSON writer could leave it
+            directory = telemetry.segment_dir(received.date(), shard)
+            directory.mkdir(parents=True)
+            (directory / telemetry.DEVICES).write_text('"old"\n"dup"\n"dup"\n')
+        devices = ["x", "x\ny", "y", "x\r"]
+        for i, device in enumerate(devices):
+            writer.append(device, telemetry.sample_times(3, received=received), np.full((3, 6), i, dtype=np.float32))
+        writer.flush()
+
+        minute = timezone.timedelta(minutes=1)
+        for i, device in enumerate(devices):
+            _, values = telemetry.samples(device, received - minute, received + minute)
+            self.assertEqual(values[:, 0].tolist(), [i] * 3)
+            segment = telemetry.segment(received.date(), telemetry.shard_for(device))
+            self.assertEqual(segment.devices()[:3], ["old", "dup", "dup"])
+            self.assertIn(device, segment.devices())
+
+    def test_stream_samples_are_kept(self):
+        samples = [{"acc_x": i, "acc_y": 0, "acc_z": 9.8, "gyro_x": 0, "gyro_y": 0, "gyro_z": 0, "t": i / 50} for i in range(5)]
+        self.client.post(reverse("sensor_accident_stream"), {"device_id": "phone-1", "samples": samples},
+                         content_type="application/json")
+        telemetry.writer.flush()
+        now = timezone.now()
+        times, values = telemetry.samples("phone-1", now - timezone.timedelta(minutes=1), now)
+        self.assertEqual(values[:, 0].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(np.diff(times.astype(np.int64)).tolist(), [20000] * 4)
+
+
+class DeviceWindowTests(SimpleTestCase):
+    def test_incremental_features_match_recomputation_past_capacity(self):
+        size = 16
+        engine = StreamingEngine(window_size=size, sample_rate=50)
+        rng = np.random.default_rng(0)
+        samples = rng.normal(0, 20, (5 * size + 3, 6)).astype(np.float32)
+        # Spiky samples early on must drop out of the running maxima once evicted
+        samples[3, :3] = 500
+        times = np.cumsum(rng.uniform(0.005, 0.05, len(samples)))
+
+        acc = samples[:, :3].astype(np.float64)
+        acc_mag = np.sqrt((acc ** 2).sum(axis=1))
+        dt = np.r_[1 / 50, np.maximum(np.diff(times), 1e-3)]
+        jerk = np.r_[0, np.sqrt((np.diff(acc, axis=0) ** 2).sum(axis=1)) / dt[1:]]
+        gyro = samples[:, 3:].astype(np.float64)
+
+        for i in range(len(samples)):
+            window, [(features, peak)] = engine.push("d", samples[i:i + 1], times[i:i + 1])
+            lo = max(0, i + 1 - size)
+            self.assertEqual(features["samples"], i + 1 - lo)
+            self.assertAlmostEqual(features["peak_acc"], acc_mag[lo:i + 1].max(), places=2)
+            self.assertAlmostEqual(features["peak_jerk"], jerk[lo:i + 1].max(), delta=jerk[lo:i + 1].max() * 1e-5)
+            self.assertAlmostEqual(features["gyro_energy"], (gyro[lo:i + 1] ** 2).sum(axis=1).mean(), places=2)
+            rotation = (gyro[lo:i + 1] * dt[lo:i + 1, None]).sum(axis=0)
+            self.assertAlmostEqual(features["orientation_change"], np.sqrt(rotation @ rotation), places=3)
+            np.testing.assert_array_equal(peak, samples[lo + acc_mag[lo:i + 1].argmax()])
+
+
+class BatchSchedulerTests(SimpleTestCase):
+    def scheduler(self, predict=None, window_ms=50, max_batch=64):
+        self.calls = []
+
+        def predict_batch(rows):
+            self.calls.append(len(rows))
+            return (predict or (lambda rows: rows.sum(axis=1)))(rows)
+        return BatchScheduler(predict_batch, window_ms=window_ms, max_batch=max_batch)
+
+    def test_lone_request_waits_at_most_the_window(self):
+        scheduler = self.scheduler(window_ms=50)
+        started = time.monotonic()
+        self.assertEqual(scheduler.submit(np.array([1.0, 2.0])).result(timeout=2), 3.0)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.calls, [1])
+
+    def test_concurrent_requests_share_one_predict(self):
+        scheduler = self.scheduler(window_ms=200)
+        futures = [scheduler.submit(np.array([float(i)])) for i in range(8)]
+        self.assertEqual([future.result(timeout=2) for future in futures], list(range(8)))
+        self.assertEqual(self.calls, [8])
+
+    def test_backlog_is_drained_into_full_batches(self):
+        release = threading.Event()
+
+        def slow(rows):
+            release.wait(2)
+            return rows.sum(axis=1)
+        scheduler = self.scheduler(slow, window_ms=1, max_batch=64)
+        first = scheduler.submit(np.array([0.0]))
+        while not self.calls:
+            time.sleep(0.001)
+        # Queued while the first batch runs; their windows are long over by then
+        backlog = [scheduler.submit(np.array([float(i)])) for i in range(10)]
+        time.sleep(0.05)
+        release.set()
+        self.assertEqual([future.result(timeout=2) for future in [first] + backlog], [0.0] + list(range(10)))
+        self.assertEqual(self.calls, [1, 10])
+
+    def test_predict_error_reaches_every_waiter(self):
+        def broken(rows):
+            raise RuntimeError("model exploded")
+        scheduler = self.scheduler(broken, window_ms=100)
+        futures = [scheduler.submit(np.array([1.0])) for _ in range(3)]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "model exploded"):
+                future.result(timeout=2)
+        self.assertEqual(self.calls, [3])
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        from sklearn.ensemble import RandomForestClassifier
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, len(FEATURES)))
+        self.models = [
+            RandomForestClassifier(n_estimators=trees, random_state=0).fit(X, (X[:, 0] > 0).astype(int))
+            for trees in (3, 5, 7)
+        ]
+        # Serve from the scratch registry; the suite's model comes back afterwards
+        for name in ("_served", "_generation", "_next_check", "_reloading"):
+            self.addCleanup(setattr, ml_model, name, getattr(ml_model, name))
+        self.addCleanup(setattr, registry, "REGISTRY_DIR", registry.REGISTRY_DIR)
+        registry.REGISTRY_DIR = self.root
+        ml_model._served = ml_model._generation = None
+        ml_model._next_check, ml_model._reloading = 0.0, False
+
+    def wait_for_reload(self):
+        for thread in threading.enumerate():
+            if thread.name == "model-reload":
+                thread.join(10)
+
+    def test_register_activate_and_generation(self):
+        self.assertIsNone(registry.generation())
+        first = registry.register(self.models[0], FEATURES, activate=True)
+        second = registry.register(self.models[1], FEATURES)
+        self.assertEqual((first["version"], second["version"]), ("v1", "v2"))
+        self.assertEqual([meta["version"] for meta in registry.list_versions()], ["v1", "v2"])
+        self.assertEqual(registry.active_version(), "v1")
+        generation = registry.generation()
+        registry.activate_version("v2")
+        self.assertEqual(registry.active_version(), "v2")
+        self.assertNotEqual(registry.generation(), generation)
+        with self.assertRaises(registry.RegistryError):
+            registry.activate_version("v9")
+
+        # A gate added to the active version reaches running workers too
+        generation = registry.generation()
+        registry.update_meta("v1", gate=None)
+        self.assertEqual(registry.generation(), generation)
+        registry.update_meta("v2", gate={"lower": [0] * 6, "upper": [1] * 6, "label": 0})
+        self.assertNotEqual(registry.generation(), generation)
+        self.assertEqual(registry.active_version(), "v2")
+
+    def test_activation_swaps_off_the_request_path_and_a_failed_load_keeps_serving(self):
+        registry.register(self.models[0], FEATURES, activate=True)
+        registry.register(self.models[1], FEATURES)
+        registry.register(self.models[2], FEATURES)
+        self.assertEqual(ml_model.served_model().version, "v1")
+
+        # A slow load of v2: requests keep getting v1 until it is ready
+        loading, release = threading.Event(), threading.Event()
+        load_forest = registry.load_forest
+
+        def slow_load(version, root=None):
+            loading.set()
+            release.wait(10)
+            return load_forest(version, root)
+
+        self.addCleanup(setattr, registry, "load_forest", load_forest)
+        registry.load_forest = slow_load
+        registry.activate_version("v2")
+        ml_model._next_check = 0.0
+        self.assertEqual(ml_model.served_model().version, "v1")
+        self.assertTrue(loading.wait(10))
+        self.assertEqual(ml_model.served_model().version, "v1")
+        release.set()
+        self.wait_for_reload()
+        self.assertEqual(ml_model.served_model().version, "v2")
+        self.assertEqual(ml_model.served_model().forest.n_trees, 5)
+
+        # v3's files vanish after activation: the load fails and v2 stays
+        registry.load_forest = load_forest
+        registry.activate_version("v3")
+        os.remove(os.path.join(registry.version_dir("v3"), registry.FOREST_FILE))
+        os.remove(os.path.join(registry.version_dir("v3"), registry.MODEL_FILE))
+        ml_model._next_check = 0.0
+        ml_model.served_model()
+        self.wait_for_reload()
+        self.assertEqual(ml_model.served_model().version, "v2")
+
+
+class HeartbeatTests(SimpleTestCase):
+    def own_record(self):
+        records = registry.worker_status(workers=ml_model.heartbeat_dir())
+        return next((record for record in records if record["pid"] == os.getpid()), None)
+
+    def test_forked_worker_reports_itself_then_refreshes(self):
+        ml_model.served_model()
+        saved = ml_model._heartbeat_pid, ml_model._next_heartbeat
+        self.addCleanup(setattr, ml_model, "_heartbeat_pid", saved[0])
+        self.addCleanup(setattr, ml_model, "_next_heartbeat", saved[1])
+        # As in a worker forked from the master that loaded the model
+        ml_model._heartbeat_pid, ml_model._next_heartbeat = os.getppid(), float("inf")
+        record = self.own_record()
+        if record:
+            registry.remove_heartbeat(record, workers=ml_model.heartbeat_dir())
+
+        served = ml_model.served_model()
+        record = self.own_record()
+        self.assertEqual((record["version"], record["loaded_at"]), (served.version, served.loaded_at))
+        ml_model.served_model()
+        self.assertEqual(self.own_record()["updated_at"], record["updated_at"])
+        ml_model._next_heartbeat = 0.0
+        ml_model.served_model()
+        self.assertGreater(self.own_record()["updated_at"], record["updated_at"])
+
+
+class ProcessPoolBackendTests(SimpleTestCase):
+    def test_failing_pool_falls_back_then_is_skipped_until_cooldown(self):
+        class Hung:
+            submitted = 0
+
+            def submit(self, *args):
+                Hung.submitted += 1
+                future = Future()
+                future.set_exception(TimeoutError())
+                return future
+
+            def shutdown(self, **kwargs):
+                pass
+
+        backend = ProcessPoolBackend(processes=1, timeout=0.01, max_failures=2, cooldown=0.2)
+        backend._executor = Hung
+        features = np.zeros((3, len(FEATURES)), dtype=np.float32)
+        old_backend, ml_model.backend = ml_model.backend, backend
+        try:
+            expected, _ = ml_model._predict(ml_model.served_model(), features)
+            for _ in range(4):
+                preds, _, _ = ml_model._score_matrix(features)
+                np.testing.assert_array_equal(preds, expected)
+        finally:
+            ml_model.backend = old_backend
+        # Two failures opened the breaker; the other calls never reached the pool
+        self.assertEqual(Hung.submitted, 2)
+        with self.assertRaises(PoolUnavailable):
+            backend.predict(features)
+        time.sleep(0.25)
+        with self.assertRaises(TimeoutError):
+            backend.predict(features)
+        self.assertEqual(Hung.submitted, 3)
+
+    def test_broken_pool_is_rebuilt(self):
+        backend = ProcessPoolBackend(processes=1, timeout=60)
+        self.addCleanup(backend.reset)
+        features = np.zeros((2, len(FEATURES)), dtype=np.float32)
+        expected, _ = ml_model._predict(ml_model.served_model(), features)
+        np.testing.assert_array_equal(backend.predict(features)[0], expected)
+
+        pool = backend._pool
+        for process in list(pool._processes.values()):
+            process.kill()
+            process.join()
+        with self.assertRaises(Exception):
+            backend.predict(features)
+        np.testing.assert_array_equal(backend.predict(features)[0], expected)
+        self.assertIsNot(backend._pool, pool)
+
+    def test_reset_kills_a_hung_worker(self):
+        backend = ProcessPoolBackend(processes=1, timeout=60)
+        self.addCleanup(backend.reset)
+        backend.warm()
+        processes = list(backend._pool._processes.values())
+        backend._pool.submit(time.sleep, 600)
+        backend.reset()
+        self.assertIsNone(backend._pool)
+        self.assertTrue(all(not process.is_alive() for process in processes))
+
+
+class SyntheticDataTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.spec = synthetic.Spec(devices=7, samples_per_device=400, devices_per_chunk=2, seed=11)
+
+    def write(self, name, fmt="csv", processes=1):
+        out = self.directory / name
+        synthetic.write(self.spec, str(out), fmt=fmt, processes=processes, log=lambda *args: None)
+        return out
+
+    def test_same_seed_gives_the_same_bytes_for_any_process_count(self):
+        once = self.write("once.csv").read_bytes()
+        self.assertEqual(self.write("again.csv").read_bytes(), once)
+        self.assertEqual(self.write("pool.csv", processes=3).read_bytes(), once)
+        self.assertEqual(len(once.splitlines()), self.spec.rows + 1)
+
+        serial, pooled = self.write("serial", "columnar"), self.write("pooled", "columnar", processes=3)
+        for name in synthetic.COLUMNS:
+            self.assertEqual((pooled / f"{name}.npy").read_bytes(), (serial / f"{name}.npy").read_bytes())
+
+    def test_device_timestamps_increase(self):
+        columns = synthetic.open_columnar(str(self.write("data", "columnar")))
+        devices, timestamps = np.asarray(columns["device_id"]), np.asarray(columns["timestamp_ms"])
+        for device in range(self.spec.devices):
+            self.assertTrue((np.diff(timestamps[devices == device]) > 0).all())
+
+    def test_crash_bursts_and_only_they_are_labelled(self):
+        columns = synthetic.open_columnar(str(self.write("data", "columnar")))
+        labels = np.asarray(columns[synthetic.LABEL]) == 1
+        # Normal driving is clipped to the gyro limit; every burst row exceeds it
+        gyro = np.abs(np.column_stack([columns[name] for name in FEATURES[3:]]))
+        shocked = (gyro > synthetic.NORMAL_LIMIT[3:]).any(axis=1)
+        self.assertTrue(labels.any())
+        np.testing.assert_array_equal(labels, shocked)
+
+
+class TrainingTests(SimpleTestCase):
+    def write_csv(self, labels):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "sensor_data.csv")
+        frame = pd.DataFrame(np.random.default_rng(0).normal(size=(len(labels), len(FEATURES))), columns=FEATURES)
+        frame["label"] = labels
+        frame.to_csv(path, index=False)
+        return path
+
+    def test_incremental_training_skips_single_label_chunks(self):
+        path = self.write_csv([0] * 40 + [0, 1] * 40)
+        model, metrics, _ = training.train(path, chunk_rows=40, incremental=True, trees_per_chunk=2,
+                                           seed=0, n_jobs=1, log=lambda line: None)
+        self.assertEqual(metrics["skipped_chunks"], 1)
+        self.assertEqual(len(model.estimators_), 4)
+
+    def test_incremental_training_without_both_labels_in_a_chunk_fails(self):
+        path = self.write_csv([0] * 40 + [1] * 40)
+        with self.assertRaisesMessage(training.TrainingError, "All 2 chunks"):
+            training.train(path, chunk_rows=40, incremental=True, n_jobs=1, log=lambda line: None)
+
+
+class BenchmarkBaselineTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "baseline.json"
+        self.path.write_text(json.dumps({"commit": "abc123", "metrics": {
+            "single_p95_ms": {"value": 2.0, "better": "lower"},
+            "batch_rows_per_s": {"value": 1000.0, "better": "higher"},
+        }}))
+
+    def results(self, p95, rows_per_s):
+        return {"metrics": {
+            "single_p95_ms": {"value": p95, "better": "lower"},
+            "batch_rows_per_s": {"value": rows_per_s, "better": "higher"},
+            "new_metric": {"value": 1.0, "better": "lower"},
+        }}
+
+    def test_within_threshold_passes(self):
+        baseline = json.loads(self.path.read_text())
+        self.assertEqual(bench.compare(self.results(2.1, 960.0), baseline, 0.1), [])
+        self.assertEqual(bench.compare(self.results(1.0, 5000.0), baseline, 0.1), [])
+
+    def test_regressions_in_either_direction_fail(self):
+        baseline = json.loads(self.path.read_text())
+        regressions = bench.compare(self.results(2.5, 800.0), baseline, 0.1)
+        self.assertEqual([name for name, *_ in regressions], ["single_p95_ms", "batch_rows_per_s"])
+        name, before, after, change = regressions[0]
+        self.assertEqual((before, after), (2.0, 2.5))
+        self.assertAlmostEqual(change, 0.25)
+        self.assertAlmostEqual(regressions[1][3], 0.2)
 
-# Create your tests here.
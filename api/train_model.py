@@ -1,26 +1,21 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
-import joblib
+import os
+import sys
 
-# Load dataset
-data = pd.read_csv("sensor_data.csv")  # Place CSV in same folder or give full path
+# Run as a plain script: make the api package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api import registry  # noqa: E402
+from api.training import train  # noqa: E402
 
-X = data[['acc_x','acc_y','acc_z','gyro_x','gyro_y','gyro_z']]
-y = data['label']
+# Load dataset, hold out every 5th row and train on all cores.
+# For large corpora use: python manage.py train_accident_model --incremental
+model, metrics, gate = train("sensor_data.csv", log=lambda line: None)  # Place CSV in same folder or give full path
 
-# Split dataset
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+print("Accuracy:", metrics["test_accuracy"])
+if gate is not None:
+    print(f"Gate short-circuits {metrics['gate_short_circuited']:.1%} of test rows; "
+          f"accident recall {metrics['gate_recall_forest']:.4f} -> {metrics['gate_recall_cascade']:.4f}")
 
-# Train model
-model = RandomForestClassifier(n_estimators=100)
-model.fit(X_train, y_train)
-
-# Test
-y_pred = model.predict(X_test)
-print("Accuracy:", accuracy_score(y_test, y_pred))
-
-# Save model
-joblib.dump(model, "accident_model.pkl")
-print("Model saved as accident_model.pkl")
+# Save model as a new registry version; serving switches only on activate
+meta = registry.register(model, registry.FEATURES, metrics=metrics, extra={"gate": gate.to_dict() if gate else None})
+print(f"Model registered as {meta['version']} in {registry.REGISTRY_DIR}")
+print(f"Activate it with: python manage.py model_registry activate {meta['version']}")
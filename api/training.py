@@ -0,0 +1,164 @@
+"""
+Training pipeline for the accident model.
+
+The CSV (or a columnar directory from synthetic.py) is streamed in chunks
+with typed float32/int8 columns, so memory is bounded by what the chosen
+mode keeps rather than by pandas' object overhead. Every `test_every`-th row (by position in the file) is held out
+for evaluation, which keeps the split deterministic across runs and modes.
+
+- default: training rows are packed into one float32 matrix and a single
+  RandomForest is fitted on all cores. sklearn needs the whole matrix, so
+  this mode holds every training row (4 bytes per feature) and, while the
+  chunks are joined, briefly a second copy of them: beyond a few hundred
+  million rows use --max-rows or the incremental mode.
+- incremental: out-of-core. The forest is grown with warm_start, adding
+  `trees_per_chunk` trees fitted on each chunk, so peak memory is one chunk
+  plus the trees regardless of corpus size.
+
+No Django imports here so train_model.py can use it as a plain script.
+"""
+import os
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+from .cascade import gate_report, learn_gate
+from .compiled_forest import CompiledForest
+from .registry import FEATURES
+from .synthetic import LABEL, open_columnar
+
+
+class TrainingError(ValueError):
+    pass
+
+
+def iter_chunks(path, chunk_rows):
+    """Yield (X float32, y int8) chunks of a CSV or columnar dataset without loading it whole"""
+    if os.path.isdir(path):
+        # Columnar output of generate_sensor_dataset.py: slice the memory maps
+        columns = open_columnar(path)
+        for start in range(0, len(columns[LABEL]), chunk_rows):
+            stop = start + chunk_rows
+            X = np.column_stack([columns[name][start:stop] for name in FEATURES]).astype(np.float32, copy=False)
+            yield X, np.asarray(columns[LABEL][start:stop], dtype=np.int8)
+        return
+    dtypes = {name: np.float32 for name in FEATURES}
+    dtypes[LABEL] = np.int8
+    reader = pd.read_csv(path, usecols=FEATURES + [LABEL], dtype=dtypes, chunksize=chunk_rows)
+    for frame in reader:
+        yield frame[FEATURES].to_numpy(), frame[LABEL].to_numpy()
+
+
+class Reservoir:
+    """Uniform sample of at most `size` rows from a stream of chunks"""
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.X = np.empty((0, len(FEATURES)), dtype=np.float32)
+        self.y = np.empty(0, dtype=np.int8)
+        self.keys = np.empty(0)
+
+    def add(self, X, y):
+        # Keep the rows with the largest random keys seen so far
+        keys = np.concatenate([self.keys, self.rng.random(len(X))])
+        X = np.concatenate([self.X, X])
+        y = np.concatenate([self.y, y])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, len(keys) - self.size)[-self.size:]
+            keys, X, y = keys[keep], X[keep], y[keep]
+        self.keys, self.X, self.y = keys, X, y
+
+
+def _split(X, y, offset, test_every):
+    is_test = (np.arange(offset, offset + len(X)) % test_every) == 0
+    return X[~is_test], y[~is_test], X[is_test], y[is_test]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def train(path, chunk_rows=1_000_000, n_estimators=100, incremental=False, trees_per_chunk=10,
+          test_every=5, max_test_rows=1_000_000, gate_rows=200_000, max_rows=None, seed=None,
+          n_jobs=-1, log=print):
+    """Fit a forest on `path`; returns (model, metrics, gate or None)"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, recall_score
+
+    started = time.perf_counter()
+    test = Reservoir(max_test_rows, seed)
+    sample = Reservoir(gate_rows, seed)
+    train_X, train_y = [], []
+    classes = None
+    skipped = 0
+    rows = 0
+
+    if incremental:
+        model = RandomForestClassifier(n_estimators=0, warm_start=True, n_jobs=n_jobs, random_state=seed)
+
+    for X, y in iter_chunks(path, chunk_rows):
+        if max_rows is not None:
+            X, y = X[:max_rows - rows], y[:max_rows - rows]
+        X_fit, y_fit, X_test, y_test = _split(X, y, rows, test_every)
+        rows += len(X)
+        test.add(X_test, y_test)
+        sample.add(X_fit, y_fit)
+
+        if incremental:
+            chunk_classes = np.unique(y_fit)
+            if classes is None and len(chunk_classes) > 1:
+                classes = chunk_classes
+            # Every tree must see the same label set or the forest can't be combined
+            if classes is None or not np.array_equal(chunk_classes, classes):
+                skipped += 1
+            else:
+                model.n_estimators += trees_per_chunk
+                model.fit(X_fit, y_fit)
+        else:
+            train_X.append(X_fit)
+            train_y.append(y_fit)
+        log(f"  {rows:,} rows read, peak RSS {peak_rss_mb():.0f} MiB")
+        if max_rows is not None and rows >= max_rows:
+            break
+
+    if incremental and model.n_estimators == 0:
+        raise TrainingError(
+            f"All {skipped} chunks of {path} were skipped: none had every label. "
+            "Use larger chunks or shuffle the rows."
+        )
+    if not incremental:
+        if not train_X:
+            raise TrainingError(f"No rows to train on in {path}")
+        X_fit, y_fit = np.concatenate(train_X), np.concatenate(train_y)
+        train_X = train_y = None
+        model = RandomForestClassifier(n_estimators=n_estimators, n_jobs=n_jobs, random_state=seed)
+        model.fit(X_fit, y_fit)
+        del X_fit, y_fit
+    fit_seconds = time.perf_counter() - started
+
+    # sklearn was fitted on bare arrays; evaluate the same way
+    forest = CompiledForest.from_model(model)
+    y_pred = forest.predict(test.X)
+    metrics = {
+        "rows": rows,
+        "test_rows": len(test.y),
+        "test_accuracy": float(accuracy_score(test.y, y_pred)),
+        "test_recall": float(recall_score(test.y, y_pred, zero_division=0)),
+        "sample_accuracy": float(accuracy_score(sample.y, forest.predict(sample.X))),
+        "n_estimators": len(model.estimators_),
+        "skipped_chunks": skipped,
+        "fit_seconds": fit_seconds,
+    }
+
+    gate = learn_gate(forest, sample.X, sample.y)
+    if gate is not None:
+        report = gate_report(forest, gate, test.X, test.y)
+        metrics.update({"gate_" + key: value for key, value in report.items()})
+
+    metrics["wall_seconds"] = time.perf_counter() - started
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    return model, metrics, gate
@@ -1,12 +1,14 @@
 from django.urls import path
 from .views import AccidentReportView
-from .views import VoiceAccidentReportView, SensorAccidentReportView, BLEAlertView, CloudAlertView, BLEAlertListView, CloudAlertListView
+from .views import VoiceAccidentReportView, SensorAccidentReportView, SensorBatchAccidentReportView, SensorStreamView, BLEAlertView, CloudAlertView, BLEAlertListView, CloudAlertListView
 
 from . import views
 urlpatterns = [
     path('accidents/', AccidentReportView.as_view(), name='accident_reports'),
     path('accidents/voice/', VoiceAccidentReportView.as_view(), name='voice_accident'),
     path('accidents/sensor/', SensorAccidentReportView.as_view(), name='sensor_accident'),
+    path('accidents/sensor/batch/', SensorBatchAccidentReportView.as_view(), name='sensor_accident_batch'),
+    path('accidents/sensor/stream/', SensorStreamView.as_view(), name='sensor_accident_stream'),
     # path('accidents/ble-alert/', BLEAlertView.as_view(), name='ble_alert'),
     # path('accidents/cloud-alert/', CloudAlertView.as_view(), name='cloud_alert'),
     # path('accidents/ble-alerts/', BLEAlertListView.as_view(), name='ble-alerts'),
@@ -14,6 +16,7 @@ urlpatterns = [
      # BLE Alert URLs
     path('accidents/ble-alert/', views.BLEAlertView.as_view(), name='ble_alert'),
     path('accidents/ble-alerts/', views.BLEAlertListView.as_view(), name='ble_alerts_list'),
+    path('accidents/ble-alerts/bulk/', views.BLEAlertBulkView.as_view(), name='ble_alerts_bulk'),
     path('accidents/ble-alerts/<uuid:alert_id>/', views.BLEAlertDetailView.as_view(), name='ble_alert_detail'),
     
     # Cloud Alert URLs  
@@ -22,9 +25,14 @@ urlpatterns = [
     path('accidents/cloud-alerts/<uuid:alert_id>/', views.CloudAlertDetailView.as_view(), name='cloud_alert_detail'),
     
     # Statistics
+    path('accidents/inference/stats/', views.InferenceStatsView.as_view(), name='inference_stats'),
+    path('accidents/model/status/', views.ModelStatusView.as_view(), name='model_status'),
     path('accidents/alert-statistics/', views.AlertStatisticsView.as_view(), name='alert_statistics'),
+    path('accidents/alert-statistics/timeseries/', views.AlertTimeSeriesView.as_view(), name='alert_timeseries'),
     
     path('accidents/emergency/notify/', views.emergency_notify, name='emergency_notify'),
+    path('accidents/export/<str:kind>/', views.export_rows, name='export_rows'),
+    path('accidents/nearby/', views.NearbyView.as_view(), name='nearby'),
     
 
 ]
\ No newline at end of file
@@ -3,33 +3,55 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from .models import AccidentReport, User  # ✅ FIX: Import your custom User model
 from .serializers import AccidentReportSerializer
-from .ml_model import predict_accident
+from .ml_model import FEATURES, cascade_stats, heartbeat_dir, score_accident, score_accidents, served_model, scheduler as inference_scheduler
+from . import commit_queue, export, geo, incidents, readings, registry, relay, rollups, telemetry
+from .pagination import InvalidCursor, keyset_page, page_size
+from .routing import use_replica
+from .statistics import INTERVALS, alert_statistics, time_series
+from .streaming import engine as stream_engine
 import requests
 from django.conf import settings
-import uuid
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Count, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import json
+import os
+from collections import Counter
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from .models import BLEAlert, CloudAlert
+from .models import ACTIVE_BLE_STATUSES, BLEAlert, CloudAlert, SensorReading
 from .serializers import BLEAlertSerializer, CloudAlertSerializer
 
 class AccidentReportView(APIView):
     permission_classes = [AllowAny]  # anyone can access
 
+    @use_replica
     def get(self, request):
-        reports = AccidentReport.objects.all().order_by('-timestamp')
+        # Newest first, one keyset page at a time (?cursor=...&page_size=...)
+        try:
+            reports, next_cursor = keyset_page(
+                AccidentReport.objects.select_related('user'),
+                request.query_params.get('cursor'),
+                page_size(request.query_params)
+            )
+        except InvalidCursor as e:
+            return Response({"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         serializer = AccidentReportSerializer(reports, many=True)
-        return Response({"status": True, "reports": serializer.data})
+        return Response({
+            "status": True,
+            "reports": serializer.data,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        })
 
     def post(self, request):
         data = request.data
         serializer = AccidentReportSerializer(data=data)
         if serializer.is_valid():
             # temporarily skip user assignment
-            serializer.save(user=None)  
+            commit_queue.submit(lambda: serializer.save(user=None))
             return Response({"status": True, "report": serializer.data})
         else:
             return Response({"status": False, "errors": serializer.errors})
@@ -52,7 +74,8 @@ class VoiceAccidentReportView(APIView):
             # ✅ FIX: Use request.user if authenticated, otherwise None
             user = request.user if request.user.is_authenticated else None
             
-            report = AccidentReport.objects.create(
+            report = commit_queue.create(
+                AccidentReport,
                 user=user,
                 latitude=latitude,
                 longitude=longitude,
@@ -67,46 +90,316 @@ class VoiceAccidentReportView(APIView):
             return Response({"status": False, "message": "No emergency detected in voice"})
 
 
+def parse_sensor_reading(data):
+    """Coerce one raw sensor payload into floats (missing channels default to 0)"""
+    reading = {
+        "latitude": float(data.get("latitude", 0)),
+        "longitude": float(data.get("longitude", 0)),
+    }
+    for name in FEATURES:
+        reading[name] = float(data.get(name, 0))
+    return reading
+
+
+def sensor_description(reading):
+    channels = ", ".join(f"{name}={reading[name]}" for name in FEATURES)
+    return f"Sensor data detected accident: {channels}"
+
+
 class SensorAccidentReportView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
         # Sensor data from request
-        latitude = float(request.data.get("latitude", 0))
-        longitude = float(request.data.get("longitude", 0))
-        acc_x = float(request.data.get("acc_x", 0))
-        acc_y = float(request.data.get("acc_y", 0))
-        acc_z = float(request.data.get("acc_z", 0))
-        gyro_x = float(request.data.get("gyro_x", 0))
-        gyro_y = float(request.data.get("gyro_y", 0))
-        gyro_z = float(request.data.get("gyro_z", 0))
+        reading = parse_sensor_reading(request.data)
+        if request.data.get("device_id"):
+            telemetry.record(str(request.data["device_id"]), [[reading[name] for name in FEATURES]])
 
         # Use ML model to predict severity
-        severity = predict_accident({
-            "acc_x": acc_x,
-            "acc_y": acc_y,
-            "acc_z": acc_z,
-            "gyro_x": gyro_x,
-            "gyro_y": gyro_y,
-            "gyro_z": gyro_z
-        })
+        severity, probability, model_version = score_accident(reading)
 
         # ✅ FIX: Use request.user if authenticated, otherwise None
         user = request.user if request.user.is_authenticated else None
 
         # Save accident report
-        report = AccidentReport.objects.create(
+        report = commit_queue.submit(lambda: create_sensor_report(
+            reading,
+            probability,
             user=user,
-            latitude=latitude,
-            longitude=longitude,
+            latitude=reading["latitude"],
+            longitude=reading["longitude"],
             severity=severity,
-            description=f"Sensor data detected accident: acc_x={acc_x}, acc_y={acc_y}, acc_z={acc_z}, gyro_x={gyro_x}, gyro_y={gyro_y}, gyro_z={gyro_z}",
-            reported_via="sensor"
-        )
+            model_version=model_version
+        ))
         serializer = AccidentReportSerializer(report)
         return Response({"status": True, "report": serializer.data})
 
 
+def create_sensor_report(reading, probability, **fields):
+    """Create a sensor report and its SensorReading (run it in a transaction)"""
+    report = AccidentReport.objects.create(description=sensor_description(reading), reported_via="sensor", **fields)
+    SensorReading.objects.bulk_create(readings.build([report], [reading], [probability]))
+    return report
+
+
+def insert_reports(reports, sensor_readings=(), probabilities=()):
+    """bulk_create reports; sensor_readings/probabilities are parallel to them, for sensor reports"""
+    # bulk_create skips the pre_save receiver that clusters reports
+    incidents.assign(reports)
+    AccidentReport.objects.bulk_create(reports)
+    SensorReading.objects.bulk_create(readings.build(reports, sensor_readings, probabilities))
+    # bulk_create skips the signals that keep the rollups current
+    rollups.record_created(reports)
+
+
+class SensorBatchAccidentReportView(APIView):
+    """Score a buffered batch of sensor readings with one model call"""
+    permission_classes = [AllowAny]
+    max_batch_size = 1000
+
+    def post(self, request):
+        readings = request.data.get("readings")
+        if not isinstance(readings, list) or not readings:
+            return Response({
+                "status": False,
+                "message": "readings must be a non-empty list"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(readings) > self.max_batch_size:
+            return Response({
+                "status": False,
+                "message": f"At most {self.max_batch_size} readings per batch"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Parse everything first so bad rows don't cost a model call
+        results = []
+        valid = []
+        for index, raw in enumerate(readings):
+            try:
+                reading = parse_sensor_reading(raw)
+            except (AttributeError, TypeError, ValueError):
+                results.append({"index": index, "status": False, "message": "Invalid sensor reading"})
+                continue
+            result = {"index": index, "status": True, "severity": None, "report": None}
+            results.append(result)
+            valid.append((result, reading))
+
+        user = request.user if request.user.is_authenticated else None
+        if valid and request.data.get("device_id"):
+            telemetry.record(str(request.data["device_id"]), [[reading[name] for name in FEATURES] for _, reading in valid])
+
+        # One predict for the whole batch, one INSERT for every positive reading
+        reports = []
+        if valid:
+            severities, probabilities, model_version = score_accidents([reading for _, reading in valid])
+            for (result, reading), severity, probability in zip(valid, severities, probabilities):
+                result["severity"] = severity
+                if severity != "high":
+                    continue
+                report = AccidentReport(
+                    user=user,
+                    latitude=reading["latitude"],
+                    longitude=reading["longitude"],
+                    severity=severity,
+                    description=sensor_description(reading),
+                    reported_via="sensor",
+                    model_version=model_version
+                )
+                # bulk_create skips save(), which fills the grid cell
+                report.geo_cell = geo.cell_for(report.latitude, report.longitude)
+                reports.append((result, report, reading, probability))
+            commit_queue.submit(lambda: insert_reports(
+                [report for _, report, _, _ in reports],
+                [reading for _, _, reading, _ in reports],
+                [probability for _, _, _, probability in reports],
+            ))
+
+        for result, report, _, _ in reports:
+            result["report"] = AccidentReportSerializer(report).data
+
+        return Response({
+            "status": True,
+            "count": len(readings),
+            "accidents": len(reports),
+            "results": results
+        })
+
+
+class SensorStreamView(APIView):
+    """
+    Streaming mode: samples are appended to the device's sliding window and
+    the model scores the window's peak sample instead of each isolated point.
+    A report is only stored when the window goes from low to high.
+    """
+    permission_classes = [AllowAny]
+    max_samples = 500
+
+    def post(self, request):
+        device_id = request.data.get("device_id")
+        if not device_id:
+            return Response({
+                "status": False,
+                "message": "Missing device_id"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Either {"samples": [...]} or a single sample at the top level
+        raw_samples = request.data.get("samples")
+        if raw_samples is None:
+            raw_samples = [request.data]
+        if not isinstance(raw_samples, list) or not 0 < len(raw_samples) <= self.max_samples:
+            return Response({
+                "status": False,
+                "message": f"samples must be a list of 1 to {self.max_samples} readings"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            samples = [[float(raw.get(name, 0)) for name in FEATURES] for raw in raw_samples]
+            times = [raw.get("t") for raw in raw_samples]
+            times = None if any(t is None for t in times) else [float(t) for t in times]
+            latitude = float(request.data.get("latitude", 0))
+            longitude = float(request.data.get("longitude", 0))
+        except (AttributeError, TypeError, ValueError):
+            return Response({
+                "status": False,
+                "message": "Invalid sensor sample"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Every raw sample is kept, not just the ones that trigger a report
+        telemetry.record(str(device_id), samples, times)
+        window, snapshots = stream_engine.push(str(device_id), samples, times)
+
+        # Score the window after every sample with a single model call
+        peaks = [dict(zip(FEATURES, peak.tolist())) for _, peak in snapshots]
+        severities, probabilities, model_version = score_accidents(peaks)
+
+        report = None
+        triggered = False
+        for severity in severities:
+            triggered = stream_engine.set_alerting(window, severity == "high") or triggered
+
+        features, peak = snapshots[-1]
+        if triggered:
+            user = request.user if request.user.is_authenticated else None
+            reading = dict(zip(FEATURES, peak.tolist()))
+            report = commit_queue.submit(lambda: create_sensor_report(
+                reading,
+                probabilities[-1],
+                user=user,
+                latitude=latitude,
+                longitude=longitude,
+                severity="high",
+                model_version=model_version
+            ))
+
+        return Response({
+            "status": True,
+            "device_id": str(device_id),
+            "severity": severities[-1],
+            "window": features,
+            "report": AccidentReportSerializer(report).data if report else None
+        })
+
+
+class ModelStatusView(APIView):
+    """Which model version this worker serves, plus every worker's last heartbeat"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        served = served_model()
+        return Response({
+            "status": True,
+            "pid": os.getpid(),
+            "serving": served.version,
+            "loaded_at": served.loaded_at,
+            "active": registry.active_version(),
+            "workers": registry.worker_status(workers=heartbeat_dir()),
+        })
+
+
+class InferenceStatsView(APIView):
+    """Micro-batching and cascade-gate metrics for this worker process"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response({
+            "status": True,
+            "pid": os.getpid(),
+            "scheduler": inference_scheduler.stats(),
+            "cascade": cascade_stats(),
+        })
+
+
+def active_ble_alerts(alerts, now=None):
+    """BLE alerts still broadcasting: one range per status on the (status, expires_at) index"""
+    return alerts.filter(status__in=ACTIVE_BLE_STATUSES, expires_at__gt=now or timezone.now())
+
+
+def parse_location(params, required=True, max_radius_km=200):
+    """(lat, lon, radius_km) from query params, None if absent and not required"""
+    if not required and 'lat' not in params and 'lon' not in params:
+        return None
+    try:
+        latitude = float(params['lat'])
+        longitude = float(params['lon'])
+        radius_km = float(params.get('radius_km', 5))
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and 0 < radius_km <= max_radius_km):
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"lat and lon are required; radius_km must be in (0, {max_radius_km}]")
+    return latitude, longitude, radius_km
+
+
+class NearbyView(APIView):
+    """
+    Reports or BLE alerts within radius_km of (lat, lon) in the last `hours`
+    (or, with active=true, BLE alerts still broadcasting), nearest first.
+    Candidates come from the geo_cell index (api/geo.py) and are then
+    filtered by exact great-circle distance.
+    """
+    permission_classes = [AllowAny]
+    max_radius_km = 200
+    max_limit = 1000
+
+    def get(self, request):
+        params = request.query_params
+        kind = params.get('kind', 'reports')
+        if kind not in ('reports', 'ble-alerts'):
+            return Response({
+                "status": False,
+                "message": "kind must be reports or ble-alerts"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        active = kind == 'ble-alerts' and params.get('active', '').lower() in ('1', 'true', 'yes')
+        try:
+            latitude, longitude, radius_km = parse_location(params, max_radius_km=self.max_radius_km)
+            hours = params.get('hours', None if active else 24)
+            hours = None if hours is None else float(hours)
+            limit = min(int(params.get('limit', 100)), self.max_limit)
+        except (TypeError, ValueError) as e:
+            return Response({"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        model, serializer_class = (
+            (AccidentReport, AccidentReportSerializer) if kind == 'reports' else (BLEAlert, BLEAlertSerializer)
+        )
+        rows = model.objects.all()
+        if hours is not None:
+            rows = rows.filter(timestamp__gte=timezone.now() - timezone.timedelta(hours=hours))
+        if model is AccidentReport:
+            rows = rows.select_related('user')
+        elif active:
+            rows = active_ble_alerts(rows)
+        found = geo.nearby(rows, latitude, longitude, radius_km, limit)
+
+        results = serializer_class(found.rows, many=True).data
+        for item, distance in zip(results, found.distances_km):
+            item["distance_km"] = round(distance, 3)
+        return Response({
+            "status": True,
+            "count": len(results),
+            "matches": found.matches,
+            "candidates_scanned": found.candidates,
+            "results": results
+        })
+
+
 # -------------------------------
 # BLE Alert Views
 # -------------------------------
@@ -121,9 +414,9 @@ class BLEAlertView(APIView):
             severity = request.data.get("severity", "unknown")
             location_name = request.data.get("location_name", "")
             broadcast_duration = request.data.get("duration_seconds", 30)
+            client_id = request.data.get("client_id") or None
 
-            # ✅ Save BLE alert to database
-            alert = BLEAlert.objects.create(
+            fields = dict(
                 latitude=latitude,
                 longitude=longitude,
                 message=message,
@@ -132,6 +425,23 @@ class BLEAlertView(APIView):
                 broadcast_duration=broadcast_duration,
                 status="broadcast"
             )
+            # ✅ Save BLE alert to database. A relay re-sending an alert we
+            # already have gets the stored one back; get_or_create also settles
+            # two relays racing to store it (the loser re-reads on IntegrityError).
+            if client_id:
+                alert, created = commit_queue.submit(
+                    lambda: BLEAlert.objects.get_or_create(client_id=client_id, defaults=fields)
+                )
+            else:
+                alert, created = commit_queue.create(BLEAlert, **fields), True
+            if not created:
+                return Response({
+                    "status": True,
+                    "message": "BLE alert already received.",
+                    "alert_id": str(alert.id),
+                    "duplicate": True,
+                    "data": BLEAlertSerializer(alert).data
+                })
 
             print(f"📡 [BACKEND] BLE Alert Created: {message}")
 
@@ -150,50 +460,96 @@ class BLEAlertView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BLEAlertBulkView(APIView):
+    """Relayed BLE alerts in bulk, deduplicated by client_id (see api/relay.py)"""
+    permission_classes = [AllowAny]
+    max_batch_size = 1000
+
+    def post(self, request):
+        alerts = request.data.get("alerts")
+        if not isinstance(alerts, list) or not 0 < len(alerts) <= self.max_batch_size:
+            return Response({
+                "status": False,
+                "message": f"alerts must be a list of 1 to {self.max_batch_size} alerts"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = relay.ingest(alerts)
+        outcomes = Counter(result["status"] for result in results)
+        return Response({
+            "status": True,
+            "count": len(results),
+            "created": outcomes["created"],
+            "duplicates": outcomes["duplicate"],
+            "invalid": outcomes["invalid"],
+            "results": results
+        })
+
+
 class BLEAlertListView(APIView):
     """View all BLE alerts with filtering"""
     permission_classes = [AllowAny]
 
+    @use_replica
     def get(self, request):
+        try:
+            location = parse_location(request.query_params, required=False)
+        except ValueError as e:
+            return Response({"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # Get query parameters for filtering
             severity = request.query_params.get('severity')
-            status = request.query_params.get('status')
-            hours = request.query_params.get('hours', 24)  # Default last 24 hours
+            status_filter = request.query_params.get('status')
+            active = request.query_params.get('active', '').lower() in ('1', 'true', 'yes')
+            # Active alerts are recent by definition; otherwise default to 24 hours
+            hours = request.query_params.get('hours', None if active else 24)
             
             alerts = BLEAlert.objects.all()
             
             # Apply filters
+            if active:
+                alerts = active_ble_alerts(alerts)
             if severity:
                 alerts = alerts.filter(severity=severity)
-            if status:
-                alerts = alerts.filter(status=status)
+            if status_filter:
+                alerts = alerts.filter(status=status_filter)
             if hours:
                 time_threshold = timezone.now() - timezone.timedelta(hours=int(hours))
                 alerts = alerts.filter(timestamp__gte=time_threshold)
+            if location:
+                alerts = geo.within(alerts, *location)
             
-            alerts = alerts.order_by('-timestamp')
-            serializer = BLEAlertSerializer(alerts, many=True)
-            
-            # Statistics
-            total_count = alerts.count()
-            high_severity_count = alerts.filter(severity='high').count()
-            medium_severity_count = alerts.filter(severity='medium').count()
-            low_severity_count = alerts.filter(severity='low').count()
-
-            return Response({
+            cursor = request.query_params.get('cursor')
+            page, next_cursor = keyset_page(alerts, cursor, page_size(request.query_params))
+            response = {
                 "status": True,
-                "count": total_count,
-                "statistics": {
-                    "high_severity": high_severity_count,
-                    "medium_severity": medium_severity_count,
-                    "low_severity": low_severity_count,
-                    "broadcast_status": alerts.filter(status='broadcast').count(),
-                    "received_status": alerts.filter(status='received').count(),
-                },
-                "alerts": serializer.data
-            })
+                "alerts": BLEAlertSerializer(page, many=True).data,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
+            }
 
+            # Statistics for the whole filtered set scan every matching row: opt-in
+            if request.query_params.get('include_counts', '').lower() in ('1', 'true', 'yes'):
+                counts = alerts.aggregate(
+                    total=Count('pk'),
+                    high=Count('pk', filter=Q(severity='high')),
+                    medium=Count('pk', filter=Q(severity='medium')),
+                    low=Count('pk', filter=Q(severity='low')),
+                    broadcast=Count('pk', filter=Q(status='broadcast')),
+                    received=Count('pk', filter=Q(status='received')),
+                )
+                response["count"] = counts["total"]
+                response["statistics"] = {
+                    "high_severity": counts["high"],
+                    "medium_severity": counts["medium"],
+                    "low_severity": counts["low"],
+                    "broadcast_status": counts["broadcast"],
+                    "received_status": counts["received"],
+                }
+            return Response(response)
+
+        except InvalidCursor as e:
+            return Response({"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 "status": False,
@@ -246,7 +602,8 @@ class CloudAlertView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             # ✅ Save Cloud alert to database
-            alert = CloudAlert.objects.create(
+            alert = commit_queue.create(
+                CloudAlert,
                 device_token=device_token,
                 title=title,
                 alert_message=alert_message,
@@ -279,46 +636,49 @@ class CloudAlertListView(APIView):
     """View all Cloud alerts with filtering"""
     permission_classes = [AllowAny]
 
+    @use_replica
     def get(self, request):
         try:
             # Get query parameters for filtering
-            status = request.query_params.get('status')
+            status_filter = request.query_params.get('status')
             is_emergency = request.query_params.get('is_emergency')
             hours = request.query_params.get('hours', 24)
             
             alerts = CloudAlert.objects.all()
             
             # Apply filters
-            if status:
-                alerts = alerts.filter(status=status)
+            if status_filter:
+                alerts = alerts.filter(status=status_filter)
             if is_emergency is not None:
                 alerts = alerts.filter(is_emergency=is_emergency.lower() == 'true')
             if hours:
                 time_threshold = timezone.now() - timezone.timedelta(hours=int(hours))
                 alerts = alerts.filter(timestamp__gte=time_threshold)
             
-            alerts = alerts.order_by('-timestamp')
-            serializer = CloudAlertSerializer(alerts, many=True)
-            
-            # Statistics
-            total_count = alerts.count()
-            emergency_count = alerts.filter(is_emergency=True).count()
-            sent_count = alerts.filter(status='sent').count()
-            delivered_count = alerts.filter(status='delivered').count()
-            failed_count = alerts.filter(status='failed').count()
-
-            return Response({
+            cursor = request.query_params.get('cursor')
+            page, next_cursor = keyset_page(alerts, cursor, page_size(request.query_params))
+            response = {
                 "status": True,
-                "count": total_count,
-                "statistics": {
-                    "emergency_alerts": emergency_count,
-                    "sent": sent_count,
-                    "delivered": delivered_count,
-                    "failed": failed_count,
-                },
-                "alerts": serializer.data
-            })
+                "alerts": CloudAlertSerializer(page, many=True).data,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
+            }
 
+            # Statistics for the whole filtered set scan every matching row: opt-in
+            if request.query_params.get('include_counts', '').lower() in ('1', 'true', 'yes'):
+                counts = alerts.aggregate(
+                    total=Count('pk'),
+                    emergency_alerts=Count('pk', filter=Q(is_emergency=True)),
+                    sent=Count('pk', filter=Q(status='sent')),
+                    delivered=Count('pk', filter=Q(status='delivered')),
+                    failed=Count('pk', filter=Q(status='failed')),
+                )
+                response["count"] = counts.pop("total")
+                response["statistics"] = counts
+            return Response(response)
+
+        except InvalidCursor as e:
+            return Response({"status": False, "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 "status": False,
@@ -354,62 +714,13 @@ class AlertStatisticsView(APIView):
     """Get overall alert statistics"""
     permission_classes = [AllowAny]
 
+    @use_replica
     def get(self, request):
         try:
-            # Time ranges for statistics
-            now = timezone.now()
-            today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            last_24_hours = now - timezone.timedelta(hours=24)
-            last_7_days = now - timezone.timedelta(days=7)
-
-            # BLE Alert Statistics
-            ble_total = BLEAlert.objects.count()
-            ble_today = BLEAlert.objects.filter(timestamp__gte=today).count()
-            ble_24h = BLEAlert.objects.filter(timestamp__gte=last_24_hours).count()
-            ble_7d = BLEAlert.objects.filter(timestamp__gte=last_7_days).count()
-
-            # Cloud Alert Statistics
-            cloud_total = CloudAlert.objects.count()
-            cloud_today = CloudAlert.objects.filter(timestamp__gte=today).count()
-            cloud_24h = CloudAlert.objects.filter(timestamp__gte=last_24_hours).count()
-            cloud_7d = CloudAlert.objects.filter(timestamp__gte=last_7_days).count()
-
-            # Severity breakdown
-            high_severity = BLEAlert.objects.filter(severity='high').count()
-            medium_severity = BLEAlert.objects.filter(severity='medium').count()
-            low_severity = BLEAlert.objects.filter(severity='low').count()
-
-            # Emergency alerts
-            emergency_alerts = CloudAlert.objects.filter(is_emergency=True).count()
-
+            # One aggregate query per table, cached for a few seconds
             return Response({
                 "status": True,
-                "statistics": {
-                    "ble_alerts": {
-                        "total": ble_total,
-                        "today": ble_today,
-                        "last_24_hours": ble_24h,
-                        "last_7_days": ble_7d,
-                        "severity_breakdown": {
-                            "high": high_severity,
-                            "medium": medium_severity,
-                            "low": low_severity
-                        }
-                    },
-                    "cloud_alerts": {
-                        "total": cloud_total,
-                        "today": cloud_today,
-                        "last_24_hours": cloud_24h,
-                        "last_7_days": cloud_7d,
-                        "emergency_alerts": emergency_alerts,
-                        "status_breakdown": {
-                            "sent": CloudAlert.objects.filter(status='sent').count(),
-                            "delivered": CloudAlert.objects.filter(status='delivered').count(),
-                            "failed": CloudAlert.objects.filter(status='failed').count()
-                        }
-                    },
-                    "total_alerts": ble_total + cloud_total
-                }
+                "statistics": alert_statistics()
             })
 
         except Exception as e:
@@ -419,6 +730,89 @@ class AlertStatisticsView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AlertTimeSeriesView(APIView):
+    """
+    Alert and accident counts per hour or day, read from the hourly rollups.
+    Query params: start, end (ISO 8601; default the last 7 days), interval
+    (hour|day), channel (comma-separated: ble, cloud, sensor, voice, manual),
+    severity, status.
+    """
+    permission_classes = [AllowAny]
+    max_buckets = 5000
+
+    @use_replica
+    def get(self, request):
+        params = request.query_params
+        interval = params.get('interval', 'hour')
+        try:
+            end = parse_datetime(params['end']) if params.get('end') else timezone.now()
+            start = parse_datetime(params['start']) if params.get('start') else end - timezone.timedelta(days=7)
+            if start is None or end is None:
+                raise ValueError
+        except ValueError:
+            return Response({
+                "status": False,
+                "message": "start and end must be ISO 8601 datetimes"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start)
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end)
+
+        if interval not in INTERVALS:
+            return Response({
+                "status": False,
+                "message": f"interval must be one of: {', '.join(INTERVALS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not start < end or (end - start) / INTERVALS[interval] > self.max_buckets:
+            return Response({
+                "status": False,
+                "message": f"start must be before end, with at most {self.max_buckets} {interval} buckets"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        channels = [c for c in params.get('channel', '').split(',') if c]
+        try:
+            series = time_series(start, end, interval, channels=channels,
+                                 severity=params.get('severity'), status=params.get('status'))
+            return Response({
+                "status": True,
+                "interval": interval,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "series": series
+            })
+        except Exception as e:
+            return Response({
+                "status": False,
+                "message": f"Error fetching time series: {str(e)}"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+def export_rows(request, kind):
+    """
+    API Endpoint: /api/accidents/export/<reports|ble-alerts|cloud-alerts>/
+    Streams every matching row as NDJSON (default) or CSV (?format=csv).
+    Filters: start, end (ISO 8601), severity, status, reported_via.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Only GET method allowed"}, status=405)
+    model = export.EXPORTS.get(kind)
+    if model is None:
+        return JsonResponse({"error": f"Unknown export: {kind}"}, status=404)
+    fmt = request.GET.get('format', 'ndjson')
+    if fmt not in export.FORMATS:
+        return JsonResponse({"error": f"format must be one of: {', '.join(export.FORMATS)}"}, status=400)
+
+    try:
+        chunks = export.stream(model, request.GET, fmt)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    response = StreamingHttpResponse(chunks, content_type=export.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
 
 @csrf_exempt
 def emergency_notify(request):
@@ -451,15 +845,14 @@ def emergency_notify(request):
         # ✅ FIX: Use request.user if authenticated, otherwise None
         user = request.user if request.user.is_authenticated else None
 
-        report = AccidentReport.objects.create(
-            id=uuid.uuid4(),
+        report = commit_queue.create(
+            AccidentReport,
             user=user,
             latitude=latitude,
             longitude=longitude,
             severity=severity,
             description=description,
-            reported_via=reported_via,
-            timestamp=timezone.now()
+            reported_via=reported_via
         )
 
         response_data = {
@@ -473,6 +866,8 @@ def emergency_notify(request):
                 "description": report.description,
                 "reported_via": report.reported_via,
                 "timestamp": report.timestamp.isoformat(),
+                "incident": str(report.incident_id) if report.incident_id else None,
+                "is_new_incident": report.opened_incident,
             }
         }
 